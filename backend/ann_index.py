@@ -0,0 +1,289 @@
+"""
+Index nearest-neighbor (inner product) cho item factors V
+
+Các backend có chung interface search(query, k, nprobe, exclude):
+
+- exact: nhân ma trận với toàn bộ vector (chính xác, O(N·d) mỗi query)
+- ivf: inverted file bằng NumPy — k-means chia vector thành nlist cụm, mỗi
+  query chỉ chấm điểm các vector thuộc nprobe cụm gần nhất. nprobe là núm
+  điều chỉnh recall/latency (nprobe = nlist tương đương exact)
+- faiss: IndexIVFFlat của faiss (optional, cần cài faiss-cpu)
+
+Index được build offline (build_ann.py) và lưu thành thư mục .npy + meta.json.
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from ranking import top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+META_FILENAME = "meta.json"
+VECTORS_FILENAME = "vectors.npy"
+CENTROIDS_FILENAME = "centroids.npy"
+LIST_OFFSETS_FILENAME = "list_offsets.npy"
+LIST_IDS_FILENAME = "list_ids.npy"
+FAISS_FILENAME = "faiss.index"
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+
+def _as_float32(vectors: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+
+
+def _top_k_with_exclusion(scores: np.ndarray, ids: np.ndarray, k: int, exclude: Optional[Iterable[int]]) -> SearchResult:
+    """Top-k trên một tập ứng viên (ids, scores), bỏ các id trong exclude"""
+    mask = np.isin(ids, np.fromiter(exclude, dtype=np.int64)) if exclude is not None else None
+    order = select_top_k(scores, k, exclude=mask)
+    return ids[order].astype(np.int64), scores[order].astype(np.float32)
+
+
+class ExactIndex:
+    """Tìm kiếm chính xác: chấm điểm với toàn bộ vector"""
+    
+    backend = "exact"
+    
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+    
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+    
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, **params) -> "ExactIndex":
+        return cls(_as_float32(vectors))
+    
+    def search(self,
+               query: np.ndarray,
+               k: int,
+               nprobe: Optional[int] = None,
+               exclude: Optional[Iterable[int]] = None) -> SearchResult:
+        scores = np.asarray(self.vectors @ np.asarray(query, dtype=np.float32), dtype=np.float64)
+        return _top_k_with_exclusion(scores, np.arange(len(self)), k, exclude)
+    
+    def _save_arrays(self, index_dir: str):
+        np.save(os.path.join(index_dir, VECTORS_FILENAME), self.vectors)
+    
+    def _meta(self) -> Dict[str, Any]:
+        return {}
+    
+    @classmethod
+    def _load(cls, index_dir: str, meta: Dict[str, Any], mmap_mode: Optional[str]) -> "ExactIndex":
+        return cls(np.load(os.path.join(index_dir, VECTORS_FILENAME), mmap_mode=mmap_mode))
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted file index thuần NumPy
+    
+    - centroids: (nlist, d) tâm cụm k-means (gán cụm theo inner product)
+    - list_offsets: (nlist + 1,) vị trí bắt đầu của từng cụm trong list_ids
+    - list_ids: (N,) chỉ số vector, gom theo cụm
+    """
+    
+    backend = "ivf"
+    
+    def __init__(self,
+                 vectors: np.ndarray,
+                 centroids: np.ndarray,
+                 list_offsets: np.ndarray,
+                 list_ids: np.ndarray,
+                 default_nprobe: int = 8):
+        super().__init__(vectors)
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.default_nprobe = default_nprobe
+    
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+    
+    @staticmethod
+    def default_nlist(n: int) -> int:
+        return int(max(1, min(n, round(4 * np.sqrt(n)))))
+    
+    @staticmethod
+    def _kmeans(vectors: np.ndarray, nlist: int, n_iter: int, sample_size: int, seed: int) -> np.ndarray:
+        """K-means (Lloyd) trên một mẫu vector, gán cụm theo inner product"""
+        rng = np.random.default_rng(seed)
+        n = vectors.shape[0]
+        sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        
+        for _ in range(n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(assign, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # Cụm rỗng được khởi tạo lại bằng một điểm ngẫu nhiên
+            if empty.any():
+                centroids[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        
+        return centroids
+    
+    @classmethod
+    def build(cls,
+              vectors: np.ndarray,
+              nlist: Optional[int] = None,
+              nprobe: int = 8,
+              n_iter: int = 20,
+              sample_size: int = 100000,
+              seed: int = 42,
+              chunk_size: int = 65536,
+              **params) -> "IVFIndex":
+        vectors = _as_float32(vectors)
+        n = vectors.shape[0]
+        nlist = min(nlist or cls.default_nlist(n), n)
+        
+        centroids = cls._kmeans(vectors, nlist, n_iter, sample_size, seed)
+        
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            block = vectors[start:start + chunk_size]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        
+        list_ids = np.argsort(assign, kind="stable").astype(np.int32)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=list_offsets[1:])
+        
+        logger.info(f"Built IVF index: {n} vectors, {nlist} lists, dim={vectors.shape[1]}")
+        return cls(vectors, centroids, list_offsets, list_ids, default_nprobe=nprobe)
+    
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = select_top_k(self.centroids @ query, min(nprobe, self.nlist))
+        starts = self.list_offsets[probes]
+        ends = self.list_offsets[probes + 1]
+        return np.concatenate([self.list_ids[s:e] for s, e in zip(starts, ends)]) \
+            if len(probes) else np.zeros(0, dtype=np.int32)
+    
+    def search(self,
+               query: np.ndarray,
+               k: int,
+               nprobe: Optional[int] = None,
+               exclude: Optional[Iterable[int]] = None) -> SearchResult:
+        query = np.asarray(query, dtype=np.float32)
+        candidates = self._candidates(query, nprobe or self.default_nprobe)
+        scores = np.asarray(self.vectors[candidates] @ query, dtype=np.float64)
+        return _top_k_with_exclusion(scores, candidates, k, exclude)
+    
+    def _save_arrays(self, index_dir: str):
+        super()._save_arrays(index_dir)
+        np.save(os.path.join(index_dir, CENTROIDS_FILENAME), self.centroids)
+        np.save(os.path.join(index_dir, LIST_OFFSETS_FILENAME), self.list_offsets)
+        np.save(os.path.join(index_dir, LIST_IDS_FILENAME), self.list_ids)
+    
+    def _meta(self) -> Dict[str, Any]:
+        return {"nlist": self.nlist, "nprobe": self.default_nprobe}
+    
+    @classmethod
+    def _load(cls, index_dir: str, meta: Dict[str, Any], mmap_mode: Optional[str]) -> "IVFIndex":
+        return cls(
+            np.load(os.path.join(index_dir, VECTORS_FILENAME), mmap_mode=mmap_mode),
+            np.load(os.path.join(index_dir, CENTROIDS_FILENAME)),
+            np.load(os.path.join(index_dir, LIST_OFFSETS_FILENAME)),
+            np.load(os.path.join(index_dir, LIST_IDS_FILENAME), mmap_mode=mmap_mode),
+            default_nprobe=meta.get("nprobe", 8)
+        )
+
+
+def _import_faiss():
+    try:
+        import faiss
+    except ImportError as e:
+        raise RuntimeError("faiss backend requires faiss (pip install faiss-cpu)") from e
+    return faiss
+
+
+class FaissIVFIndex(ExactIndex):
+    """IndexIVFFlat (inner product) của faiss; vectors được giữ lại để lấy lại vector theo id"""
+    
+    backend = "faiss"
+    
+    def __init__(self, vectors: np.ndarray, index, default_nprobe: int = 8):
+        super().__init__(vectors)
+        self.index = index
+        self.default_nprobe = default_nprobe
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: Optional[int] = None, nprobe: int = 8, **params) -> "FaissIVFIndex":
+        faiss = _import_faiss()
+        vectors = _as_float32(vectors)
+        nlist = min(nlist or IVFIndex.default_nlist(len(vectors)), len(vectors))
+        
+        quantizer = faiss.IndexFlatIP(vectors.shape[1])
+        index = faiss.IndexIVFFlat(quantizer, vectors.shape[1], nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        logger.info(f"Built faiss IVF index: {len(vectors)} vectors, {nlist} lists")
+        return cls(vectors, index, default_nprobe=nprobe)
+    
+    def search(self,
+               query: np.ndarray,
+               k: int,
+               nprobe: Optional[int] = None,
+               exclude: Optional[Iterable[int]] = None) -> SearchResult:
+        exclude = set(int(i) for i in exclude) if exclude is not None else set()
+        self.index.nprobe = nprobe or self.default_nprobe
+        scores, ids = self.index.search(np.asarray(query, dtype=np.float32)[None, :], k + len(exclude))
+        keep = [(i, s) for i, s in zip(ids[0], scores[0]) if i >= 0 and int(i) not in exclude][:k]
+        return (np.array([i for i, _ in keep], dtype=np.int64),
+                np.array([s for _, s in keep], dtype=np.float32))
+    
+    def _save_arrays(self, index_dir: str):
+        super()._save_arrays(index_dir)
+        _import_faiss().write_index(self.index, os.path.join(index_dir, FAISS_FILENAME))
+    
+    def _meta(self) -> Dict[str, Any]:
+        return {"nlist": int(self.index.nlist), "nprobe": self.default_nprobe}
+    
+    @classmethod
+    def _load(cls, index_dir: str, meta: Dict[str, Any], mmap_mode: Optional[str]) -> "FaissIVFIndex":
+        index = _import_faiss().read_index(os.path.join(index_dir, FAISS_FILENAME))
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILENAME), mmap_mode=mmap_mode)
+        return cls(vectors, index, default_nprobe=meta.get("nprobe", 8))
+
+
+BACKENDS = {cls.backend: cls for cls in (ExactIndex, IVFIndex, FaissIVFIndex)}
+
+
+def build_index(vectors: np.ndarray, backend: str = "ivf", **params):
+    """Build index với backend "exact" | "ivf" | "faiss" """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ANN backend: {backend} (available: {', '.join(BACKENDS)})")
+    return BACKENDS[backend].build(vectors, **params)
+
+
+def save_index(index, index_dir: str):
+    os.makedirs(index_dir, exist_ok=True)
+    index._save_arrays(index_dir)
+    meta = {"backend": index.backend, "size": len(index), "dim": index.dim, **index._meta()}
+    with open(os.path.join(index_dir, META_FILENAME), "w") as f:
+        json.dump(meta, f, indent=2)
+    logger.info(f"Saved {index.backend} index to {index_dir}")
+
+
+def index_exists(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, META_FILENAME))
+
+
+def load_index(index_dir: str, mmap_mode: Optional[str] = "r"):
+    """Load index đã lưu; các mảng lớn được memory-map"""
+    with open(os.path.join(index_dir, META_FILENAME)) as f:
+        meta = json.load(f)
+    backend = meta.get("backend")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ANN backend in {index_dir}: {backend}")
+    return BACKENDS[backend]._load(index_dir, meta, mmap_mode)
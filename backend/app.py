@@ -1,13 +1,25 @@
 import os
+import io
+import csv
+import base64
+import json
+import hmac
+import time
 import logging
-from flask import Flask, request, jsonify
+import threading
+import numpy as np
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 from functools import wraps
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlencode
 from config import config
-from data_mapper import ProductDataMapper
-from models_service import ModelsService
+from ranking import top_k as select_top_k
+from response_cache import ResponseCache, CachedResponse
+from serialization import FastJSONProvider, choose_encoding, compress
+
+_import_started = time.perf_counter()
 
 # Setup logging
 logging.basicConfig(
@@ -18,6 +30,7 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Load config
 env = os.getenv("FLASK_ENV", "development")
@@ -29,29 +42,461 @@ CORS(app,
      allow_headers=["Content-Type"],
      methods=["GET", "POST", "OPTIONS"])
 
-# Global services
+# Global services (khởi tạo lazily, thread-safe qua các hàm get_*)
 data_mapper = None
 models_service = None
+artifacts = None
+semantic_retriever = None
+# Version (artifacts.artifact_version) của catalog + model đang phục vụ
+loaded_version: Optional[Dict[str, Any]] = None
+
+class ServiceUnavailableError(RuntimeError):
+    """Service chưa sẵn sàng hoặc khởi tạo thất bại"""
+
+_services_lock = threading.RLock()
+_startup_timings: Dict[str, float] = {}
+_service_errors: Dict[str, str] = {}
+# Thời điểm (time.monotonic) sớm nhất được thử khởi tạo lại component đã lỗi
+_service_retry_at: Dict[str, float] = {}
+
+def _init_component(name: str, factory: Callable[[], Any]) -> Optional[Any]:
+    """Khởi tạo một component, ghi lại thời gian và lỗi (nếu có) để báo cáo readiness"""
+    started = time.perf_counter()
+    try:
+        component = factory()
+        _service_errors.pop(name, None)
+        _service_retry_at.pop(name, None)
+        logger.info(f"{name} initialized in {time.perf_counter() - started:.3f}s")
+        return component
+    except Exception as e:
+        interval = app.config['SERVICE_RETRY_INTERVAL']
+        _service_errors[name] = str(e)
+        _service_retry_at[name] = time.monotonic() + interval if interval > 0 else float("inf")
+        logger.error(f"Failed to initialize {name}: {str(e)}")
+        return None
+    finally:
+        _startup_timings[name] = round(time.perf_counter() - started, 4)
+
+def _can_init(name: str) -> bool:
+    """Component chưa từng lỗi, hoặc đã hết thời gian chờ SERVICE_RETRY_INTERVAL kể từ lần lỗi trước"""
+    return time.monotonic() >= _service_retry_at.get(name, 0.0)
+
+def _retry_in() -> Dict[str, Optional[float]]:
+    """Số giây còn lại trước lần thử khởi tạo lại của từng component lỗi (None = chỉ khi reload)"""
+    now = time.monotonic()
+    return {
+        name: round(max(0.0, retry_at - now), 1) if retry_at != float("inf") else None
+        for name, retry_at in _service_retry_at.items()
+    }
+
+def _current_artifact_version() -> Dict[str, Any]:
+    """Version của catalog + model artifact hiện có trên disk (manifest.json + fingerprint)"""
+    from artifacts import artifact_version, default_manifest_path, default_ann_dir
+    model_path = app.config['RECOMMENDATION_MODEL_PATH']
+    return artifact_version(default_manifest_path(model_path), [
+        app.config['DATA_PATH'],
+        app.config['CATALOG_PATH'],
+        app.config['PRICE_MODEL_PATH'],
+        model_path,
+        app.config['RECOMMENDATION_ARRAYS_DIR'],
+        default_ann_dir(model_path),
+        app.config['RAG_MODEL_DIR']
+    ])
+
+def _derived_artifact_status() -> Dict[str, Optional[str]]:
+    """Artifact dẫn xuất nào đang lỗi thời so với file nguồn (None = khớp hoặc không có)"""
+    from artifacts import arrays_stale_reason
+    from catalog_store import catalog_stale_reason
+    arrays_dir = app.config['RECOMMENDATION_ARRAYS_DIR']
+    catalog_path = app.config['CATALOG_PATH']
+    return {
+        "recommendation_arrays": arrays_stale_reason(app.config['RECOMMENDATION_MODEL_PATH'], arrays_dir)
+        if os.path.isdir(arrays_dir) else None,
+        "catalog": catalog_stale_reason(catalog_path, app.config['DATA_PATH'])
+        if os.path.exists(catalog_path) else None
+    }
+
+def _create_data_mapper():
+    from data_mapper import ProductDataMapper
+    return ProductDataMapper(app.config['DATA_PATH'], catalog_path=app.config['CATALOG_PATH'])
+
+def _create_models_service(recommendation_artifacts: Optional[Dict[str, Any]] = None):
+    from models_service import ModelsService
+    return ModelsService(
+        app.config['PRICE_MODEL_PATH'],
+        app.config['RECOMMENDATION_MODEL_PATH'],
+        app.config['RECOMMENDATION_ARRAYS_DIR'],
+        ann_nprobe=app.config['ANN_NPROBE'],
+        ann_min_items=app.config['ANN_MIN_ITEMS'],
+        recommendation_artifacts=recommendation_artifacts
+    )
+
+def _create_semantic_retriever(mapper, previous=None):
+    """SemanticRetriever cho catalog của mapper; dùng lại encoder/reranker của previous nếu model không đổi"""
+    from retrieval import SemanticRetriever, load_metadata, product_context
+    encoder = reranker = None
+    if previous is not None:
+        metadata = load_metadata(app.config['RAG_MODEL_DIR'])
+        if metadata.get("embedding_model") == previous.metadata.get("embedding_model"):
+            encoder = previous.encoder
+        if metadata.get("reranker_model") == previous.metadata.get("reranker_model"):
+            reranker = previous.reranker
+    
+    return SemanticRetriever(
+        app.config['RAG_MODEL_DIR'],
+        encoder=encoder,
+        encoder_name=app.config['RAG_QUERY_ENCODER'],
+        top_k_dense=app.config['RAG_TOP_K_DENSE'],
+        top_k_sparse=app.config['RAG_TOP_K_SPARSE'],
+        vector_store_dir=app.config['RAG_VECTOR_STORE_DIR'],
+        rescore_factor=app.config['RAG_RESCORE_FACTOR'],
+        reranker=reranker,
+        reranker_name=app.config['RAG_RERANKER'],
+        product_ids=mapper.df['product_id'].tolist(),
+        document_text=lambda pid: product_context(mapper.get_product_by_id(pid) or {}),
+        rerank_candidates=app.config['RAG_RERANK_CANDIDATES'],
+        rerank_budget_ms=app.config['RAG_RERANK_BUDGET_MS'],
+        embedding_cache_size=app.config['RAG_EMBEDDING_CACHE_SIZE'],
+        batch_window_ms=app.config['RAG_BATCH_WINDOW_MS'],
+        max_batch_size=app.config['RAG_MAX_BATCH_SIZE']
+    )
+
+def get_data_mapper():
+    """Lấy ProductDataMapper, khởi tạo ở lần gọi đầu tiên (lỗi thì thử lại sau SERVICE_RETRY_INTERVAL giây)"""
+    global data_mapper, loaded_version
+    if data_mapper is None:
+        with _services_lock:
+            if data_mapper is None and _can_init("data_mapper"):
+                # Version được ghi trước khi load: artifact thay đổi trong lúc load sẽ được reload sau
+                if loaded_version is None:
+                    loaded_version = _current_artifact_version()
+                data_mapper = _init_component("data_mapper", _create_data_mapper)
+                if data_mapper is not None:
+                    app.json.register_payloads(data_mapper.product_payloads)
+        if data_mapper is None:
+            raise ServiceUnavailableError(f"Data mapper not available: {_service_errors.get('data_mapper')}")
+    return data_mapper
+
+def get_artifacts() -> Dict[str, Any]:
+    """
+    Lấy recommendation artifacts từ registry (load một lần, dùng chung với ModelsService)
+    
+    Lỗi khi load thì các lần gọi trong SERVICE_RETRY_INTERVAL giây sau trả 503 ngay, sau đó thử lại.
+    """
+    global artifacts
+    if artifacts is None:
+        with _services_lock:
+            if artifacts is None and _can_init("recommendation_artifacts"):
+                from artifacts import get_recommendation_artifacts
+                artifacts = _init_component(
+                    "recommendation_artifacts",
+                    lambda: get_recommendation_artifacts(
+                        app.config['RECOMMENDATION_MODEL_PATH'],
+                        app.config['RECOMMENDATION_ARRAYS_DIR'],
+                        top_n=app.config['CONTENT_NEIGHBORS_TOP_N']
+                    )
+                )
+        if artifacts is None:
+            raise ServiceUnavailableError(
+                f"Recommendation artifacts not available: {_service_errors.get('recommendation_artifacts')}"
+            )
+    return artifacts
+
+def get_models_service():
+    """Lấy ModelsService, khởi tạo ở lần gọi đầu tiên (None nếu thất bại, thử lại sau SERVICE_RETRY_INTERVAL giây)"""
+    global models_service
+    if models_service is None:
+        with _services_lock:
+            if models_service is None and _can_init("models_service"):
+                models_service = _init_component("models_service", _create_models_service)
+    return models_service
+
+def get_semantic_retriever():
+    """Lấy SemanticRetriever (optional: cần artifact RAG và query encoder; lỗi thì thử lại sau SERVICE_RETRY_INTERVAL giây)"""
+    global semantic_retriever
+    if semantic_retriever is None:
+        with _services_lock:
+            if semantic_retriever is None and _can_init("semantic_retriever"):
+                mapper = get_data_mapper()
+                semantic_retriever = _init_component(
+                    "semantic_retriever", lambda: _create_semantic_retriever(mapper)
+                )
+        if semantic_retriever is None:
+            raise ServiceUnavailableError(
+                f"Semantic retriever not available: {_service_errors.get('semantic_retriever')}"
+            )
+    return semantic_retriever
 
 def init_services():
-    """Initialize services khi app start"""
-    global data_mapper, models_service
+    """Initialize tất cả services ngay (warm-up), thay vì đợi request đầu tiên"""
+    started = time.perf_counter()
     
+    for getter in (get_data_mapper, get_artifacts, get_models_service, get_semantic_retriever):
+        try:
+            getter()
+        except ServiceUnavailableError as e:
+            logger.error(str(e))
+    
+    _startup_timings["total_init"] = round(time.perf_counter() - started, 4)
+    logger.info(f"Startup timings (s): {_startup_timings}")
+
+def services_ready() -> bool:
+    """Tất cả component đã được khởi tạo thành công"""
+    return data_mapper is not None and artifacts is not None and models_service is not None
+
+_reload_lock = threading.Lock()
+_reload_status: Dict[str, Any] = {
+    "state": "idle",
+    "reloads": 0,
+    "last_reload_at": None,
+    "last_duration": None,
+    "last_error": None
+}
+
+def reload_services(force: bool = False) -> Dict[str, Any]:
+    """
+    Hot reload catalog + model artifact (amazon.csv, xgboost_model.joblib, hybrid_model.joblib, RAG)
+    
+    Bản mới được build ngoài _services_lock trong khi request vẫn được phục vụ bằng bản cũ,
+    sau đó mọi global được thay cùng lúc. Request đang chạy giữ reference tới bản cũ nên
+    không bị lỗi. Build thất bại thì giữ nguyên bản đang phục vụ; riêng semantic search
+    (optional) thì giữ retriever cũ. Không reload nếu fingerprint không đổi, trừ khi force.
+    
+    arrays/ và catalog Feather chỉ được dùng nếu dấu nguồn khớp với hybrid_model.joblib /
+    amazon.csv hiện tại, nếu không thì load thẳng từ file nguồn (xem source_stamp.py).
+    """
+    with _reload_lock:
+        return _reload_locked(force)
+
+def _reload_locked(force: bool) -> Dict[str, Any]:
+    """Thân của reload_services, caller phải đang giữ _reload_lock"""
+    global data_mapper, artifacts, models_service, semantic_retriever, loaded_version
+    version = _current_artifact_version()
+    if not force and loaded_version is not None and version["fingerprint"] == loaded_version["fingerprint"]:
+        return {"reloaded": False, "version": loaded_version["version"]}
+    
+    _reload_status["state"] = "running"
+    started = time.perf_counter()
     try:
-        data_mapper = ProductDataMapper(app.config['DATA_PATH'])
-        logger.info("Data mapper initialized")
+        from artifacts import load_recommendation_artifacts, register_recommendation_artifacts
+        new_mapper = _create_data_mapper()
+        new_artifacts = load_recommendation_artifacts(
+            app.config['RECOMMENDATION_MODEL_PATH'],
+            app.config['RECOMMENDATION_ARRAYS_DIR'],
+            top_n=app.config['CONTENT_NEIGHBORS_TOP_N']
+        )
+        new_models_service = _create_models_service(new_artifacts)
+        # ModelsService chỉ log lỗi khi load: không swap sang bản mất price model
+        if new_models_service.price_model is None:
+            raise RuntimeError(f"Price model not loaded from {app.config['PRICE_MODEL_PATH']}")
     except Exception as e:
-        logger.error(f"Failed to initialize data mapper: {str(e)}")
+        _reload_status.update(state="idle", last_error=str(e))
+        logger.error(f"Reload to version {version['version']} failed, keeping current version: {str(e)}")
         raise
     
+    # Retriever chưa được dùng (lazy) thì để lần gọi get_semantic_retriever() sau tạo mới
+    previous_retriever = semantic_retriever
+    new_retriever = None
+    if previous_retriever is not None:
+        try:
+            new_retriever = _create_semantic_retriever(new_mapper, previous=previous_retriever)
+        except Exception as e:
+            logger.warning(f"Semantic retriever not reloaded, keeping previous one: {str(e)}")
+            new_retriever = previous_retriever
+    
+    with _services_lock:
+        app.json.register_payloads(new_mapper.product_payloads)
+        register_recommendation_artifacts(app.config['RECOMMENDATION_MODEL_PATH'], new_artifacts)
+        data_mapper = new_mapper
+        artifacts = new_artifacts
+        models_service = new_models_service
+        semantic_retriever = new_retriever
+        loaded_version = version
+        for name in ("data_mapper", "recommendation_artifacts", "models_service", "semantic_retriever"):
+            _service_errors.pop(name, None)
+            _service_retry_at.pop(name, None)
+    
+    # Response đã cache (và embedding cache của retriever cũ) thuộc về version trước
+    response_cache.clear()
+    if previous_retriever is not None and previous_retriever is not new_retriever:
+        previous_retriever.close()
+    
+    duration = round(time.perf_counter() - started, 4)
+    _reload_status.update(
+        state="idle",
+        reloads=_reload_status["reloads"] + 1,
+        last_reload_at=datetime.utcnow().isoformat(),
+        last_duration=duration,
+        last_error=None
+    )
+    logger.info(f"Reloaded services to version {version['version']} in {duration:.3f}s")
+    return {"reloaded": True, "version": version["version"], "duration": duration}
+
+def _reload_in_background(force: bool):
+    # _reload_lock đã được start_reload lấy trước, thread này chịu trách nhiệm release
     try:
-        models_service = ModelsService(
-            app.config['PRICE_MODEL_PATH'],
-            app.config['RECOMMENDATION_MODEL_PATH']
-        )
-        logger.info("Models service initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize models service: {str(e)}")
+        _reload_locked(force)
+    except Exception:
+        pass  # đã ghi vào _reload_status và log
+    finally:
+        _reload_lock.release()
+
+def start_reload(force: bool = False) -> bool:
+    """Chạy reload trong thread nền, False nếu đang có reload khác"""
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        threading.Thread(target=_reload_in_background, args=(force,), name="artifact-reload", daemon=True).start()
+    except Exception:
+        _reload_lock.release()
+        raise
+    return True
+
+def _watch_artifacts(interval: int):
+    """
+    Kiểm tra version artifact định kỳ và reload khi có version mới
+    
+    Chỉ reload khi fingerprint mới giữ nguyên qua hai lần kiểm tra liên tiếp, để không
+    load artifact của một lần build offline chưa chạy xong. Fingerprint đã reload thất
+    bại bị bỏ qua cho đến khi artifact thay đổi tiếp (reload thủ công vẫn được).
+    """
+    pending = None
+    failed = None
+    while True:
+        time.sleep(interval)
+        if loaded_version is None:
+            continue
+        try:
+            fingerprint = _current_artifact_version()["fingerprint"]
+            if fingerprint in (loaded_version["fingerprint"], failed):
+                pending = None
+            elif fingerprint == pending:
+                pending = None
+                try:
+                    reload_services()
+                except Exception:
+                    failed = fingerprint
+                    logger.error(f"Artifact watcher: skipping fingerprint {fingerprint} until artifacts change")
+            else:
+                pending = fingerprint
+        except Exception as e:
+            logger.error(f"Artifact watcher failed: {str(e)}")
+
+def start_services(mode: str):
+    """
+    Khởi tạo services theo startup mode:
+        - eager: khởi tạo đồng bộ trước khi nhận request
+        - background: khởi tạo trong thread nền, /api/health phản hồi ngay
+        - lazy: khởi tạo ở request đầu tiên cần đến service
+    """
+    if mode == "eager":
+        init_services()
+    elif mode == "background":
+        threading.Thread(target=init_services, name="service-init", daemon=True).start()
+    elif mode != "lazy":
+        raise ValueError(f"Unknown SERVICE_INIT_MODE: {mode}")
+    
+    interval = app.config['RELOAD_POLL_INTERVAL']
+    if interval > 0:
+        threading.Thread(target=_watch_artifacts, args=(interval,), name="artifact-watcher", daemon=True).start()
+
+# Response cache cho các endpoint đọc (TTL = CACHE_TIMEOUT, LRU theo số entry và số byte)
+response_cache = ResponseCache(
+    ttl=app.config['CACHE_TIMEOUT'],
+    max_entries=app.config['CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['CACHE_MAX_BYTES']
+)
+
+def _cache_key() -> str:
+    """Key cache: path + query params đã chuẩn hóa (bỏ giá trị rỗng, sắp xếp) + JSON body"""
+    params = sorted(
+        (name, value.strip())
+        for name, values in request.args.lists()
+        for value in values
+        if value.strip()
+    )
+    key = f"{request.path}?{urlencode(params)}"
+    
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        key += "#" + json.dumps(body, sort_keys=True, separators=(',', ':'))
+    
+    return key
+
+def _negotiate_encoding(body: bytes, mimetype: str) -> Optional[str]:
+    """Encoding nén cho body theo cấu hình và Accept-Encoding của request, None nếu không nén"""
+    if (not app.config['COMPRESS_ENABLED']
+            or mimetype != 'application/json'
+            or len(body) < app.config['COMPRESS_MIN_SIZE']):
+        return None
+    return choose_encoding(request.headers.get('Accept-Encoding', ''))
+
+def _set_encoded_body(response: Response, data: bytes, encoding: str):
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    
+    # ETag tính trên body chưa nén: đánh dấu weak để dùng chung cho mọi encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+def _cached_to_response(key: str, entry: CachedResponse, cache_status: str) -> Response:
+    """
+    Dựng response từ entry cache, trả 304 nếu If-None-Match khớp ETag
+    
+    Bản nén theo từng encoding được cache cùng entry: chỉ lần đầu mỗi encoding phải nén.
+    """
+    response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    
+    encoding = _negotiate_encoding(entry.body, entry.mimetype)
+    if encoding is not None:
+        data = response_cache.get_variant(entry, encoding)
+        if data is None:
+            data = compress(entry.body, encoding, app.config['COMPRESS_LEVEL'])
+            response_cache.add_variant(key, entry, encoding, data)
+        _set_encoded_body(response, data, encoding)
+    
+    max_age = max(0, int(entry.expires_at - time.monotonic()))
+    response.headers['Cache-Control'] = f"public, max-age={max_age}"
+    response.headers['X-Cache'] = cache_status
+    return response.make_conditional(request)
+
+def cached_response(func):
+    """Decorator cache response 200 của các endpoint đọc, hỗ trợ ETag/If-None-Match"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not app.config['CACHE_ENABLED']:
+            return func(*args, **kwargs)
+        
+        key = _cache_key()
+        entry = response_cache.get(key)
+        if entry is not None:
+            return _cached_to_response(key, entry, "HIT")
+        
+        response = app.make_response(func(*args, **kwargs))
+        # Handler đánh dấu no-store cho kết quả tạm (vd. rerank quá hạn) → không cache
+        if response.status_code != 200 or response.cache_control.no_store:
+            return response
+        
+        entry = response_cache.set(key, response.get_data(), response.status_code, response.mimetype)
+        return _cached_to_response(key, entry, "MISS")
+    return wrapper
+
+@app.after_request
+def compress_response(response):
+    """Nén response JSON chưa qua cache (gzip, hoặc brotli nếu client hỗ trợ và đã cài)"""
+    if (response.direct_passthrough
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    body = response.get_data()
+    encoding = _negotiate_encoding(body, response.mimetype)
+    if encoding is not None:
+        _set_encoded_body(response, compress(body, encoding, app.config['COMPRESS_LEVEL']), encoding)
+    return response
 
 def error_handler(func):
     """Decorator để handle errors trong routes"""
@@ -63,6 +508,9 @@ def error_handler(func):
             return jsonify({"error": f"Invalid input: {str(e)}"}), 400
         except KeyError as e:
             return jsonify({"error": f"Missing required field: {str(e)}"}), 400
+        except ServiceUnavailableError as e:
+            logger.error(f"Service unavailable in {func.__name__}: {str(e)}")
+            return jsonify({"error": "Service not available"}), 503
         except Exception as e:
             logger.error(f"Unhandled error in {func.__name__}: {str(e)}")
             return jsonify({"error": "Internal server error"}), 500
@@ -70,29 +518,94 @@ def error_handler(func):
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Liveness check: không chạm vào services nên luôn phản hồi ngay"""
     return jsonify({
         "status": "healthy",
+        "ready": services_ready(),
+        "version": loaded_version["version"] if loaded_version is not None else None,
         "timestamp": datetime.utcnow().isoformat(),
         "environment": app.config['ENV']
     }), 200
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Readiness check: 200 khi mọi service đã sẵn sàng, 503 nếu chưa"""
+    components = {
+        "data_mapper": data_mapper is not None,
+        "recommendation_artifacts": artifacts is not None,
+        "models_service": models_service is not None
+    }
+    ready = all(components.values())
+    # Semantic search là optional, không ảnh hưởng readiness
+    components["semantic_retriever"] = semantic_retriever is not None
+    
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "components": components,
+        "errors": _service_errors,
+        "retry_in": _retry_in(),
+        "startup_timings": _startup_timings,
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200 if ready else 503
+
+def _encode_cursor(offset: int) -> str:
+    """Cursor phân trang dạng opaque (base64 của offset)"""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, offset = raw.split(":", 1)
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def _read_pagination() -> Tuple[int, int]:
+    """Đọc limit/offset (hoặc cursor) từ query, giới hạn bởi DEFAULT_PAGE_SIZE/MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', app.config['DEFAULT_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['MAX_PAGE_SIZE']))
+    
+    cursor = request.args.get('cursor', '').strip()
+    if cursor:
+        offset = _decode_cursor(cursor)
+    else:
+        offset = request.args.get('offset', 0, type=int)
+        if offset < 0:
+            raise ValueError("offset cannot be negative")
+    
+    return limit, offset
+
 @app.route('/api/products', methods=['GET'])
+@cached_response
 @error_handler
 def get_products():
     """
     Lấy danh sách products
     
     Query parameters:
-        - limit: Số lượng products (default: 20, max: 100)
+        - limit: Số lượng products mỗi trang (default: DEFAULT_PAGE_SIZE, max: MAX_PAGE_SIZE)
+        - offset: Vị trí bắt đầu (default: 0)
+        - cursor: Cursor trả về từ trang trước (thay cho offset)
         - search: Tìm kiếm theo tên/category
         - category: Lọc theo category
         - min_price: Giá tối thiểu
         - max_price: Giá tối đa
         - min_rating: Đánh giá tối thiểu
+        - sort: price | rating | rating_count | discount_percentage (không áp dụng cho search)
+        - order: asc | desc (default: desc)
+        - facets: true để kèm facet category và histogram giá
+        - facet_depth: Cấp category dùng cho facet (default: 1)
+        - bins: Số cột histogram giá (default: 10, max: 50)
     """
-    limit = request.args.get('limit', 20, type=int)
-    limit = min(limit, app.config['MAX_PAGE_SIZE'])
+    limit, offset = _read_pagination()
+    
+    sort_by = request.args.get('sort', '').strip() or None
+    order = request.args.get('order', 'desc').strip().lower()
+    include_facets = request.args.get('facets', '').strip().lower() in ('1', 'true', 'yes')
+    facet_depth = request.args.get('facet_depth', 1, type=int)
+    bins = request.args.get('bins', 10, type=int)
     
     search = request.args.get('search', '').strip()
     category = request.args.get('category', '').strip()
@@ -107,30 +620,58 @@ def get_products():
         return jsonify({"error": "max_price cannot be negative"}), 400
     if min_rating is not None and not (0 <= min_rating <= 5):
         return jsonify({"error": "min_rating must be between 0 and 5"}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+    if facet_depth < 1:
+        return jsonify({"error": "facet_depth must be >= 1"}), 400
+    if not (1 <= bins <= 50):
+        return jsonify({"error": "bins must be between 1 and 50"}), 400
     
     # Get products
     if search:
-        products = data_mapper.search_products(search, limit=limit)
+        # Search trả về top kết quả theo BM25, trang được cắt từ danh sách đã xếp hạng
+        ranked = get_data_mapper().search_products(search, limit=offset + limit)
+        page = {"items": ranked[offset:], "total": None, "offset": offset, "limit": limit}
+        has_more = len(ranked) == offset + limit
     else:
-        products = data_mapper.filter_products(
+        page = get_data_mapper().query_products(
             category=category if category else None,
             min_price=min_price,
             max_price=max_price,
             min_rating=min_rating,
-            limit=limit
+            offset=offset,
+            limit=limit,
+            sort_by=sort_by,
+            descending=order == 'desc',
+            include_facets=include_facets,
+            facet_depth=facet_depth,
+            histogram_bins=bins
         )
+        has_more = offset + limit < page["total"]
     
-    return jsonify({
+    products = page["items"]
+    response = {
         "data": products,
         "count": len(products),
+        "pagination": {
+            "total": page["total"],
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": _encode_cursor(offset + limit) if has_more else None
+        },
         "timestamp": datetime.utcnow().isoformat()
-    }), 200
+    }
+    if "facets" in page:
+        response["facets"] = page["facets"]
+    
+    return jsonify(response), 200
 
 @app.route('/api/products/<product_id>', methods=['GET'])
+@cached_response
 @error_handler
 def get_product_detail(product_id):
     """Lấy chi tiết một sản phẩm"""
-    product = data_mapper.get_product_by_id(product_id)
+    product = get_data_mapper().get_product_by_id(product_id)
     
     if not product:
         return jsonify({"error": "Product not found"}), 404
@@ -141,35 +682,41 @@ def get_product_detail(product_id):
     }), 200
 
 @app.route('/api/categories', methods=['GET'])
+@cached_response
 @error_handler
 def get_categories():
     """Lấy danh sách tất cả categories"""
-    categories = data_mapper.get_unique_categories()
+    mapper = get_data_mapper()
+    categories = mapper.get_unique_categories()
     
     return jsonify({
         "data": categories,
         "count": len(categories),
+        "product_counts": mapper.get_category_counts(depth=1),
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
-from joblib import load
-import numpy as np
-from scipy.sparse import csr_matrix
-import pandas as pd
-import math
-
-#
-artifacts = load(app.config['RECOMMENDATION_MODEL_PATH'])
-
-# Extract components
-user_encoder = artifacts["user_encoder"]
-product_encoder = artifacts["product_encoder"]
-U = artifacts["U"]
-V = artifacts["V"]
-content_pid2idx = artifacts["content_pid2idx"]
-content_idx2pid = artifacts["content_idx2pid"]
-content_similarity = artifacts["content_similarity"]
-pop_rank = artifacts["pop_rank"]
+@app.route('/api/categories/tree', methods=['GET'])
+@cached_response
+@error_handler
+def get_category_tree():
+    """
+    Cây category kèm số sản phẩm mỗi node (dùng cho faceting)
+    
+    Query parameters:
+        - depth: Độ sâu tối đa của cây (mặc định: toàn bộ)
+    """
+    depth = request.args.get('depth', type=int)
+    if depth is not None and depth < 1:
+        return jsonify({"error": "depth must be >= 1"}), 400
+    
+    tree = get_data_mapper().get_category_tree(max_depth=depth)
+    
+    return jsonify({
+        "data": tree,
+        "count": len(tree),
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200
 
 # ✅ ADAPTED TRAINING FUNCTIONS FOR PRODUCT-BASED RECOMMENDATIONS
 
@@ -179,16 +726,20 @@ def recommend_content_based_product(target_pid: str, k: int = 10) -> List[str]:
     
     Find products similar to target_pid
     """
-    if target_pid not in content_pid2idx:
+    artifacts = get_artifacts()
+    content_pid2idx = artifacts["content_pid2idx"]
+    content_idx2pid = artifacts["content_idx2pid"]
+    # Top-N neighbor table thay cho ma trận content_similarity dày N×N
+    content_neighbors = artifacts["content_neighbors"]
+    pop_rank = artifacts["pop_rank"]
+    
+    if target_pid not in content_pid2idx or content_neighbors is None:
         # Fallback to popularity
         return pop_rank[:k]
     
     idx = content_pid2idx[target_pid]
-    scores = list(enumerate(content_similarity[idx].toarray().flatten() if hasattr(content_similarity[idx], 'toarray') else content_similarity[idx]))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    
-    recs = [content_idx2pid[i] for i, _ in scores if i != idx]  # Exclude the product itself
-    return recs[:k]
+    top_indices, _ = content_neighbors.row(idx, k)  # The product itself is never in its neighbor list
+    return [content_idx2pid[int(i)] for i in top_indices]
 
 
 def recommend_hybrid_product(target_pids: List[str], k: int = 20, alpha: float = 0.5) -> List[str]:
@@ -196,37 +747,68 @@ def recommend_hybrid_product(target_pids: List[str], k: int = 20, alpha: float =
     ✅ HYBRID for PRODUCTS (not users)
     
     When user has products in cart, recommend similar products
+    
+    Toàn bộ giỏ hàng được xử lý cùng lúc: gather các dòng neighbor của mọi item,
+    cộng reciprocal rank bằng np.add.at, loại item trong giỏ bằng mask rồi lấy
+    top-k một lần duy nhất.
     """
-    # ✅ CONTENT-BASED: Get similar products for each cart item
-    content_candidates = {}
-    for pid in target_pids:
-        similar = recommend_content_based_product(pid, k=k*2)
-        for i, p in enumerate(similar):
-            # Give higher score to products appearing in multiple recommendations
-            content_candidates[p] = content_candidates.get(p, 0.0) + (1.0 / (i + 1))
+    artifacts = get_artifacts()
+    content_pid2idx = artifacts["content_pid2idx"]
+    content_idx2pid = artifacts["content_idx2pid"]
+    content_neighbors = artifacts["content_neighbors"]
+    pop_rank = artifacts["pop_rank"]
+    depth = k * 2
+    
+    # Không gian ứng viên: sản phẩm trong content model + sản phẩm phổ biến nằm ngoài model
+    popular = pop_rank[:depth]
+    extra_pids = [p for p in dict.fromkeys(popular) if p not in content_pid2idx]
+    extra_idx = {p: len(content_idx2pid) + i for i, p in enumerate(extra_pids)}
+    n_items = len(content_idx2pid) + len(extra_pids)
+    
+    def _index_of(pid: str) -> int:
+        return content_pid2idx.get(pid, extra_idx.get(pid, -1))
+    
+    pop_indices = np.array([_index_of(p) for p in popular], dtype=np.intp)
+    pop_weights = 1.0 / (np.arange(len(popular)) + 1)
+    
+    # ✅ CONTENT-BASED: reciprocal rank của top 2k neighbor của mọi item trong giỏ
+    content_scores = np.zeros(n_items, dtype=np.float64)
+    candidates = np.zeros(n_items, dtype=bool)
+    
+    seeds = [content_pid2idx[p] for p in target_pids if p in content_pid2idx] \
+        if content_neighbors is not None else []
+    if seeds:
+        scores, touched = content_neighbors.aggregate(seeds, depth, weighting="reciprocal_rank")
+        content_scores[:len(scores)] += scores
+        candidates[:len(touched)] |= touched
+    
+    # Item không có trong content model dùng danh sách phổ biến làm fallback
+    n_fallback = len(target_pids) - len(seeds)
+    if n_fallback and len(popular):
+        np.add.at(content_scores, pop_indices, n_fallback * pop_weights)
     
     # ✅ COLLABORATIVE: Get popular products (since no user context)
     # In production, you might have user interaction matrix
-    collab_candidates = {}
-    for i, p in enumerate(pop_rank[:k*2]):
-        collab_candidates[p] = (1.0 / (i + 1))
-    
-    # ✅ HYBRID SCORE: Combine content + collab
-    hybrid_scores = {}
-    for p in set(list(content_candidates.keys()) + list(collab_candidates.keys())):
-        if p not in target_pids:  # Don't recommend products already in cart
-            content_score = content_candidates.get(p, 0.0)
-            collab_score = collab_candidates.get(p, 0.0)
-            hybrid_scores[p] = alpha * content_score + (1.0 - alpha) * collab_score
+    collab_scores = np.zeros(n_items, dtype=np.float64)
+    collab_scores[pop_indices] = pop_weights
+    candidates[pop_indices] = True
+    
+    # ✅ HYBRID SCORE: Combine content + collab, don't recommend products already in cart
+    hybrid_scores = alpha * content_scores + (1.0 - alpha) * collab_scores
+    
+    exclude = ~candidates
+    cart_indices = [i for i in (_index_of(p) for p in target_pids) if i >= 0]
+    exclude[cart_indices] = True
     
     # Sort by score and return top k
-    recs = [p for p, _ in sorted(hybrid_scores.items(), key=lambda x: x[1], reverse=True)[:k]]
-    return recs
+    idx2pid = list(content_idx2pid) + extra_pids
+    return [idx2pid[int(i)] for i in select_top_k(hybrid_scores, k, exclude=exclude)]
 
 
 # ✅ BACKEND ENDPOINTS - Using Training Functions
 
 @app.route('/api/recommendations-for-product/<product_id>', methods=['GET'])
+@cached_response
 @error_handler  
 def get_product_recommendations(product_id):
     """
@@ -244,10 +826,7 @@ def get_product_recommendations(product_id):
     print(f"   📤 Returned {len(recommendations_pids)} product IDs")
     
     # Get full product data
-    all_products = data_mapper.get_all_products()
-    product_map = {p['product_id']: p for p in all_products}
-    
-    recommendations = [product_map[pid] for pid in recommendations_pids if pid in product_map]
+    recommendations = get_data_mapper().get_products_by_ids(recommendations_pids)
     
     return jsonify({
         "data": recommendations,
@@ -257,6 +836,7 @@ def get_product_recommendations(product_id):
 
 
 @app.route('/api/recommendations', methods=['POST'])
+@cached_response
 @error_handler
 def get_recommendations():
     """
@@ -269,13 +849,10 @@ def get_recommendations():
     print(f"\\n📥 POST /api/recommendations")
     print(f"   cart_items: {len(cart_items)}")
     
-    all_products = data_mapper.get_all_products()
-    product_map = {p['product_id']: p for p in all_products}
-    
     if not cart_items:
         # Empty cart - return popularity
-        recs = pop_rank[:count]
-        recs_data = [product_map[pid] for pid in recs if pid in product_map]
+        recs = get_artifacts()["pop_rank"][:count]
+        recs_data = get_data_mapper().get_products_by_ids(recs)
         return jsonify({
             "data": recs_data,
             "count": len(recs_data),
@@ -294,7 +871,7 @@ def get_recommendations():
     
     print(f"   📤 Returned {len(recommendations_pids)} product IDs")
     
-    recommendations = [product_map[pid] for pid in recommendations_pids if pid in product_map]
+    recommendations = get_data_mapper().get_products_by_ids(recommendations_pids)
     
     return jsonify({
         "data": recommendations,
@@ -317,6 +894,7 @@ def predict_price():
         "rating_count": int
     }
     """
+    models_service = get_models_service()
     if not models_service:
         return jsonify({"error": "Model service not available"}), 503
     
@@ -343,6 +921,98 @@ def predict_price():
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
+PRICE_FEATURE_FIELDS = ['actual_price', 'rating', 'rating_count']
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+def _read_price_batch_rows() -> List[Dict[str, Any]]:
+    """Đọc các dòng của batch từ body JSON, NDJSON hoặc CSV"""
+    mimetype = (request.mimetype or '').lower()
+    
+    if mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    
+    if mimetype in NDJSON_MIMETYPES:
+        return [
+            json.loads(line)
+            for line in request.get_data(as_text=True).splitlines()
+            if line.strip()
+        ]
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise ValueError('Request body must be a JSON array, {"items": [...]}, NDJSON or CSV')
+    return data
+
+def _price_batch_columns(rows: List[Dict[str, Any]]) -> Tuple[List[float], List[float], List[int]]:
+    """Tách các dòng thành 3 cột features, báo lỗi kèm số thứ tự dòng"""
+    actual_prices, ratings, rating_counts = [], [], []
+    
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"row {i} must be an object")
+        missing = [field for field in PRICE_FEATURE_FIELDS if row.get(field) in (None, '')]
+        if missing:
+            raise ValueError(f"row {i} is missing {', '.join(missing)}")
+        
+        actual_prices.append(float(row['actual_price']))
+        ratings.append(float(row['rating']))
+        rating_counts.append(int(float(row['rating_count'])))
+    
+    return actual_prices, ratings, rating_counts
+
+@app.route('/api/price-prediction/batch', methods=['POST'])
+@error_handler
+def predict_price_batch():
+    """
+    Dự đoán giá cho nhiều sản phẩm trong một request
+    
+    Request body (một trong các dạng):
+        - JSON: [{"actual_price": float, "rating": float, "rating_count": int}, ...]
+          hoặc {"items": [...]}
+        - NDJSON (Content-Type: application/x-ndjson): mỗi dòng một object
+        - CSV (Content-Type: text/csv): header actual_price,rating,rating_count
+    """
+    models_service = get_models_service()
+    if not models_service:
+        return jsonify({"error": "Model service not available"}), 503
+    
+    rows = _read_price_batch_rows()
+    if not rows:
+        return jsonify({"error": "Batch is empty"}), 400
+    
+    max_rows = app.config['PRICE_BATCH_MAX_ROWS']
+    if len(rows) > max_rows:
+        return jsonify({"error": f"Batch too large: {len(rows)} rows (max {max_rows})"}), 413
+    
+    actual_prices, ratings, rating_counts = _price_batch_columns(rows)
+    
+    predictions = models_service.predict_prices(
+        actual_price=actual_prices,
+        rating=ratings,
+        rating_count=rating_counts,
+        chunk_size=app.config['PRICE_BATCH_CHUNK_SIZE']
+    )
+    
+    if predictions is None:
+        return jsonify({"error": "Prediction failed"}), 500
+    
+    confidence = predictions["confidence"]
+    data = [
+        {"original_price": original, "predicted_price": predicted, "confidence": confidence}
+        for original, predicted in zip(
+            predictions["original_price"].tolist(),
+            predictions["predicted_price"].tolist()
+        )
+    ]
+    
+    return jsonify({
+        "data": data,
+        "count": len(data),
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200
+
 @app.route('/api/search', methods=['POST'])
 @error_handler
 def search():
@@ -366,7 +1036,7 @@ def search():
     if not query:
         return jsonify({"error": "Query cannot be empty"}), 400
     
-    results = data_mapper.search_products(query, limit=limit)
+    results = get_data_mapper().search_products(query, limit=limit)
     
     return jsonify({
         "data": results,
@@ -375,6 +1045,132 @@ def search():
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
+@app.route('/api/semantic-search', methods=['GET'])
+@cached_response
+@error_handler
+def semantic_search():
+    """
+    Semantic search: hybrid dense (embedding) + sparse (TF-IDF)
+    
+    Query params:
+        - q: str (bắt buộc)
+        - limit: int (optional, default: 10, tối đa MAX_PAGE_SIZE)
+        - rerank: bool (optional, default: true)
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    
+    limit = min(max(1, request.args.get('limit', 10, type=int)), app.config['MAX_PAGE_SIZE'])
+    
+    mapper = get_data_mapper()
+    rerank = request.args.get('rerank', 'true').lower() != 'false'
+    retriever = get_semantic_retriever()
+    rows, scores, reranked = retriever.search(query, top_k=limit, rerank=rerank)
+    
+    # Dòng trong artifact RAG → product_id → product; bỏ sản phẩm không còn trong catalog
+    results, result_scores = [], []
+    for product_id, score in zip(retriever.product_ids_at(rows), scores):
+        product = mapper.get_product_by_id(product_id)
+        if product is not None:
+            results.append(product)
+            result_scores.append(round(float(score), 6))
+    
+    response = jsonify({
+        "data": results,
+        "scores": result_scores,
+        "reranked": reranked,
+        "count": len(results),
+        "query": query,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    # Reranker quá hạn/lỗi → kết quả hybrid tạm thời, không cache để lần sau được rerank lại
+    if rerank and retriever.can_rerank and len(rows) and not reranked:
+        response.cache_control.no_store = True
+    return response, 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Thống kê response cache: hit/miss, số entry, bộ nhớ"""
+    return jsonify({
+        "data": response_cache.stats(),
+        "enabled": app.config['CACHE_ENABLED'],
+        "semantic_search": semantic_retriever.stats() if semantic_retriever is not None else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200
+
+def admin_required(func):
+    """
+    Decorator cho endpoint admin: cần header X-Admin-Token = ADMIN_TOKEN
+    
+    Thiếu/sai token → 401. Chưa cấu hình ADMIN_TOKEN thì chỉ cho phép localhost, nơi khác → 403.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = app.config['ADMIN_TOKEN']
+        if token:
+            if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+                return jsonify({"error": "Unauthorized: missing or invalid X-Admin-Token"}), 401
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            return jsonify({"error": "Forbidden"}), 403
+        return func(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/version', methods=['GET'])
+@admin_required
+@error_handler
+def artifact_version_info():
+    """Version catalog + model đang phục vụ và version hiện có trên disk"""
+    available = _current_artifact_version()
+    
+    return jsonify({
+        "data": {
+            "version": loaded_version["version"] if loaded_version is not None else None,
+            "fingerprint": loaded_version["fingerprint"] if loaded_version is not None else None,
+            "manifest": loaded_version["manifest"] if loaded_version is not None else None,
+            "available_version": available["version"],
+            "up_to_date": loaded_version is not None and loaded_version["fingerprint"] == available["fingerprint"],
+            # Lý do arrays/ hoặc catalog Feather bị bỏ qua (đang load thẳng từ file nguồn)
+            "stale_derived_artifacts": {
+                name: reason for name, reason in _derived_artifact_status().items() if reason is not None
+            },
+            "reload": dict(_reload_status)
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }), 200
+
+@app.route('/api/admin/reload', methods=['POST'])
+@admin_required
+@error_handler
+def reload_artifacts():
+    """
+    Hot reload catalog + model artifact
+    
+    Request body (optional):
+    {
+        "force": bool (reload cả khi version không đổi, default: false),
+        "wait": bool (chờ reload xong rồi mới trả về, default: false)
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    force = bool(data.get('force', False))
+    
+    if data.get('wait', False):
+        try:
+            result = reload_services(force=force)
+        except Exception as e:
+            return jsonify({"error": f"Reload failed: {str(e)}"}), 500
+        return jsonify({"data": result, "timestamp": datetime.utcnow().isoformat()}), 200
+    
+    if not start_reload(force=force):
+        return jsonify({"error": "Reload already in progress"}), 409
+    
+    return jsonify({
+        "status": "reloading",
+        "version": loaded_version["version"] if loaded_version is not None else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }), 202
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -386,13 +1182,31 @@ def internal_error(error):
     logger.error(f"Internal server error: {str(error)}")
     return jsonify({"error": "Internal server error"}), 500
 
-if __name__ == '__main__':
-    # Initialize services
-    init_services()
+_startup_timings["import"] = round(time.perf_counter() - _import_started, 4)
+
+_services_started = False
+
+def create_app() -> Flask:
+    """
+    Entry point cho WSGI server, ví dụ `gunicorn "app:create_app()"`
     
-    # Run server
+    Khởi tạo services theo SERVICE_INIT_MODE và watcher artifact, chỉ một lần mỗi process.
+    Import module app không khởi động thread nào (services được tạo lazy khi cần).
+    """
+    global _services_started
+    with _services_lock:
+        if not _services_started:
+            _services_started = True
+            start_services(app.config['SERVICE_INIT_MODE'])
+    return app
+
+if __name__ == '__main__':
     debug = app.config['DEBUG']
     host = os.getenv("FLASK_HOST", "0.0.0.0")
     port = int(os.getenv("FLASK_PORT", 5000))
     
+    # Với reloader của Flask (debug), process cha chỉ theo dõi file: services chỉ khởi động ở process con
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        create_app()
+    
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from neighbors import ContentNeighborTable, UserTopKTable, DEFAULT_TOP_N
+from ann_index import index_exists, load_index
+from source_stamp import stale_reason
+
+logger = logging.getLogger(__name__)
+
+# Các mảng được export sang .npy để load bằng mmap (không cần unpickle)
+ARRAY_FILES = {
+    "U": "U.npy",
+    "V": "V.npy",
+    "user_ids": "user_ids.npy",
+    "product_ids": "product_ids.npy",
+    "content_pids": "content_pids.npy",
+    "pop_rank": "pop_rank.npy",
+}
+
+# Dấu nguồn của arrays/ (source_stamp.py): tăng ARRAYS_SCHEMA_VERSION khi đổi định dạng các file .npy
+ARRAYS_STAMP_FILENAME = "source.json"
+ARRAYS_SCHEMA_VERSION = 1
+
+# ANN index (build_ann.py) trong models/recommendation/ann/
+ITEM_INDEX_NAME = "item_factors"
+
+# Bản ghi version của bộ artifact đang deploy (cạnh hybrid_model.joblib)
+MANIFEST_FILENAME = "manifest.json"
+
+_registry: Dict[str, Dict[str, Any]] = {}
+_registry_lock = threading.Lock()
+
+
+def default_arrays_dir(recommendation_model_path: str) -> str:
+    """Thư mục .npy nằm cạnh hybrid_model.joblib"""
+    return os.path.join(os.path.dirname(recommendation_model_path), "arrays")
+
+
+def arrays_stale_reason(recommendation_model_path: str, arrays_dir: str) -> Optional[str]:
+    """None nếu arrays/ được build từ đúng hybrid_model.joblib hiện tại"""
+    return stale_reason(
+        os.path.join(arrays_dir, ARRAYS_STAMP_FILENAME), recommendation_model_path, ARRAYS_SCHEMA_VERSION
+    )
+
+
+def default_ann_dir(recommendation_model_path: str) -> str:
+    """Thư mục ANN index nằm cạnh hybrid_model.joblib"""
+    return os.path.join(os.path.dirname(recommendation_model_path), "ann")
+
+
+def default_manifest_path(recommendation_model_path: str) -> str:
+    return os.path.join(os.path.dirname(recommendation_model_path), MANIFEST_FILENAME)
+
+
+def _file_stats(path: str):
+    """(path, size, mtime_ns) của file, hoặc của mọi file trong thư mục (đệ quy)"""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        yield path, stat.st_size, stat.st_mtime_ns
+    elif os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield from _file_stats(os.path.join(root, name))
+
+
+def artifact_version(manifest_path: str, paths: Sequence[str]) -> Dict[str, Any]:
+    """
+    Version của catalog + model artifact trên disk
+    
+    manifest.json là bản ghi version: trường "version" (nếu có) là tên version.
+    Fingerprint băm nội dung manifest cùng size/mtime của các file trong paths, nên
+    artifact được thay mà chưa cập nhật manifest vẫn được nhận ra là version mới.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    manifest: Dict[str, Any] = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            raw = f.read()
+        digest.update(raw)
+        manifest = json.loads(raw)
+    
+    for path in paths:
+        for name, size, mtime_ns in _file_stats(path):
+            digest.update(f"{name}:{size}:{mtime_ns}\n".encode())
+    
+    fingerprint = digest.hexdigest()
+    return {
+        "version": str(manifest.get("version") or fingerprint),
+        "fingerprint": fingerprint,
+        "manifest": manifest
+    }
+
+
+def _load_ann_indexes(ann_dir: str) -> Dict[str, Any]:
+    """Load ANN index nếu đã build; lỗi (ví dụ thiếu faiss) chỉ làm mất index đó"""
+    indexes = {}
+    for key, name in (("item_index", ITEM_INDEX_NAME),):
+        index_dir = os.path.join(ann_dir, name)
+        indexes[key] = None
+        if not index_exists(index_dir):
+            continue
+        try:
+            indexes[key] = load_index(index_dir)
+            logger.info(f"Loaded {indexes[key].backend} ANN index from {index_dir}")
+        except Exception as e:
+            logger.warning(f"Cannot load ANN index {index_dir}: {str(e)}")
+    return indexes
+
+
+def _label_encoder(classes: np.ndarray):
+    """Dựng lại LabelEncoder từ classes_ đã lưu, không cần unpickle estimator"""
+    from sklearn.preprocessing import LabelEncoder
+    
+    encoder = LabelEncoder()
+    encoder.classes_ = np.asarray(classes)
+    return encoder
+
+
+def export_arrays(artifacts: Dict[str, Any], arrays_dir: str):
+    """
+    Export artifact từ hybrid_model.joblib sang các file .npy mmap-friendly
+    
+    Chuỗi ID được lưu dạng unicode cố định để không phải dùng pickle.
+    """
+    os.makedirs(arrays_dir, exist_ok=True)
+    
+    n_content = len(artifacts["content_idx2pid"])
+    content_pids = [artifacts["content_idx2pid"][i] for i in range(n_content)]
+    
+    arrays = {
+        "U": np.ascontiguousarray(artifacts["U"]),
+        "V": np.ascontiguousarray(artifacts["V"]),
+        "user_ids": np.asarray(artifacts["user_encoder"].classes_, dtype=str),
+        "product_ids": np.asarray(artifacts["product_encoder"].classes_, dtype=str),
+        "content_pids": np.asarray(content_pids, dtype=str),
+        "pop_rank": np.asarray(artifacts["pop_rank"], dtype=str),
+    }
+    
+    for key, array in arrays.items():
+        np.save(os.path.join(arrays_dir, ARRAY_FILES[key]), array)
+        logger.info(f"Exported {key}: shape={array.shape}, dtype={array.dtype}")
+
+
+def _load_from_arrays(arrays_dir: str) -> Dict[str, Any]:
+    """Load artifact từ thư mục .npy với mmap_mode='r'"""
+    arrays = {
+        key: np.load(os.path.join(arrays_dir, filename), mmap_mode="r")
+        for key, filename in ARRAY_FILES.items()
+    }
+    
+    content_idx2pid = arrays["content_pids"].tolist()
+    return {
+        "user_encoder": _label_encoder(arrays["user_ids"]),
+        "product_encoder": _label_encoder(arrays["product_ids"]),
+        "U": arrays["U"],
+        "V": arrays["V"],
+        "content_pid2idx": {pid: idx for idx, pid in enumerate(content_idx2pid)},
+        "content_idx2pid": content_idx2pid,
+        "pop_rank": arrays["pop_rank"].tolist(),
+        "content_neighbors": ContentNeighborTable.load(arrays_dir) if ContentNeighborTable.exists(arrays_dir) else None,
+        "user_topk": UserTopKTable.load(arrays_dir) if UserTopKTable.exists(arrays_dir) else None,
+    }
+
+
+def _add_id_maps(artifacts: Dict[str, Any]):
+    """Map user_id → index (dict, O(1)) và index → product_id, thay cho LabelEncoder.transform"""
+    user_ids = artifacts["user_encoder"].classes_.tolist()
+    artifacts["user_id2idx"] = {uid: idx for idx, uid in enumerate(user_ids)}
+    artifacts["product_idx2pid"] = artifacts["product_encoder"].classes_.tolist()
+
+
+def _load_from_joblib(model_path: str, top_n: int) -> Dict[str, Any]:
+    """Fallback khi chưa export .npy: load joblib (mmap các mảng numpy nếu được)"""
+    import joblib
+    
+    artifacts = joblib.load(model_path, mmap_mode="r")
+    
+    # Chỉ giữ bảng top-N neighbor, ma trận similarity dày được bỏ đi
+    similarity = artifacts.pop("content_similarity", None)
+    artifacts["content_neighbors"] = (
+        ContentNeighborTable.from_dense(similarity, top_n=top_n) if similarity is not None else None
+    )
+    # Không tính top-K theo user khi khởi động: _recommend_collab sẽ tính trực tiếp
+    artifacts["user_topk"] = None
+    return artifacts
+
+
+def load_recommendation_artifacts(model_path: str,
+                                  arrays_dir: Optional[str] = None,
+                                  top_n: int = DEFAULT_TOP_N) -> Dict[str, Any]:
+    """Load artifact của recommendation model (không qua registry)"""
+    arrays_dir = arrays_dir or default_arrays_dir(model_path)
+    
+    if all(os.path.exists(os.path.join(arrays_dir, f)) for f in ARRAY_FILES.values()):
+        reason = arrays_stale_reason(model_path, arrays_dir)
+    else:
+        reason = "not found"
+    
+    if reason is None:
+        artifacts = _load_from_arrays(arrays_dir)
+        logger.info(f"Loaded memory-mapped recommendation artifacts from {arrays_dir}")
+    else:
+        logger.warning(
+            f"Memory-mapped artifacts in {arrays_dir} not usable ({reason}), loading {model_path}. "
+            f"Run `python build_artifacts.py` to export them."
+        )
+        artifacts = _load_from_joblib(model_path, top_n)
+    
+    if artifacts.get("content_neighbors") is None:
+        logger.warning("Content neighbor table not available")
+    if artifacts.get("user_topk") is None:
+        logger.warning("Precomputed user top-K table not available, using live scoring")
+    
+    _add_id_maps(artifacts)
+    artifacts.update(_load_ann_indexes(default_ann_dir(model_path)))
+    return artifacts
+
+
+def get_recommendation_artifacts(model_path: str,
+                                 arrays_dir: Optional[str] = None,
+                                 top_n: int = DEFAULT_TOP_N) -> Dict[str, Any]:
+    """
+    Registry artifact: mỗi process chỉ load một lần, mọi nơi dùng chung một bản
+    
+    Các mảng lớn (U, V, bảng neighbor) được memory-map nên các worker Gunicorn
+    dùng chung page cache của OS thay vì giữ bản sao riêng.
+    """
+    key = os.path.abspath(model_path)
+    artifacts = _registry.get(key)
+    if artifacts is not None:
+        return artifacts
+    
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = load_recommendation_artifacts(model_path, arrays_dir, top_n)
+        return _registry[key]
+
+
+def register_recommendation_artifacts(model_path: str, artifacts: Dict[str, Any]):
+    """
+    Thay bản trong registry bằng artifact đã load lại (hot reload)
+    
+    Bản cũ không bị sửa: nơi đang giữ reference (request đang chạy) vẫn dùng được.
+    """
+    with _registry_lock:
+        _registry[os.path.abspath(model_path)] = artifacts
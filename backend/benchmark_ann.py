@@ -0,0 +1,76 @@
+"""
+Benchmark recall@k và latency của ANN index so với tìm kiếm chính xác
+
+Query là các vector U[user] của user có factor. Chạy sau build_ann.py:
+    
+    python benchmark_ann.py
+    python benchmark_ann.py --k 20 --nprobe 1 2 4 8 16 32
+"""
+import os
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from config import Config
+from ann_index import ExactIndex, load_index, index_exists
+from artifacts import default_ann_dir, default_arrays_dir, ITEM_INDEX_NAME
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def benchmark(index, queries: np.ndarray, k: int, nprobe_values):
+    """In recall@k và latency trung bình mỗi query cho từng giá trị nprobe"""
+    exact = ExactIndex(np.asarray(index.vectors))
+    
+    started = time.perf_counter()
+    truths = [exact.search(query, k)[0] for query in queries]
+    exact_ms = (time.perf_counter() - started) / len(queries) * 1000
+    logger.info(f"  exact          recall@{k}=1.0000  {exact_ms:.3f} ms/query")
+    
+    for nprobe in nprobe_values:
+        hits = 0
+        started = time.perf_counter()
+        for query, truth in zip(queries, truths):
+            found, _ = index.search(query, k, nprobe=nprobe)
+            hits += len(np.intersect1d(truth, found))
+        elapsed_ms = (time.perf_counter() - started) / len(queries) * 1000
+        recall = hits / max(1, sum(len(t) for t in truths))
+        logger.info(f"  nprobe={nprobe:<6} recall@{k}={recall:.4f}  {elapsed_ms:.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN recall@k vs exact search")
+    parser.add_argument("--model-path", default=Config.RECOMMENDATION_MODEL_PATH,
+                        help="Đường dẫn đến hybrid_model.joblib")
+    parser.add_argument("--ann-dir", default=None,
+                        help="Thư mục ANN index (mặc định: models/recommendation/ann)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--max-queries", type=int, default=1000)
+    args = parser.parse_args()
+    
+    ann_dir = args.ann_dir or default_ann_dir(args.model_path)
+    arrays_dir = default_arrays_dir(args.model_path)
+    rng = np.random.default_rng(0)
+    
+    item_dir = os.path.join(ann_dir, ITEM_INDEX_NAME)
+    if index_exists(item_dir):
+        index = load_index(item_dir)
+        U = np.load(os.path.join(arrays_dir, "U.npy"), mmap_mode="r")
+        # User không có factor (vector 0) cho mọi sản phẩm cùng điểm, không có ý nghĩa để đo recall
+        active = np.flatnonzero(np.linalg.norm(U, axis=1) > 1e-9)
+        rows = rng.choice(active, size=min(args.max_queries, len(active)), replace=False)
+        logger.info(f"Item factors ({index.backend}, {len(index)} items, {len(rows)} user queries):")
+        benchmark(index, np.asarray(U[np.sort(rows)], dtype=np.float32), args.k, args.nprobe)
+    else:
+        logger.warning(f"Item index not found in {item_dir}, run build_ann.py first")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Build offline ANN index trên item factors V (collaborative filtering, query bằng U[user])
+
+Không có index cho content-based: hybrid_model.joblib chỉ lưu content_similarity, không có
+content vector để build index, nên content-based dùng bảng top-N neighbor (build_artifacts.py).
+Index được lưu trong models/recommendation/ann/ (cạnh hybrid_model.joblib):
+    
+    python build_ann.py
+    python build_ann.py --backend faiss --nlist 1024 --nprobe 16
+"""
+import os
+import argparse
+import logging
+
+import joblib
+import numpy as np
+
+from config import Config
+from ann_index import build_index, save_index, BACKENDS
+from artifacts import default_ann_dir, ITEM_INDEX_NAME
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def build_ann_indexes(artifacts,
+                      ann_dir: str,
+                      backend: str = "ivf",
+                      nlist=None,
+                      nprobe: int = Config.ANN_NPROBE):
+    """Build và lưu index cho item factors"""
+    item_index = build_index(np.asarray(artifacts["V"]), backend=backend, nlist=nlist, nprobe=nprobe)
+    save_index(item_index, os.path.join(ann_dir, ITEM_INDEX_NAME))
+    return item_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ANN indexes for recommendation")
+    parser.add_argument("--model-path", default=Config.RECOMMENDATION_MODEL_PATH,
+                        help="Đường dẫn đến hybrid_model.joblib")
+    parser.add_argument("--ann-dir", default=None,
+                        help="Thư mục output (mặc định: models/recommendation/ann)")
+    parser.add_argument("--backend", default="ivf", choices=sorted(BACKENDS),
+                        help="Backend của index")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="Số cụm IVF (mặc định: 4·sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=Config.ANN_NPROBE,
+                        help="Số cụm được quét mỗi query (mặc định khi load)")
+    args = parser.parse_args()
+    
+    logger.info(f"Loading recommendation artifacts from {args.model_path}")
+    artifacts = joblib.load(args.model_path)
+    
+    build_ann_indexes(
+        artifacts,
+        args.ann_dir or default_ann_dir(args.model_path),
+        backend=args.backend,
+        nlist=args.nlist,
+        nprobe=args.nprobe
+    )
+
+
+if __name__ == '__main__':
+    main()
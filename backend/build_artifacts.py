@@ -0,0 +1,80 @@
+"""
+Build offline các artifact phục vụ cho recommendation
+
+Export hybrid_model.joblib sang các file .npy (load bằng mmap, dùng chung giữa
+các worker), build bảng top-N neighbor và danh sách top-K sản phẩm cho từng
+user. Chạy sau khi notebook 04 xuất ra hybrid_model.joblib:
+
+    python build_artifacts.py
+    python build_artifacts.py --top-n 200 --user-top-k 100
+"""
+import os
+import argparse
+import logging
+
+import joblib
+
+from config import Config
+from artifacts import export_arrays, default_arrays_dir, ARRAYS_STAMP_FILENAME, ARRAYS_SCHEMA_VERSION
+from neighbors import ContentNeighborTable, UserTopKTable, DEFAULT_TOP_N, DEFAULT_USER_TOP_K
+from source_stamp import write_stamp
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def build_content_neighbors(artifacts, arrays_dir: str, top_n: int = DEFAULT_TOP_N) -> ContentNeighborTable:
+    """Rút gọn ma trận content_similarity dày thành bảng top-N neighbor"""
+    similarity = artifacts["content_similarity"]
+    table = ContentNeighborTable.from_dense(similarity, top_n=top_n)
+    table.save(arrays_dir)
+    
+    dense_bytes = getattr(similarity, "nbytes", 0)
+    if dense_bytes:
+        logger.info(
+            f"Dense similarity: {dense_bytes / 1024:.1f} KB -> "
+            f"neighbor table: {table.nbytes / 1024:.1f} KB"
+        )
+    return table
+
+
+def build_user_topk(artifacts, arrays_dir: str, top_k: int = DEFAULT_USER_TOP_K) -> UserTopKTable:
+    """Tính sẵn top-K sản phẩm cho mọi user từ các factor U, V"""
+    table = UserTopKTable.from_factors(artifacts["U"], artifacts["V"], top_k=top_k)
+    table.save(arrays_dir)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build offline recommendation artifacts")
+    parser.add_argument("--model-path", default=Config.RECOMMENDATION_MODEL_PATH,
+                        help="Đường dẫn đến hybrid_model.joblib")
+    parser.add_argument("--arrays-dir", default=None,
+                        help="Thư mục output .npy (mặc định: models/recommendation/arrays)")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N,
+                        help="Số neighbor giữ lại cho mỗi sản phẩm")
+    parser.add_argument("--user-top-k", type=int, default=DEFAULT_USER_TOP_K,
+                        help="Số sản phẩm gợi ý tính sẵn cho mỗi user")
+    args = parser.parse_args()
+    
+    logger.info(f"Loading recommendation artifacts from {args.model_path}")
+    artifacts = joblib.load(args.model_path)
+    
+    arrays_dir = args.arrays_dir or default_arrays_dir(args.model_path)
+    stamp_path = os.path.join(arrays_dir, ARRAYS_STAMP_FILENAME)
+    
+    # Xóa dấu cũ trước: build dở dang sẽ không được coi là khớp với model
+    if os.path.exists(stamp_path):
+        os.remove(stamp_path)
+    
+    export_arrays(artifacts, arrays_dir)
+    build_content_neighbors(artifacts, arrays_dir, top_n=args.top_n)
+    build_user_topk(artifacts, arrays_dir, top_k=args.user_top_k)
+    write_stamp(stamp_path, args.model_path, ARRAYS_SCHEMA_VERSION)
+
+
+if __name__ == '__main__':
+    main()
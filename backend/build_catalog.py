@@ -0,0 +1,42 @@
+"""
+Chuyển catalog CSV sang file cột có kiểu (Feather hoặc Parquet)
+
+Các cột numeric đã được làm sạch, discount_percentage và category_path được
+tính sẵn, nên backend load file này không phải parse CSV hay làm sạch lại.
+Cần pyarrow. Chạy lại mỗi khi data/processed/amazon.csv thay đổi:
+
+    python build_catalog.py
+    python build_catalog.py --output ../data/processed/amazon.parquet
+"""
+import time
+import argparse
+import logging
+
+from config import Config
+from catalog_store import write_catalog
+from data_mapper import ProductDataMapper
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build typed columnar catalog")
+    parser.add_argument("--input", default=Config.DATA_PATH,
+                        help="CSV đầu vào (mặc định: data/processed/amazon.csv)")
+    parser.add_argument("--output", default=Config.CATALOG_PATH,
+                        help="File kết quả (.feather hoặc .parquet)")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    mapper = ProductDataMapper(args.input, catalog_path=None)
+    write_catalog(mapper.df, args.output, source_path=args.input)
+    
+    logger.info(f"Built catalog in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
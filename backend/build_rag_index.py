@@ -0,0 +1,394 @@
+"""
+Build tăng dần các index của semantic search (embedding, FAISS, TF-IDF) theo content hash
+
+Mỗi sản phẩm được hash theo product context (retrieval.product_context). So với
+index_state.json của lần build trước:
+- sản phẩm mới hoặc context thay đổi: encode lại (process pool, theo batch) và
+  append vào cuối embedding / TF-IDF / FAISS; dòng cũ của sản phẩm thay đổi bị tombstone.
+  product_embeddings.npy được append tại chỗ (chỉ ghi dòng mới + header), vector store
+  nén encode dòng mới bằng codebook hiện có và chỉ train lại khi drift vượt ngưỡng
+- sản phẩm không còn trong catalog: tombstone
+- không đổi: giữ nguyên, không encode lại
+
+Lần chạy đầu tiên (chưa có index_state.json) nhận các artifact của notebook nếu số
+dòng khớp với catalog (cùng thứ tự amazon.csv), không encode lại.
+
+    python build_rag_index.py --workers 4
+    python build_rag_index.py --compact     # xóa hẳn các dòng đã tombstone
+    python build_rag_index.py --full        # build lại toàn bộ (kể cả TF-IDF vocabulary)
+"""
+import io
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from config import Config
+from data_mapper import ProductDataMapper
+from retrieval import (
+    create_encoder, load_index_state, product_context,
+    METADATA_FILENAME, EMBEDDINGS_FILENAME, FAISS_FILENAME,
+    TFIDF_VECTORIZER_FILENAME, TFIDF_MATRIX_FILENAME, INDEX_STATE_FILENAME, TOMBSTONES_FILENAME
+)
+from vector_store import CompressedVectorStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Encoder của từng worker process (được tạo trong initializer)
+_worker_encoder = None
+
+
+def context_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _init_worker(encoder_name: str, model_name: str, dim: int):
+    """Load encoder một lần cho mỗi worker process"""
+    global _worker_encoder
+    _worker_encoder = create_encoder(encoder_name, model_name, dim=dim)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_encoder.encode(texts), dtype=np.float32)
+
+
+def encode_texts(texts: List[str],
+                 encoder_name: str,
+                 model_name: str,
+                 dim: int,
+                 workers: int = 1,
+                 batch_size: int = 256) -> np.ndarray:
+    """Encode các context theo batch, song song trên process pool nếu workers > 1"""
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    started = time.perf_counter()
+    if workers <= 1:
+        _init_worker(encoder_name, model_name, dim)
+        results = [_encode_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(encoder_name, model_name, dim)) as pool:
+            results = list(pool.map(_encode_batch, batches))
+    
+    logger.info(f"Encoded {len(texts)} products in {time.perf_counter() - started:.2f}s "
+                f"({len(batches)} batches, {workers} workers)")
+    return np.vstack(results)
+
+
+def _save_npy(path: str, array: np.ndarray):
+    # Ghi file tạm rồi os.replace: process đang mmap file cũ vẫn đọc được bản cũ
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _append_npy(path: str, rows: np.ndarray) -> bool:
+    """
+    Append dòng vào cuối file .npy 2 chiều tại chỗ: ghi các dòng mới rồi mới sửa shape ở header
+    
+    Dòng cũ không bị ghi lại nên process đang mmap file vẫn đọc đúng bản cũ. Trả về False
+    nếu không append được (dtype / số cột khác, header không đủ chỗ): caller ghi lại cả file.
+    """
+    fmt = np.lib.format
+    with open(path, "r+b") as f:
+        version = fmt.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = fmt.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = fmt.read_array_header_2_0(f)
+        else:
+            return False
+        header_len = f.tell()
+        if fortran_order or dtype != rows.dtype or len(shape) != 2 or rows.ndim != 2 or shape[1] != rows.shape[1]:
+            return False
+        
+        # np.save chừa chỗ trong header để shape[0] tăng mà độ dài header không đổi
+        header = io.BytesIO()
+        header_data = {"descr": fmt.dtype_to_descr(dtype), "fortran_order": False, "shape": (shape[0] + len(rows), shape[1])}
+        (fmt.write_array_header_1_0 if version == (1, 0) else fmt.write_array_header_2_0)(header, header_data)
+        if header.tell() != header_len:
+            return False
+        
+        # Bỏ phần thừa của lần append trước bị dừng giữa chừng (header chưa kịp cập nhật)
+        end = header_len + shape[0] * shape[1] * dtype.itemsize
+        f.truncate(end)
+        f.seek(end)
+        f.write(np.ascontiguousarray(rows).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def _save_pickle(path: str, obj: Any):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _save_json(path: str, obj: Any):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _import_faiss():
+    try:
+        import faiss
+        return faiss
+    except ImportError:
+        return None
+
+
+def _unique_products(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bỏ product_id trùng (giữ lần xuất hiện cuối, như dict theo product_id) và log lại"""
+    by_id = {product["product_id"]: product for product in products}
+    if len(by_id) != len(products):
+        seen, duplicates = set(), []
+        for product in products:
+            if product["product_id"] in seen:
+                duplicates.append(product["product_id"])
+            seen.add(product["product_id"])
+        logger.warning(
+            f"Catalog has {len(duplicates)} duplicate product_id rows, keeping the last occurrence: "
+            f"{sorted(set(duplicates))[:10]}"
+        )
+    return list(by_id.values())
+
+
+def _update_vector_store(store_dir: str,
+                         embeddings_path: str,
+                         new_embeddings: np.ndarray,
+                         appended: bool,
+                         max_drift: float) -> Tuple[str, float]:
+    """
+    Cập nhật vector store nén theo embedding mới: encode dòng mới bằng codebook / scale
+    hiện có, chỉ train lại khi không append được hoặc drift vượt max_drift
+    """
+    store = CompressedVectorStore.load(store_dir, mmap_mode=None)
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    drift = store.drift(new_embeddings)
+    
+    if appended and len(store) + len(new_embeddings) == len(embeddings) and drift <= max_drift:
+        store.append(new_embeddings)
+        action = "appended"
+    else:
+        options = {"m": store.codes.params.shape[0]} if store.method == "pq" else {}
+        rebuilt = CompressedVectorStore.build(embeddings, method=store.method, **options)
+        rebuilt.rescore_factor = store.rescore_factor
+        store = rebuilt
+        action = "retrained"
+    
+    store.save(store_dir)
+    logger.info(f"Vector store {action}: {len(new_embeddings)} new vectors, drift={drift:.3f} (max {max_drift})")
+    return action, drift
+
+
+def _fit_vectorizer(contexts: List[str]):
+    """TF-IDF với cùng tham số như build_or_load_tfidf trong notebook"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    vectorizer = TfidfVectorizer(max_features=5000, max_df=0.8, min_df=2, ngram_range=(1, 2), lowercase=True)
+    return vectorizer, vectorizer.fit_transform(contexts)
+
+
+def update_index(model_dir: str,
+                 products: List[Dict[str, Any]],
+                 encoder_name: str = "sentence-transformers",
+                 workers: int = 1,
+                 batch_size: int = 256,
+                 full: bool = False,
+                 compact: bool = False,
+                 vector_store_dir: Optional[str] = None,
+                 max_drift: float = Config.RAG_QUANTIZER_MAX_DRIFT) -> Dict[str, Any]:
+    """Cập nhật các artifact trong model_dir theo catalog hiện tại, trả về thống kê thay đổi"""
+    with open(os.path.join(model_dir, METADATA_FILENAME)) as f:
+        metadata = json.load(f)
+    dim = int(metadata.get("embedding_dim", 384))
+    
+    catalog_ids = [product["product_id"] for product in products]
+    products = _unique_products(products)
+    contexts = {product["product_id"]: product_context(product) for product in products}
+    hashes = {product_id: context_hash(text) for product_id, text in contexts.items()}
+    
+    embeddings_path = os.path.join(model_dir, EMBEDDINGS_FILENAME)
+    matrix_path = os.path.join(model_dir, TFIDF_MATRIX_FILENAME)
+    vectorizer_path = os.path.join(model_dir, TFIDF_VECTORIZER_FILENAME)
+    state = None if full else load_index_state(model_dir)
+    
+    if full or not os.path.exists(embeddings_path):
+        row_ids, row_hashes = [], []
+        embeddings = np.zeros((0, dim), dtype=np.float32)
+        tombstones = np.zeros(0, dtype=bool)
+        vectorizer, _ = _fit_vectorizer(list(contexts.values()))
+        matrix = sp.csr_matrix((0, len(vectorizer.vocabulary_)))
+    else:
+        embeddings = np.load(embeddings_path, mmap_mode="r")
+        with open(vectorizer_path, "rb") as f:
+            vectorizer = pickle.load(f)
+        with open(matrix_path, "rb") as f:
+            matrix = pickle.load(f).tocsr()
+        
+        if state is not None:
+            row_ids, row_hashes = list(state["product_ids"]), list(state["hashes"])
+            tombstones_path = os.path.join(model_dir, TOMBSTONES_FILENAME)
+            tombstones = np.load(tombstones_path) if os.path.exists(tombstones_path) \
+                else np.zeros(len(row_ids), dtype=bool)
+        elif len(embeddings) == len(catalog_ids):
+            # Artifact của notebook: dòng i = sản phẩm thứ i của catalog; dòng trùng product_id
+            # (trừ lần xuất hiện cuối) bị tombstone
+            logger.info(f"No index state, adopting existing {len(embeddings)} embeddings in catalog order")
+            row_ids = list(catalog_ids)
+            row_hashes = [hashes[product_id] for product_id in row_ids]
+            last_row = {product_id: row for row, product_id in enumerate(row_ids)}
+            tombstones = np.asarray([last_row[pid] != row for row, pid in enumerate(row_ids)], dtype=bool)
+        else:
+            raise ValueError(
+                f"No index state and embeddings ({len(embeddings)}) do not match catalog "
+                f"({len(catalog_ids)}), run with --full"
+            )
+    
+    # Diff theo content hash
+    live = {product_id: row for row, product_id in enumerate(row_ids) if not tombstones[row]}
+    changed = [pid for pid, row in live.items() if pid in hashes and row_hashes[row] != hashes[pid]]
+    added = [pid for pid in hashes if pid not in live]
+    removed = [pid for pid in live if pid not in hashes]
+    
+    for product_id in changed + removed:
+        tombstones[live[product_id]] = True
+    
+    to_encode = changed + added
+    new_embeddings = encode_texts(
+        [contexts[pid] for pid in to_encode], encoder_name, metadata.get("embedding_model"),
+        dim, workers=workers, batch_size=batch_size
+    )
+    
+    n_old = len(row_ids)
+    # Embedding: append tại chỗ nếu file hiện có khớp đúng các dòng cũ, nếu không thì ghi lại cả file
+    fresh = full or not os.path.exists(embeddings_path)
+    rewrite = fresh or (compact and tombstones.any()) or len(embeddings) != n_old
+    if len(embeddings) < n_old:
+        raise ValueError(f"Embeddings ({len(embeddings)}) have fewer rows than index state ({n_old}), run with --full")
+    if len(embeddings) > n_old:
+        # Lần append trước dừng sau khi sửa header nhưng trước khi ghi index_state.json
+        logger.warning(f"Discarding {len(embeddings) - n_old} embedding rows not recorded in index state")
+        embeddings = embeddings[:n_old]
+    
+    if to_encode:
+        # TF-IDF của dòng mới dùng vocabulary / IDF hiện có (chỉ fit lại khi --full)
+        matrix = sp.vstack([matrix, vectorizer.transform([contexts[pid] for pid in to_encode])]).tocsr()
+        row_ids += to_encode
+        row_hashes += [hashes[pid] for pid in to_encode]
+        tombstones = np.concatenate([tombstones, np.zeros(len(to_encode), dtype=bool)])
+    
+    appended = not rewrite and (len(new_embeddings) == 0 or _append_npy(embeddings_path, new_embeddings))
+    if not appended:
+        embeddings = np.vstack([np.asarray(embeddings, dtype=np.float32), new_embeddings])
+        if compact and tombstones.any():
+            keep = ~tombstones
+            logger.info(f"Compacting: dropping {int(tombstones.sum())} tombstoned rows")
+            embeddings, matrix = embeddings[keep], matrix[keep]
+            row_ids = [pid for pid, alive in zip(row_ids, keep) if alive]
+            row_hashes = [h for h, alive in zip(row_hashes, keep) if alive]
+            tombstones = np.zeros(len(row_ids), dtype=bool)
+        _save_npy(embeddings_path, embeddings)
+        logger.info(f"Rewrote {embeddings_path} ({len(embeddings)} rows)")
+    del embeddings
+    
+    # FAISS: append vector mới vào index cũ nếu khớp, nếu không thì build lại
+    faiss = _import_faiss()
+    faiss_path = os.path.join(model_dir, FAISS_FILENAME)
+    if faiss is not None:
+        index = faiss.read_index(faiss_path) if os.path.exists(faiss_path) and appended else None
+        if index is None or index.ntotal != n_old:
+            index = faiss.IndexFlatIP(dim)
+            index.add(np.load(embeddings_path))
+        else:
+            index.add(new_embeddings)
+        faiss.write_index(index, f"{faiss_path}.tmp")
+        os.replace(f"{faiss_path}.tmp", faiss_path)
+    elif os.path.exists(faiss_path):
+        logger.warning("faiss not installed: faiss_index.bin not updated (retriever will skip it)")
+    
+    # Artifact được ghi trước, state ghi sau cùng
+    _save_pickle(matrix_path, matrix)
+    if fresh:
+        _save_pickle(vectorizer_path, vectorizer)
+    _save_npy(os.path.join(model_dir, TOMBSTONES_FILENAME), tombstones)
+    
+    vector_store = None
+    if vector_store_dir and CompressedVectorStore.exists(vector_store_dir):
+        vector_store, _ = _update_vector_store(
+            vector_store_dir, embeddings_path, new_embeddings, appended, max_drift
+        )
+    
+    metadata["total_products"] = int(len(row_ids) - tombstones.sum())
+    _save_json(os.path.join(model_dir, METADATA_FILENAME), metadata)
+    _save_json(os.path.join(model_dir, INDEX_STATE_FILENAME), {"product_ids": row_ids, "hashes": row_hashes})
+    
+    stats = {
+        "added": len(added),
+        "changed": len(changed),
+        "removed": len(removed),
+        "rows": len(row_ids),
+        "tombstones": int(tombstones.sum()),
+        "embeddings": "appended" if appended else "rewritten",
+        "vector_store": vector_store
+    }
+    logger.info(f"RAG index updated: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental build of semantic search indexes")
+    parser.add_argument("--input", default=Config.DATA_PATH,
+                        help="CSV catalog (mặc định: data/processed/amazon.csv)")
+    parser.add_argument("--catalog", default=Config.CATALOG_PATH,
+                        help="Catalog Feather/Parquet đã chuẩn hóa (dùng nếu tồn tại)")
+    parser.add_argument("--model-dir", default=Config.RAG_MODEL_DIR,
+                        help="Thư mục artifact RAG")
+    parser.add_argument("--encoder", default=Config.RAG_QUERY_ENCODER,
+                        help="Encoder: sentence-transformers | hashing")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Số process encode song song")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="Số sản phẩm mỗi lần encode")
+    parser.add_argument("--full", action="store_true", help="Build lại toàn bộ")
+    parser.add_argument("--compact", action="store_true", help="Xóa hẳn các dòng đã tombstone")
+    parser.add_argument("--max-drift", type=float, default=Config.RAG_QUANTIZER_MAX_DRIFT,
+                        help="Train lại vector store nén khi sai số nén của dòng mới vượt tỉ lệ này so với lúc train")
+    args = parser.parse_args()
+    
+    mapper = ProductDataMapper(args.input, catalog_path=args.catalog)
+    update_index(
+        args.model_dir,
+        mapper.get_all_products(),
+        encoder_name=args.encoder,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        full=args.full,
+        compact=args.compact,
+        vector_store_dir=os.path.join(args.model_dir, "compressed"),
+        max_drift=args.max_drift
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Nén product_embeddings.npy thành vector store cho semantic search
+
+    python build_vector_store.py --method int8
+    python build_vector_store.py --method pq --pq-m 48
+    python build_vector_store.py --report            # recall@k vs kích thước của mọi kiểu nén
+
+Store được lưu trong models/rag/compressed/; khi có store, SemanticRetriever dùng
+nó cho bước dense (thay cho faiss_index.bin) và rescoring trên embedding float32 mmap.
+"""
+import os
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from config import Config
+from retrieval import EMBEDDINGS_FILENAME
+from vector_store import CompressedVectorStore, METHODS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def recall_report(vectors: np.ndarray, k: int, n_queries: int, rescore_factor: int, pq_m: int):
+    """In kích thước, recall@k (không / có rescoring) và latency của từng kiểu nén"""
+    rng = np.random.default_rng(0)
+    queries = np.asarray(vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)])
+    full = np.asarray(vectors, dtype=np.float32)
+    truths = [set(np.argpartition(-(full @ q), k - 1)[:k].tolist()) for q in queries]
+    
+    logger.info(f"float32: {full.nbytes / 1024:.1f} KB, {len(queries)} queries, recall@{k}")
+    for method in METHODS:
+        store = CompressedVectorStore.build(vectors, method=method, m=pq_m)
+        store.rescore_factor = rescore_factor
+        results = {}
+        for rescore in (False, True):
+            hits = 0
+            started = time.perf_counter()
+            for query, truth in zip(queries, truths):
+                found, _ = store.search(query, k, rescore=rescore)
+                hits += len(truth.intersection(found.tolist()))
+            elapsed_ms = (time.perf_counter() - started) / len(queries) * 1000
+            results[rescore] = (hits / (k * len(queries)), elapsed_ms)
+        
+        logger.info(
+            f"  {method:<8} {store.codes.nbytes / 1024:>9.1f} KB ({full.nbytes / store.codes.nbytes:4.1f}x)  "
+            f"recall={results[False][0]:.4f} ({results[False][1]:.3f} ms)  "
+            f"rescored x{rescore_factor}={results[True][0]:.4f} ({results[True][1]:.3f} ms)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build compressed embedding store for semantic search")
+    parser.add_argument("--model-dir", default=Config.RAG_MODEL_DIR,
+                        help="Thư mục artifact RAG (chứa product_embeddings.npy)")
+    parser.add_argument("--output", default=None,
+                        help="Thư mục output (mặc định: <model-dir>/compressed)")
+    parser.add_argument("--method", default="int8", choices=sorted(METHODS))
+    parser.add_argument("--pq-m", type=int, default=48,
+                        help="Số sub-vector của product quantization")
+    parser.add_argument("--rescore-factor", type=int, default=Config.RAG_RESCORE_FACTOR,
+                        help="Số ứng viên rescoring = rescore_factor * k")
+    parser.add_argument("--report", action="store_true",
+                        help="Chỉ in báo cáo recall vs kích thước, không lưu store")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    
+    vectors = np.load(os.path.join(args.model_dir, EMBEDDINGS_FILENAME), mmap_mode="r")
+    logger.info(f"Loaded embeddings: {vectors.shape[0]} x {vectors.shape[1]} ({vectors.dtype})")
+    
+    if args.report:
+        recall_report(vectors, args.k, args.queries, args.rescore_factor, args.pq_m)
+        return
+    
+    store = CompressedVectorStore.build(vectors, method=args.method, m=args.pq_m)
+    store.rescore_factor = args.rescore_factor
+    store.save(args.output or os.path.join(args.model_dir, "compressed"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import os
+import logging
+from typing import Optional
+
+import pandas as pd
+
+from source_stamp import stale_reason, write_stamp
+
+logger = logging.getLogger(__name__)
+
+# Các trường của product (cùng thứ tự với map_row_to_product) và kiểu khi lưu
+CATALOG_SCHEMA = {
+    "product_id": str,
+    "product_name": str,
+    "category": str,
+    "category_path": list,
+    "category_leaf": str,
+    "category_top": str,
+    "discounted_price": float,
+    "actual_price": float,
+    "discount_percentage": int,
+    "rating": float,
+    "rating_count": int,
+    "about_product": str,
+    "img_link": str,
+    "product_link": str,
+}
+PRODUCT_FIELDS = tuple(CATALOG_SCHEMA)
+
+# Tăng khi đổi CATALOG_SCHEMA hoặc cách chuẩn hóa: catalog đã build sẽ bị bỏ qua
+CATALOG_SCHEMA_VERSION = 1
+
+
+def catalog_stamp_path(path: str) -> str:
+    """Dấu nguồn (source_stamp.py) nằm cạnh file catalog"""
+    return f"{path}.source.json"
+
+
+def catalog_stale_reason(path: str, source_path: str) -> Optional[str]:
+    """None nếu catalog được build từ đúng file CSV hiện tại"""
+    return stale_reason(catalog_stamp_path(path), source_path, CATALOG_SCHEMA_VERSION)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Typed catalog requires pyarrow (pip install pyarrow)") from e
+
+
+def write_catalog(frame: pd.DataFrame, path: str, source_path: Optional[str] = None):
+    """
+    Ghi catalog ra file cột có kiểu (Feather/Arrow IPC, hoặc Parquet theo đuôi file)
+    
+    Feather được ghi không nén để có thể memory-map khi load. Nếu có source_path (CSV
+    gốc), dấu nguồn được ghi sau cùng để data mapper nhận ra khi CSV thay đổi.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    stamp_path = catalog_stamp_path(path)
+    if os.path.exists(stamp_path):
+        os.remove(stamp_path)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, compression="uncompressed")
+    
+    if source_path:
+        write_stamp(stamp_path, source_path, CATALOG_SCHEMA_VERSION)
+    logger.info(f"Wrote typed catalog: {len(frame)} products -> {path}")
+
+
+def read_catalog(path: str) -> pd.DataFrame:
+    """Đọc catalog đã chuẩn hóa; file Feather được memory-map thay vì đọc vào bộ nhớ"""
+    _require_pyarrow()
+    
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=True)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+    
+    missing = [field for field in PRODUCT_FIELDS if field not in table.column_names]
+    if missing:
+        raise ValueError(f"Catalog {path} is missing columns: {missing}")
+    
+    return table.to_pandas(split_blocks=True)
+
@@ -0,0 +1,182 @@
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+PATH_SEPARATORS = (">", "|")
+
+
+class CategoryIndex:
+    """
+    Cây category dựng một lần từ category_path của từng sản phẩm
+    
+    Mỗi node (top, trung gian, leaf) giữ mảng vị trí dòng (int32, đã sắp xếp)
+    của các sản phẩm thuộc node đó, nên lọc theo category chỉ là tra cứu dict
+    thay vì quét regex trên cả cột category.
+    """
+    
+    def __init__(self, paths: Sequence[List[str]], lookup_cache_size: int = 1024):
+        node_positions: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for pos, path in enumerate(paths):
+            for depth in range(1, len(path) + 1):
+                node_positions[tuple(path[:depth])].append(pos)
+        
+        self.n_products = len(paths)
+        self._nodes: Dict[Tuple[str, ...], np.ndarray] = {
+            key: np.asarray(positions, dtype=np.int32)
+            for key, positions in node_positions.items()
+        }
+        
+        # Tra cứu không phân biệt hoa thường theo đường dẫn đầy đủ
+        self._paths_lower: Dict[Tuple[str, ...], Tuple[str, ...]] = {
+            tuple(part.lower() for part in key): key for key in self._nodes
+        }
+        
+        # Tên node (ở bất kỳ cấp nào) → hợp các vị trí của mọi node trùng tên
+        names: Dict[str, List[np.ndarray]] = defaultdict(list)
+        for key, positions in self._nodes.items():
+            names[key[-1].lower()].append(positions)
+        self._by_name: Dict[str, np.ndarray] = {
+            name: arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+            for name, arrays in names.items()
+        }
+        
+        # Mọi hậu tố của mọi tên node, đã sắp xếp: tên chứa query ⇔ có hậu tố bắt đầu bằng query,
+        # nên tìm substring là hai lần bisect thay vì quét từng tên
+        self._names: List[str] = sorted(self._by_name)
+        suffixes = sorted(
+            (name[start:], name_id)
+            for name_id, name in enumerate(self._names)
+            for start in range(len(name))
+        )
+        self._suffixes: List[str] = [suffix for suffix, _ in suffixes]
+        self._suffix_names = np.asarray([name_id for _, name_id in suffixes], dtype=np.int32)
+        
+        self._children: Dict[Tuple[str, ...], List[Tuple[str, ...]]] = defaultdict(list)
+        for key in sorted(self._nodes):
+            self._children[key[:-1]].append(key)
+        
+        self.top_categories: List[str] = [key[0] for key in self._children[()]]
+        self._tree = [self._node_to_dict(key) for key in self._children[()]]
+        
+        # Mã node của từng sản phẩm ở mỗi cấp (-1 nếu đường dẫn ngắn hơn), dùng cho facet
+        self._level_nodes: List[List[Tuple[str, ...]]] = []
+        self._level_codes: List[np.ndarray] = []
+        max_depth = max((len(key) for key in self._nodes), default=0)
+        for depth in range(1, max_depth + 1):
+            level_nodes = sorted(key for key in self._nodes if len(key) == depth)
+            codes = np.full(self.n_products, -1, dtype=np.int32)
+            for code, key in enumerate(level_nodes):
+                codes[self._nodes[key]] = code
+            self._level_nodes.append(level_nodes)
+            self._level_codes.append(codes)
+        
+        self._lookup_cache = LRUCache(lookup_cache_size)
+        
+        logger.info(
+            f"Built category index: {len(self._nodes)} nodes, "
+            f"{len(self.top_categories)} top-level categories"
+        )
+    
+    def __len__(self) -> int:
+        return len(self._nodes)
+    
+    def _node_to_dict(self, key: Tuple[str, ...]) -> Dict[str, Any]:
+        children = self._children.get(key, [])
+        return {
+            "name": key[-1],
+            "path": list(key),
+            "depth": len(key),
+            "count": int(len(self._nodes[key])),
+            "is_leaf": not children,
+            "children": [self._node_to_dict(child) for child in children]
+        }
+    
+    @staticmethod
+    def _split_query(category: str) -> Optional[Tuple[str, ...]]:
+        for separator in PATH_SEPARATORS:
+            if separator in category:
+                return tuple(part.strip() for part in category.split(separator) if part.strip())
+        return None
+    
+    def lookup(self, category: str) -> np.ndarray:
+        """
+        Vị trí các sản phẩm thuộc category (đã sắp xếp)
+        
+        Truy vấn dạng đường dẫn ("Electronics|Headphones") khớp đúng node đó, không còn
+        là regex alternation như str.contains cũ (tên node không chứa '|' nên key facet
+        dùng lại được làm filter). Còn lại lấy hợp các node có tên chứa chuỗi truy vấn.
+        Không phân biệt hoa thường, kết quả được cache (LRU).
+        """
+        query = category.strip().lower()
+        if not query:
+            return np.arange(self.n_products, dtype=np.int32)
+        
+        cached = self._lookup_cache.get(query)
+        if cached is not None:
+            return cached
+        
+        path = self._split_query(query)
+        if path is not None:
+            key = self._paths_lower.get(path)
+            positions = self._nodes[key] if key is not None else np.empty(0, dtype=np.int32)
+        else:
+            matches = [self._by_name[self._names[name_id]] for name_id in self._names_containing(query)]
+            if not matches:
+                positions = np.empty(0, dtype=np.int32)
+            elif len(matches) == 1:
+                positions = matches[0]
+            else:
+                positions = np.unique(np.concatenate(matches))
+        
+        self._lookup_cache.set(query, positions)
+        return positions
+    
+    def _names_containing(self, query: str) -> np.ndarray:
+        """Mã (theo self._names) của các tên node chứa query"""
+        start = bisect_left(self._suffixes, query)
+        end = bisect_left(self._suffixes, query + chr(0x10FFFF), lo=start)
+        return np.unique(self._suffix_names[start:end])
+    
+    def count(self, category: str) -> int:
+        """Số sản phẩm thuộc category"""
+        return int(len(self.lookup(category)))
+    
+    def counts(self, depth: int = 1) -> Dict[str, int]:
+        """Số sản phẩm của từng node ở một cấp (key là đường dẫn nối bằng '|')"""
+        return {
+            "|".join(key): int(len(positions))
+            for key, positions in sorted(self._nodes.items())
+            if len(key) == depth
+        }
+    
+    def facet_counts(self, positions: np.ndarray, depth: int = 1) -> Dict[str, int]:
+        """Số sản phẩm theo từng node ở một cấp, chỉ tính trên các vị trí được chọn"""
+        if depth < 1 or depth > len(self._level_codes):
+            return {}
+        
+        codes = self._level_codes[depth - 1][positions]
+        codes = codes[codes >= 0]
+        level_nodes = self._level_nodes[depth - 1]
+        counts = np.bincount(codes, minlength=len(level_nodes))
+        return {
+            "|".join(level_nodes[code]): int(count)
+            for code, count in enumerate(counts)
+            if count > 0
+        }
+    
+    def tree(self, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cây category kèm số sản phẩm mỗi node (dựng sẵn khi khởi tạo)"""
+        if max_depth is None:
+            return self._tree
+        return [self._prune(node, max_depth) for node in self._tree]
+    
+    def _prune(self, node: Dict[str, Any], max_depth: int) -> Dict[str, Any]:
+        children = node["children"] if node["depth"] < max_depth else []
+        return {**node, "children": [self._prune(child, max_depth) for child in children]}
@@ -0,0 +1,59 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SortedColumnIndex:
+    """
+    Một cột numeric đã sắp xếp sẵn, dựng một lần khi load catalog
+    
+    - order: hoán vị (vị trí dòng) theo giá trị tăng dần, NaN nằm cuối
+    - order_desc: hoán vị theo giá trị giảm dần, NaN nằm cuối
+    - sorted_values: giá trị tương ứng với order
+    
+    Lọc theo khoảng chỉ cần hai lần searchsorted thay vì so sánh trên cả cột.
+    """
+    
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.order = np.argsort(self.values, kind="stable").astype(np.int32)
+        self.order_desc = np.argsort(-self.values, kind="stable").astype(np.int32)
+        self.sorted_values = self.values[self.order]
+        self.n_valid = int(np.count_nonzero(~np.isnan(self.values)))
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def range_bounds(self, low: Optional[float] = None, high: Optional[float] = None):
+        """Khoảng [start, end) trong order ứng với low <= value <= high (bỏ qua NaN)"""
+        valid = self.sorted_values[:self.n_valid]
+        start = 0 if low is None else int(np.searchsorted(valid, low, side="left"))
+        end = self.n_valid if high is None else int(np.searchsorted(valid, high, side="right"))
+        return start, max(start, end)
+    
+    def range_positions(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Vị trí dòng có giá trị trong khoảng, theo thứ tự giá trị tăng dần"""
+        start, end = self.range_bounds(low, high)
+        return self.order[start:end]
+    
+    def range_mask(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Bitset (mảng bool theo vị trí dòng) của các dòng có giá trị trong khoảng"""
+        mask = np.zeros(len(self.values), dtype=bool)
+        mask[self.range_positions(low, high)] = True
+        return mask
+    
+    def permutation(self, descending: bool = False) -> np.ndarray:
+        """Hoán vị dựng sẵn để sắp xếp theo cột (ổn định: cùng giá trị giữ thứ tự dòng)"""
+        return self.order_desc if descending else self.order
+    
+    def histogram(self, positions: Optional[np.ndarray] = None, bins: int = 10):
+        """Histogram giá trị (bỏ qua NaN) trên các dòng được chọn"""
+        values = self.values if positions is None else self.values[positions]
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        counts, edges = np.histogram(values, bins=bins)
+        return counts, edges
@@ -16,18 +16,60 @@ class Config:
     # Data paths
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "amazon.csv")
+    CATALOG_PATH = os.path.join(BASE_DIR, "data", "processed", "amazon.feather")
     MODELS_DIR = os.path.join(BASE_DIR, "models")
     
     # Model paths
     PRICE_MODEL_PATH = os.path.join(MODELS_DIR, "price_prediction", "xgboost_model.joblib")
     RECOMMENDATION_MODEL_PATH = os.path.join(MODELS_DIR, "recommendation", "hybrid_model.joblib")
+    RECOMMENDATION_ARRAYS_DIR = os.path.join(MODELS_DIR, "recommendation", "arrays")
+    CONTENT_NEIGHBORS_TOP_N = 100
+    ANN_NPROBE = 8  # số cụm IVF quét mỗi query: tăng để recall cao hơn, giảm để nhanh hơn
+    ANN_MIN_ITEMS = 10000  # catalog nhỏ hơn thì tìm chính xác (nhanh hơn và không mất recall)
+    
+    # Semantic search (artifact RAG từ 05_rag_system.ipynb)
+    RAG_MODEL_DIR = os.path.join(MODELS_DIR, "rag")
+    RAG_QUERY_ENCODER = os.getenv("RAG_QUERY_ENCODER", "sentence-transformers")  # hoặc "hashing" (offline)
+    RAG_TOP_K_DENSE = 20
+    RAG_TOP_K_SPARSE = 20
+    RAG_VECTOR_STORE_DIR = os.path.join(MODELS_DIR, "rag", "compressed")  # build_vector_store.py
+    RAG_RESCORE_FACTOR = 4
+    RAG_QUANTIZER_MAX_DRIFT = 1.5  # build tăng dần: train lại int8/pq khi sai số nén của vector mới > 1.5x lúc train
+    RAG_RERANKER = os.getenv("RAG_RERANKER", "cross-encoder")  # "token-overlap" (offline) hoặc "none"
+    RAG_RERANK_CANDIDATES = 20
+    RAG_RERANK_BUDGET_MS = 200  # quá hạn thì trả về thứ tự theo điểm hybrid
+    RAG_EMBEDDING_CACHE_SIZE = 4096
+    RAG_BATCH_WINDOW_MS = 5  # thời gian chờ gom các request đồng thời thành một batch
+    RAG_MAX_BATCH_SIZE = 32
+    
+    # Startup: "lazy" | "background" | "eager"
+    SERVICE_INIT_MODE = os.getenv("SERVICE_INIT_MODE", "lazy")
+    # Component khởi tạo lỗi được thử lại ở lần gọi đầu tiên sau SERVICE_RETRY_INTERVAL giây (0 = không thử lại, chờ reload)
+    SERVICE_RETRY_INTERVAL = int(os.getenv("SERVICE_RETRY_INTERVAL", "30"))
+    
+    # Hot reload: kiểm tra version artifact mỗi RELOAD_POLL_INTERVAL giây (0 = chỉ reload qua admin API)
+    RELOAD_POLL_INTERVAL = int(os.getenv("RELOAD_POLL_INTERVAL", "0"))
+    # Token cho /api/admin/* (header X-Admin-Token); không đặt thì chỉ cho phép từ localhost
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
     
     # Cache settings
+    CACHE_ENABLED = True
     CACHE_TIMEOUT = 3600  # 1 hour
+    CACHE_MAX_ENTRIES = 2048
+    CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+    
+    # Batch price prediction
+    PRICE_BATCH_MAX_ROWS = 200000
+    PRICE_BATCH_CHUNK_SIZE = 10000
     
     # Pagination
     DEFAULT_PAGE_SIZE = 50
     MAX_PAGE_SIZE = 1500
+    
+    # Response compression (gzip, hoặc brotli nếu đã cài)
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_LEVEL = 6
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -38,12 +80,16 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     ENV = "production"
+    JSONIFY_PRETTYPRINT_REGULAR = False
     CORS_ORIGINS = ["https://yourdomain.com"]
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    CACHE_ENABLED = False
+    RAG_QUERY_ENCODER = "hashing"
+    RAG_RERANKER = "token-overlap"
 
 config = {
     "development": DevelopmentConfig,
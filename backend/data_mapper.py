@@ -1,27 +1,68 @@
+import os
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Any
 import logging
+from search_index import ProductSearchIndex
+from category_index import CategoryIndex
+from column_index import SortedColumnIndex
+from catalog_store import CATALOG_SCHEMA, PRODUCT_FIELDS, catalog_stale_reason, read_catalog
+from serialization import encode_payloads
 
 logger = logging.getLogger(__name__)
 
+# Tên trường sort của API → cột đã sắp xếp sẵn trong catalog
+SORT_FIELDS = {
+    "price": "discounted_price",
+    "rating": "rating",
+    "rating_count": "rating_count",
+    "discount_percentage": "discount_percentage",
+}
+
 class ProductDataMapper:
     """Ánh xạ dữ liệu từ CSV sang định dạng Product của React template"""
     
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, catalog_path: Optional[str] = None):
         """
         Args:
             csv_path: Đường dẫn đến file CSV
+            catalog_path: File catalog đã chuẩn hóa (Feather/Parquet, xem build_catalog.py),
+                được ưu tiên nếu tồn tại
         """
         self.csv_path = csv_path
+        self.catalog_path = catalog_path
         self.df = None
+        self._id_index: Dict[str, int] = {}
+        self._products: List[Dict[str, Any]] = []
+        self.product_payloads: Dict[int, Any] = {}
+        self._search_index: Optional[ProductSearchIndex] = None
+        self._category_index: Optional[CategoryIndex] = None
+        self._columns: Dict[str, SortedColumnIndex] = {}
         self._load_data()
     
     def _load_data(self):
-        """Tải dữ liệu từ CSV"""
+        """Tải dữ liệu: ưu tiên catalog đã chuẩn hóa (memory-map) nếu còn khớp với CSV, fallback về CSV"""
+        if self.catalog_path and os.path.exists(self.catalog_path):
+            reason = catalog_stale_reason(self.catalog_path, self.csv_path)
+            if reason is not None:
+                logger.warning(
+                    f"Ignoring typed catalog {self.catalog_path} ({reason}), reading {self.csv_path}. "
+                    f"Run `python build_catalog.py` to rebuild it."
+                )
+            else:
+                try:
+                    self.df = read_catalog(self.catalog_path)
+                    logger.info(f"Loaded {len(self.df)} products from typed catalog {self.catalog_path}")
+                    self._build_catalog()
+                    return
+                except Exception as e:
+                    logger.warning(f"Cannot load typed catalog {self.catalog_path}, falling back to CSV: {str(e)}")
+        
         try:
-            self.df = pd.read_csv(self.csv_path)
-            logger.info(f"Loaded {len(self.df)} products from {self.csv_path}")
+            raw = pd.read_csv(self.csv_path)
+            logger.info(f"Loaded {len(raw)} products from {self.csv_path}")
+            self.df = self.normalize_frame(raw)
+            self._build_catalog()
         except FileNotFoundError:
             logger.error(f"CSV file not found: {self.csv_path}")
             raise
@@ -29,6 +70,140 @@ class ProductDataMapper:
             logger.error(f"Error loading CSV: {str(e)}")
             raise
     
+    def _build_catalog(self):
+        """
+        Xây dựng catalog một lần khi load: index product_id → vị trí dòng,
+        search/category index, các cột đã sắp xếp, product dict và JSON bytes
+        của từng product
+        """
+        self.df = self.df.reset_index(drop=True)
+        
+        self._id_index = {}
+        for pos, pid in enumerate(self.df['product_id']):
+            # Giữ dòng đầu tiên nếu product_id bị trùng
+            if pid and pid not in self._id_index:
+                self._id_index[pid] = pos
+        
+        logger.info(f"Built catalog index for {len(self._id_index)} product IDs")
+        
+        # Product dict lấy hàng loạt bằng to_dict('records'), JSON bytes encode sẵn một lần
+        self._products = self.df.to_dict('records')
+        for product in self._products:
+            product['category_path'] = [str(part) for part in product['category_path']]
+        self.product_payloads = encode_payloads(self._products)
+        
+        self._search_index = ProductSearchIndex(self.df['product_name'], self.df['category'])
+        self._category_index = CategoryIndex([list(path) for path in self.df['category_path']])
+        
+        # Cột numeric dùng để lọc theo khoảng và sắp xếp, sắp xếp sẵn một lần
+        self._columns = {
+            column: SortedColumnIndex(self.df[column])
+            for column in SORT_FIELDS.values()
+        }
+    
+    def _string_column(self, df: pd.DataFrame, column: str, default: str = "") -> pd.Series:
+        """Phiên bản theo cột của _clean_string"""
+        if column not in df.columns:
+            return pd.Series(default, index=df.index, dtype=object)
+        values = df[column].astype(object)
+        return values.where(values.notna(), None).map(
+            lambda value: default if value is None else str(value).strip()
+        )
+    
+    @staticmethod
+    def _numeric_column(df: pd.DataFrame, column: str) -> pd.Series:
+        """Phiên bản theo cột của _clean_numeric (giá trị lỗi/NaN → 0)"""
+        if column not in df.columns:
+            return pd.Series(0.0, index=df.index)
+        return pd.to_numeric(df[column], errors='coerce').fillna(0.0).astype(np.float64)
+    
+    @classmethod
+    def price_features(cls, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """
+        actual_price, rating, rating_count làm sạch như trong catalog (dùng cả cho reprice.py)
+        
+        Giá trị lỗi/NaN → 0, actual_price >= 0, rating trong 0..5, rating_count nguyên >= 0.
+        """
+        return {
+            "actual_price": cls._numeric_column(df, 'actual_price').clip(lower=0),
+            "rating": cls._numeric_column(df, 'rating').clip(0, 5),
+            "rating_count": np.trunc(cls._numeric_column(df, 'rating_count')).clip(lower=0),
+        }
+    
+    def normalize_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Chuẩn hóa cả DataFrame theo cột, cùng quy tắc với map_row_to_product
+        
+        Kết quả có đúng các trường của product (CATALOG_SCHEMA) với kiểu cố định,
+        nên product dict chỉ cần lấy hàng loạt bằng to_dict('records').
+        """
+        df = df.reset_index(drop=True)
+        
+        category = self._string_column(df, 'category')
+        # Parse mỗi category string một lần (số giá trị unique nhỏ hơn nhiều số dòng)
+        parsed = {value: self._parse_category_path(value) for value in category.unique()}
+        category_path = category.map(parsed)
+        
+        actual_price = self._numeric_column(df, 'actual_price')
+        discounted_price = self._numeric_column(df, 'discounted_price')
+        price_features = self.price_features(df)
+        
+        product_id = self._string_column(df, 'product_id')
+        missing_id = product_id == ""
+        product_id[missing_id] = [f"prod_{pos}" for pos in np.flatnonzero(missing_id)]
+        
+        frame = pd.DataFrame({
+            "product_id": product_id,
+            "product_name": self._string_column(df, 'product_name', "Unknown Product"),
+            "category": category,
+            "category_path": category_path,
+            "category_leaf": category_path.map(self._get_category_leaf),
+            "category_top": category_path.map(self._get_category_top),
+            "discounted_price": discounted_price.clip(lower=0),
+            "actual_price": price_features["actual_price"],
+            "discount_percentage": self._discount_percentage(
+                actual_price, discounted_price,
+                self._numeric_column(df, 'discount_percentage')
+            ),
+            "rating": price_features["rating"],
+            "rating_count": price_features["rating_count"],
+            "about_product": self._string_column(df, 'about_product'),
+            "img_link": self._string_column(df, 'img_link'),
+            "product_link": self._string_column(df, 'product_link'),
+        }, columns=list(PRODUCT_FIELDS))
+        
+        for field, kind in CATALOG_SCHEMA.items():
+            if kind is float:
+                frame[field] = frame[field].astype(np.float64)
+            elif kind is int:
+                frame[field] = frame[field].astype(np.int64)
+        
+        logger.info(f"Normalized {len(frame)} rows")
+        return frame
+    
+    @staticmethod
+    def _discount_percentage(actual_price: pd.Series,
+                             discounted_price: pd.Series,
+                             fallback: pd.Series) -> np.ndarray:
+        """discount_percentage cho cả cột, cùng công thức với map_row_to_product"""
+        actual = actual_price.to_numpy(np.float64)
+        discounted = discounted_price.to_numpy(np.float64)
+        
+        computed = np.zeros(len(actual), dtype=np.float64)
+        has_prices = (actual > 0) & (discounted > 0)
+        np.divide((actual - discounted) * 100, actual, out=computed, where=has_prices)
+        
+        computed = np.where(has_prices, computed, fallback.to_numpy(np.float64))
+        return np.clip(np.trunc(computed), 0, 100).astype(np.int64)
+    
+    def _get_products_at(self, positions) -> List[Dict[str, Any]]:
+        """Lấy products theo vị trí dòng, giữ thứ tự"""
+        return [self._products[int(pos)] for pos in positions]
+    
+    def _get_product_at(self, pos: int) -> Dict[str, Any]:
+        """Lấy product đã chuẩn hóa theo vị trí dòng"""
+        return self._products[pos]
+    
     def _parse_category_path(self, category: str) -> List[str]:
         """
         Parse category string thành array
@@ -143,98 +318,180 @@ class ProductDataMapper:
         if self.df is None:
             return []
         
-        products = []
-        for idx, row in self.df.iterrows():
-            try:
-                product = self.map_row_to_product(row)
-                products.append(product)
-            except Exception as e:
-                logger.warning(f"Skipping row {idx}: {str(e)}")
-                continue
+        return self._get_products_at(range(len(self.df)))
+    
+    def get_products_by_ids(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lấy products theo danh sách ID, giữ nguyên thứ tự đầu vào
+        
+        Chỉ tra cứu qua index nên chi phí là O(k) thay vì O(catalog).
+        ID không tồn tại trong catalog sẽ bị bỏ qua.
+        """
+        if self.df is None:
+            return []
         
-        return products
+        positions = [self._id_index[pid] for pid in product_ids if pid in self._id_index]
+        return self._get_products_at(positions)
     
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
-        """Lấy product theo ID"""
-        if self.df is None:
+        """Lấy product theo ID (tra cứu O(1) qua index, không quét DataFrame)"""
+        if self.df is None or not product_id:
             return None
         
-        row = self.df[self.df['product_id'] == product_id]
-        if row.empty:
+        pos = self._id_index.get(product_id)
+        if pos is None:
+            pos = self._id_index.get(product_id.strip())
+        if pos is None:
             return None
         
-        return self.map_row_to_product(row.iloc[0])
+        return self._get_product_at(pos)
     
     def get_unique_categories(self) -> List[str]:
-        """Lấy danh sách unique categories (category_top)"""
-        if self.df is None:
+        """Lấy danh sách unique categories (category_top), dựng sẵn trong category index"""
+        if self.df is None or self._category_index is None:
+            return []
+        
+        return list(self._category_index.top_categories)
+    
+    def get_category_tree(self, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cây category kèm số sản phẩm từng node (dùng cho faceting)"""
+        if self.df is None or self._category_index is None:
             return []
         
-        categories = set()
-        for category_str in self.df['category'].dropna():
-            path = self._parse_category_path(category_str)
-            if path:
-                categories.add(path[0])
+        return self._category_index.tree(max_depth)
+    
+    def get_category_counts(self, depth: int = 1) -> Dict[str, int]:
+        """Số sản phẩm theo category ở một cấp của cây"""
+        if self.df is None or self._category_index is None:
+            return {}
         
-        return sorted(list(categories))
+        return self._category_index.counts(depth)
     
     def search_products(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Tìm kiếm products theo tên hoặc category"""
-        if self.df is None or not query:
+        """
+        Tìm kiếm products theo tên hoặc category
+        
+        Dùng inverted index + n-gram index dựng sẵn khi load, kết quả xếp hạng theo BM25.
+        """
+        if self.df is None or not query or self._search_index is None:
             return []
         
-        query_lower = query.lower()
-        mask = (
-            self.df['product_name'].str.lower().str.contains(query_lower, na=False) |
-            self.df['category'].str.lower().str.contains(query_lower, na=False)
-        )
+        return self._get_products_at(self._search_index.search(query, limit=limit))
+    
+    def _filter_mask(self,
+                     category: Optional[str] = None,
+                     min_price: Optional[float] = None,
+                     max_price: Optional[float] = None,
+                     min_rating: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Gộp các điều kiện lọc thành một bitset theo vị trí dòng (không copy DataFrame)
+        
+        Returns:
+            Mảng bool độ dài = số dòng, hoặc None nếu không có điều kiện nào
+        """
+        masks = []
         
-        results = []
-        for idx, row in self.df[mask].head(limit).iterrows():
-            try:
-                product = self.map_row_to_product(row)
-                results.append(product)
-            except Exception as e:
-                logger.warning(f"Error in search for row {idx}: {str(e)}")
-                continue
+        # Category: tra cứu vị trí trong category index
+        if category and self._category_index is not None:
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[self._category_index.lookup(category)] = True
+            masks.append(mask)
         
-        return results
+        # Khoảng giá / rating: searchsorted trên mảng đã sắp xếp
+        if (min_price is not None or max_price is not None) and 'discounted_price' in self._columns:
+            masks.append(self._columns['discounted_price'].range_mask(min_price, max_price))
+        
+        if min_rating is not None and 'rating' in self._columns:
+            masks.append(self._columns['rating'].range_mask(min_rating, None))
+        
+        if not masks:
+            return None
+        
+        combined = masks[0]
+        for mask in masks[1:]:
+            combined &= mask
+        return combined
     
-    def filter_products(self, 
+    def query_products(self,
                        category: Optional[str] = None,
                        min_price: Optional[float] = None,
                        max_price: Optional[float] = None,
                        min_rating: Optional[float] = None,
-                       limit: int = 500) -> List[Dict[str, Any]]:
-        """Lọc products theo các tiêu chí"""
+                       offset: int = 0,
+                       limit: int = 50,
+                       sort_by: Optional[str] = None,
+                       descending: bool = False,
+                       include_facets: bool = False,
+                       facet_depth: int = 1,
+                       histogram_bins: int = 10) -> Dict[str, Any]:
+        """
+        Lọc, sắp xếp products và trả về một trang kết quả
+        
+        Sắp xếp dùng hoán vị dựng sẵn của từng cột (SORT_FIELDS), lọc chỉ là chọn
+        các phần tử của hoán vị theo bitset. Chỉ các dòng trong trang mới được chuẩn
+        hóa sang product dict, nên trang sâu không phải dựng lại toàn bộ kết quả.
+        
+        Returns:
+            Dict với keys: items, total, offset, limit (và facets nếu include_facets)
+        """
         if self.df is None:
-            return []
+            return {"items": [], "total": 0, "offset": offset, "limit": limit}
         
-        df_filtered = self.df.copy()
+        if sort_by is not None and sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
         
-        # Filter by category
-        if category:
-            mask = df_filtered['category'].str.contains(category, na=False, case=False)
-            df_filtered = df_filtered[mask]
+        offset = max(0, offset)
+        limit = max(0, limit)
         
-        # Filter by price range
-        if min_price is not None:
-            df_filtered = df_filtered[df_filtered['discounted_price'] >= min_price]
+        mask = self._filter_mask(category, min_price, max_price, min_rating)
         
-        if max_price is not None:
-            df_filtered = df_filtered[df_filtered['discounted_price'] <= max_price]
+        column = self._columns.get(SORT_FIELDS[sort_by]) if sort_by else None
+        if column is not None:
+            permutation = column.permutation(descending)
+            positions = permutation[mask[permutation]] if mask is not None else permutation
+        else:
+            positions = np.flatnonzero(mask) if mask is not None else np.arange(len(self.df))
         
-        # Filter by minimum rating
-        if min_rating is not None:
-            df_filtered = df_filtered[df_filtered['rating'] >= min_rating]
+        items = self._get_products_at(positions[offset:offset + limit])
+        
+        page = {
+            "items": items,
+            "total": int(len(positions)),
+            "offset": offset,
+            "limit": limit
+        }
+        if include_facets:
+            page["facets"] = self._facets(positions, facet_depth, histogram_bins)
+        return page
+    
+    def _facets(self, positions: np.ndarray, depth: int, bins: int) -> Dict[str, Any]:
+        """Facet category và histogram giá trên toàn bộ kết quả đã lọc (không chỉ trang hiện tại)"""
+        facets: Dict[str, Any] = {}
         
-        results = []
-        for idx, row in df_filtered.head(limit).iterrows():
-            try:
-                product = self.map_row_to_product(row)
-                results.append(product)
-            except Exception as e:
-                logger.warning(f"Error in filter for row {idx}: {str(e)}")
-                continue
+        if self._category_index is not None:
+            facets["category"] = self._category_index.facet_counts(positions, depth)
         
-        return results
\ No newline at end of file
+        price = self._columns.get('discounted_price')
+        if price is not None:
+            counts, edges = price.histogram(positions, bins)
+            facets["price_histogram"] = {
+                "counts": counts.tolist(),
+                "edges": [round(float(edge), 2) for edge in edges]
+            }
+        
+        return facets
+    
+    def filter_products(self, 
+                       category: Optional[str] = None,
+                       min_price: Optional[float] = None,
+                       max_price: Optional[float] = None,
+                       min_rating: Optional[float] = None,
+                       limit: int = 500) -> List[Dict[str, Any]]:
+        """Lọc products theo các tiêu chí (trang đầu tiên của query_products)"""
+        return self.query_products(
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            limit=limit
+        )["items"]
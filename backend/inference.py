@@ -0,0 +1,110 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tín hiệu dừng worker, đưa vào queue bởi MicroBatcher.close()
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Gom các request đồng thời thành một lần gọi model
+    
+    submit(item) trả về Future. Worker thread lấy item đầu tiên trong queue rồi chờ
+    thêm tối đa max_wait_ms (hoặc đến khi đủ max_batch_size) và gọi fn(items) một lần;
+    fn phải trả về list kết quả cùng thứ tự. Future đã bị cancel trước khi batch chạy
+    (ví dụ hết latency budget) sẽ bị bỏ qua.
+    """
+    
+    def __init__(self,
+                 fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 name: str = "micro-batcher"):
+        self._fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+    
+    def _ensure_worker(self):
+        # Gọi khi đang giữ self._lock. Worker được tạo ở lần submit đầu tiên (sau fork của gunicorn worker)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+    
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._ensure_worker()
+            self._queue.put((item, future))
+        return future
+    
+    def close(self):
+        """Dừng worker sau khi xử lý hết các item đang chờ; submit sau đó sẽ tạo lại worker"""
+        self._queue.put((_STOP, None))
+    
+    def _collect(self) -> Optional[list]:
+        """Lấy một batch từ queue, None nếu worker cần dừng"""
+        first = self._queue.get()
+        if first[0] is _STOP:
+            with self._lock:
+                if self._queue.empty():
+                    self._thread = None
+                    return None
+            # Có item được submit sau close: xử lý xong rồi mới dừng
+            self._queue.put(first)
+            return []
+        
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry[0] is _STOP:
+                self._queue.put(entry)
+                break
+            batch.append(entry)
+        return batch
+    
+    def _run(self):
+        while True:
+            collected = self._collect()
+            if collected is None:
+                return
+            batch = [(item, future) for item, future in collected if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self._fn([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "pending": self._queue.qsize()
+        }
@@ -1,22 +1,35 @@
 import joblib
 import logging
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Sequence, Union
 import numpy as np
-from scipy.sparse import csr_matrix
+from ranking import top_k as select_top_k
+from neighbors import ContentNeighborTable
+from artifacts import get_recommendation_artifacts
 
 logger = logging.getLogger(__name__)
 
 class ModelsService:
     """Service để load và sử dụng ML models"""
     
-    def __init__(self, price_model_path: str, recommendation_model_path: str):
+    def __init__(self,
+                 price_model_path: str,
+                 recommendation_model_path: Optional[str],
+                 recommendation_arrays_dir: Optional[str] = None,
+                 ann_nprobe: Optional[int] = None,
+                 ann_min_items: int = 0,
+                 recommendation_artifacts: Optional[Dict[str, Any]] = None):
         self.price_model = None
         self.recommendation_model = None
-        self.recommendation_artifacts = None
+        # Artifact đã load sẵn (hot reload); None thì lấy từ registry
+        self.recommendation_artifacts = recommendation_artifacts
+        self.content_neighbors: Optional[ContentNeighborTable] = None
+        self.recommendation_arrays_dir = recommendation_arrays_dir
+        self.ann_nprobe = ann_nprobe
+        self.ann_min_items = ann_min_items
         self._load_models(price_model_path, recommendation_model_path)
     
-    def _load_models(self, price_model_path: str, recommendation_model_path: str):
-        """Load models từ disk"""
+    def _load_models(self, price_model_path: str, recommendation_model_path: Optional[str]):
+        """Load models từ disk (bỏ qua recommendation model nếu path là None)"""
         try:
             loaded_data = joblib.load(price_model_path)
             
@@ -37,13 +50,21 @@ class ModelsService:
         except Exception as e:
             logger.error(f"Error loading price model: {str(e)}")
         
+        if recommendation_model_path is None:
+            return
+        
         try:
-            self.recommendation_artifacts = joblib.load(recommendation_model_path)
+            # Dùng chung artifact registry: mỗi process chỉ load một lần (mmap)
+            if self.recommendation_artifacts is None:
+                self.recommendation_artifacts = get_recommendation_artifacts(
+                    recommendation_model_path, self.recommendation_arrays_dir
+                )
             
             if self.recommendation_artifacts is None:
                 logger.warning("Recommendation artifacts are None after loading")
             else:
                 logger.info("✅ Hybrid recommendation model artifacts loaded successfully")
+                self.content_neighbors = self.recommendation_artifacts.get("content_neighbors")
                 logger.info(f"Available artifacts: {list(self.recommendation_artifacts.keys())}")
         
         except FileNotFoundError:
@@ -52,54 +73,71 @@ class ModelsService:
             logger.error(f"Error loading recommendation model: {str(e)}")
 
     def _recommend_collab(self, user_id: str, top_k: int = 10) -> List[str]:
-        """Generate collaborative filtering recommendations"""
+        """
+        Generate collaborative filtering recommendations
+        
+        User đã biết lấy trực tiếp từ bảng top-K tính sẵn (build_artifacts.py); chỉ
+        user mới (chưa có trong bảng) hoặc top_k lớn hơn K mới tính U[user] @ V.T.
+        """
         try:
-            enc = {
-                "user": self.recommendation_artifacts["user_encoder"],
-                "product": self.recommendation_artifacts["product_encoder"]
-            }
-            U = self.recommendation_artifacts["U"]
-            V = self.recommendation_artifacts["V"]
-            pop_rank = self.recommendation_artifacts["pop_rank"]
+            user_id2idx = self.recommendation_artifacts["user_id2idx"]
+            product_idx2pid = self.recommendation_artifacts["product_idx2pid"]
             
             # Encode user_id
-            if user_id not in enc["user"].classes_:
+            user_idx = user_id2idx.get(user_id)
+            if user_idx is None:
                 logger.warning(f"User ID {user_id} not in training data")
                 return []
             
-            user_idx = enc["user"].transform([user_id])[0]
-            
-            # Calculate predicted ratings
-            user_vector = U[user_idx]
-            predicted_ratings = user_vector @ V.T
-            
-            # Get top K recommendations
-            top_indices = np.argsort(predicted_ratings)[::-1][:top_k]
+            user_topk = self.recommendation_artifacts.get("user_topk")
+            if user_topk is not None and user_topk.covers(user_idx, top_k):
+                top_indices, _ = user_topk.row(user_idx, top_k)
+            else:
+                U = self.recommendation_artifacts["U"]
+                item_index = self._ann_index("item_index")
+                
+                if item_index is not None:
+                    # ANN trên item factors: chỉ chấm điểm các cụm gần nhất
+                    top_indices, _ = item_index.search(U[user_idx], top_k, nprobe=self.ann_nprobe)
+                else:
+                    # Calculate predicted ratings
+                    predicted_ratings = U[user_idx] @ self.recommendation_artifacts["V"].T
+                    
+                    # Get top K recommendations
+                    top_indices = select_top_k(predicted_ratings, top_k)
             
             # Convert back to product IDs
-            recommended_product_ids = enc["product"].inverse_transform(top_indices)
-            
-            return recommended_product_ids.tolist()
+            return [product_idx2pid[int(idx)] for idx in top_indices]
             
         except Exception as e:
             logger.error(f"Error in collaborative recommendation: {str(e)}")
             return []
 
+    def _ann_index(self, name: str):
+        """ANN index đã build (build_ann.py), chỉ dùng khi catalog đủ lớn để đáng đánh đổi recall"""
+        index = self.recommendation_artifacts.get(name)
+        if index is None or len(index) < self.ann_min_items:
+            return None
+        return index
+    
     def _recommend_content_based_single(self, product_id: str, top_k: int = 5) -> List[str]:
         """Generate content-based recommendations for single product"""
         try:
             content_pid2idx = self.recommendation_artifacts["content_pid2idx"]
             content_idx2pid = self.recommendation_artifacts["content_idx2pid"]
-            content_similarity = self.recommendation_artifacts["content_similarity"]
+            
+            if self.content_neighbors is None:
+                logger.warning("Content neighbor table not available")
+                return []
             
             if product_id not in content_pid2idx:
                 logger.warning(f"Product ID {product_id} not in content model")
                 return []
             
             product_idx = content_pid2idx[product_id]
-            similar_indices = np.argsort(content_similarity[product_idx])[::-1][1:top_k+1]
+            similar_indices, _ = self.content_neighbors.row(product_idx, top_k)
             
-            recommended_product_ids = [content_idx2pid[idx] for idx in similar_indices]
+            recommended_product_ids = [content_idx2pid[int(idx)] for idx in similar_indices]
             return recommended_product_ids
             
         except Exception as e:
@@ -111,7 +149,10 @@ class ModelsService:
         try:
             content_pid2idx = self.recommendation_artifacts["content_pid2idx"]
             content_idx2pid = self.recommendation_artifacts["content_idx2pid"]
-            content_similarity = self.recommendation_artifacts["content_similarity"]
+            
+            if self.content_neighbors is None:
+                logger.warning("Content neighbor table not available")
+                return []
             
             # Lấy indices của tất cả products
             product_indices = []
@@ -127,25 +168,19 @@ class ModelsService:
             if not product_indices:
                 return []
             
-            # Tính similarity tổng hợp từ nhiều products
-            similarity_scores = {}
+            # Tính similarity tổng hợp từ nhiều products trong một lần: mỗi product lấy
+            # top 2*top_k sản phẩm tương tự (bỏ qua các product đầu vào)
+            seeds = np.asarray(product_indices, dtype=np.intp)
+            is_seed = np.zeros(len(self.content_neighbors), dtype=bool)
+            is_seed[seeds] = True
             
-            for idx in product_indices:
-                # Lấy top 2*top_k sản phẩm tương tự cho mỗi product
-                similar_indices = np.argsort(content_similarity[idx])[::-1][1:top_k*2+1]
-                
-                for similar_idx in similar_indices:
-                    similar_pid = content_idx2pid[similar_idx]
-                    # Chỉ thêm nếu không phải là product đầu vào
-                    if similar_pid not in valid_product_ids:
-                        current_score = content_similarity[idx][similar_idx]
-                        similarity_scores[similar_pid] = similarity_scores.get(similar_pid, 0) + current_score
+            similarity_scores, touched = self.content_neighbors.aggregate(
+                seeds, top_k * 2, weighting="similarity", skip=is_seed
+            )
             
             # Sắp xếp theo similarity score và lấy top_k
-            sorted_recommendations = sorted(similarity_scores.items(), 
-                                         key=lambda x: x[1], reverse=True)[:top_k]
-            
-            return [pid for pid, score in sorted_recommendations]
+            top_indices = select_top_k(similarity_scores, top_k, exclude=~touched)
+            return [content_idx2pid[int(idx)] for idx in top_indices]
             
         except Exception as e:
             logger.error(f"Error in content-based recommendation for multiple products: {str(e)}")
@@ -159,21 +194,33 @@ class ModelsService:
         Chuẩn bị features cho price prediction
         """
         try:
-            is_popular = 1 if rating_count > 1000 else 0
-            
-            features = np.array([[
-                actual_price,
-                rating,
-                rating_count,
-                is_popular
-            ]])
-            
-            return features
+            return self._prepare_price_features_batch([actual_price], [rating], [rating_count])
         
         except Exception as e:
             logger.error(f"Error preparing features: {str(e)}")
             return np.array([[0, 0, 0, 0]])
     
+    def _prepare_price_features_batch(self,
+                                     actual_price: Sequence[float],
+                                     rating: Sequence[float],
+                                     rating_count: Sequence[int]) -> np.ndarray:
+        """
+        Chuẩn bị ma trận features (n, 4) cho nhiều sản phẩm trong một lần
+        
+        Cùng thứ tự cột với mô hình: actual_price, rating, rating_count, is_popular
+        """
+        actual_price = np.asarray(actual_price, dtype=np.float64)
+        rating = np.asarray(rating, dtype=np.float64)
+        rating_count = np.asarray(rating_count, dtype=np.float64)
+        is_popular = (rating_count > 1000).astype(np.float64)
+        
+        return np.column_stack([actual_price, rating, rating_count, is_popular])
+    
+    @staticmethod
+    def _clamp_predictions(predicted_price: np.ndarray, actual_price: np.ndarray) -> np.ndarray:
+        """Ensure predicted price is reasonable: trong khoảng [100, actual_price * 2]"""
+        return np.maximum(100, np.minimum(predicted_price, actual_price * 2))
+    
     def predict_price(self, 
                      actual_price: float,
                      rating: float,
@@ -192,10 +239,10 @@ class ModelsService:
                 logger.error(f"Model không có method 'predict'. Type: {type(self.price_model)}")
                 return None
             
-            predicted_price = float(self.price_model.predict(features)[0])
+            predicted_price = self.price_model.predict(features)
             
             # Ensure predicted price is reasonable
-            predicted_price = max(100, min(predicted_price, actual_price * 2))
+            predicted_price = float(self._clamp_predictions(predicted_price, features[:, 0])[0])
             
             return {
                 "original_price": float(actual_price),
@@ -207,6 +254,48 @@ class ModelsService:
             logger.error(f"Error predicting price: {str(e)}")
             return None
     
+    def predict_prices(self,
+                       actual_price: Sequence[float],
+                       rating: Sequence[float],
+                       rating_count: Sequence[int],
+                       chunk_size: int = 10000) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Dự đoán giá bán cho nhiều sản phẩm (batch)
+        
+        Features được dựng trong một lần bằng NumPy, mô hình được gọi theo từng
+        chunk `chunk_size` dòng để giảm overhead mỗi lần gọi mà vẫn giới hạn bộ nhớ.
+        
+        Returns:
+            Dict gồm các mảng original_price, predicted_price và confidence
+        """
+        if self.price_model is None:
+            logger.warning("Price model not available")
+            return None
+        
+        if not hasattr(self.price_model, 'predict'):
+            logger.error(f"Model không có method 'predict'. Type: {type(self.price_model)}")
+            return None
+        
+        try:
+            features = self._prepare_price_features_batch(actual_price, rating, rating_count)
+            n_rows = features.shape[0]
+            chunk_size = max(1, chunk_size)
+            
+            predicted_price = np.empty(n_rows, dtype=np.float64)
+            for start in range(0, n_rows, chunk_size):
+                end = min(start + chunk_size, n_rows)
+                predicted_price[start:end] = self.price_model.predict(features[start:end])
+            
+            return {
+                "original_price": features[:, 0],
+                "predicted_price": self._clamp_predictions(predicted_price, features[:, 0]),
+                "confidence": 0.92
+            }
+        
+        except Exception as e:
+            logger.error(f"Error predicting prices in batch: {str(e)}")
+            return None
+    
     def get_recommendations(self, 
                            product_id: Optional[Union[str, List[str]]] = None,
                            user_id: str = None,
@@ -0,0 +1,204 @@
+import os
+import logging
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from ranking import top_k_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_N = 100
+DEFAULT_USER_TOP_K = 50
+
+
+class TopNTable:
+    """
+    Bảng top-N tính sẵn: dòng i là N cột có điểm cao nhất của dòng i trong một ma
+    trận điểm, đã sắp xếp giảm dần, nên mỗi request chỉ là một slice
+    
+    - indices: int32 (n_rows, N), ô trống được gán -1
+    - scores: float32 (n_rows, N)
+    
+    Lớp con đặt tên file .npy (INDICES_FILENAME, SCORES_FILENAME) và cách tính điểm.
+    """
+    
+    INDICES_FILENAME = ""
+    SCORES_FILENAME = ""
+    DESCRIPTION = "top-N table"
+    
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        if indices.shape != scores.shape:
+            raise ValueError(f"Shape mismatch: indices {indices.shape} vs scores {scores.shape}")
+        self.indices = indices
+        self.scores = scores
+    
+    def __len__(self) -> int:
+        return self.indices.shape[0]
+    
+    @property
+    def top_n(self) -> int:
+        return self.indices.shape[1]
+    
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.scores.nbytes
+    
+    @classmethod
+    def _from_blocks(cls,
+                     n_rows: int,
+                     top_n: int,
+                     blocks: Iterable[Tuple[int, np.ndarray, Optional[np.ndarray]]]) -> "TopNTable":
+        """Dựng bảng từ các khối (start, điểm các dòng, mask loại trừ) để giới hạn bộ nhớ"""
+        indices = np.full((n_rows, top_n), -1, dtype=np.int32)
+        scores = np.zeros((n_rows, top_n), dtype=np.float32)
+        
+        for start, rows, exclude in blocks:
+            end = start + rows.shape[0]
+            block = top_k_batch(rows, top_n, exclude=exclude)
+            indices[start:end] = block
+            scores[start:end] = np.where(block >= 0, np.take_along_axis(rows, np.maximum(block, 0), axis=1), 0.0)
+        
+        logger.info(f"Built {cls.DESCRIPTION}: {n_rows} rows x {top_n}")
+        return cls(indices, scores)
+    
+    @classmethod
+    def load(cls, arrays_dir: str, mmap_mode: Optional[str] = "r") -> "TopNTable":
+        """Load bảng từ thư mục .npy; mặc định memory-map để các worker dùng chung page cache"""
+        return cls(
+            np.load(os.path.join(arrays_dir, cls.INDICES_FILENAME), mmap_mode=mmap_mode),
+            np.load(os.path.join(arrays_dir, cls.SCORES_FILENAME), mmap_mode=mmap_mode)
+        )
+    
+    @classmethod
+    def exists(cls, arrays_dir: str) -> bool:
+        return all(
+            os.path.exists(os.path.join(arrays_dir, name))
+            for name in (cls.INDICES_FILENAME, cls.SCORES_FILENAME)
+        )
+    
+    def save(self, arrays_dir: str):
+        os.makedirs(arrays_dir, exist_ok=True)
+        np.save(os.path.join(arrays_dir, self.INDICES_FILENAME), np.ascontiguousarray(self.indices))
+        np.save(os.path.join(arrays_dir, self.SCORES_FILENAME), np.ascontiguousarray(self.scores))
+        logger.info(f"Saved {self.DESCRIPTION} to {arrays_dir} ({self.nbytes / 1024:.1f} KB)")
+    
+    def covers(self, idx: int, k: int) -> bool:
+        """Bảng có đủ k phần tử cho dòng này không (dòng mới / k lớn hơn N thì không)"""
+        return 0 <= idx < len(self) and k <= self.top_n
+    
+    def row(self, idx: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k phần tử tốt nhất của một dòng (bỏ ô trống)"""
+        indices = self.indices[idx, :k]
+        valid = indices >= 0
+        return indices[valid], self.scores[idx, :k][valid]
+
+
+class ContentNeighborTable(TopNTable):
+    """
+    Bảng top-N neighbor cho content-based recommendation
+    
+    Thay cho ma trận similarity dày N×N: mỗi sản phẩm chỉ giữ N_top neighbor
+    (không gồm chính nó) đã sắp xếp giảm dần theo similarity.
+    """
+    
+    INDICES_FILENAME = "content_neighbor_indices.npy"
+    SCORES_FILENAME = "content_neighbor_scores.npy"
+    DESCRIPTION = "content neighbor table"
+    
+    @classmethod
+    def from_dense(cls,
+                   similarity: np.ndarray,
+                   top_n: int = DEFAULT_TOP_N,
+                   chunk_size: int = 1024) -> "ContentNeighborTable":
+        """Xây bảng từ ma trận similarity dày, xử lý theo từng khối dòng"""
+        n = similarity.shape[0]
+        
+        def blocks():
+            for start in range(0, n, chunk_size):
+                end = min(start + chunk_size, n)
+                rows = similarity[start:end]
+                rows = rows.toarray() if hasattr(rows, "toarray") else np.asarray(rows, dtype=np.float64)
+                
+                # Loại trừ chính sản phẩm (đường chéo)
+                self_mask = np.zeros(rows.shape, dtype=bool)
+                self_mask[np.arange(end - start), np.arange(start, end)] = True
+                yield start, rows, self_mask
+        
+        return cls._from_blocks(n, max(0, min(top_n, n - 1)), blocks())
+    
+    def aggregate(self,
+                  seeds: np.ndarray,
+                  depth: int,
+                  weighting: str = "reciprocal_rank",
+                  skip: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cộng dồn điểm neighbor của nhiều seed vào một vector độ dài N
+        
+        Lấy tất cả các dòng seed trong một lần gather, rồi cộng bằng np.add.at thay
+        vì vòng lặp dict theo từng seed.
+        
+        Args:
+            seeds: Chỉ số các sản phẩm seed (được phép trùng, mỗi lần trùng cộng thêm một lượt)
+            depth: Số neighbor hợp lệ đầu tiên lấy từ mỗi seed
+            weighting: "reciprocal_rank" (1 / (rank + 1)) hoặc "similarity"
+            skip: Mask bool độ dài N của các sản phẩm bị bỏ qua trước khi tính rank
+        
+        Returns:
+            (scores, touched): điểm tổng hợp float64 (N,) và mask các sản phẩm
+            đã nhận điểm từ ít nhất một seed
+        """
+        if weighting not in ("reciprocal_rank", "similarity"):
+            raise ValueError(f"Unknown weighting: {weighting}")
+        
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float64)
+        touched = np.zeros(n, dtype=bool)
+        seeds = np.asarray(seeds, dtype=np.intp)
+        if seeds.size == 0 or depth <= 0:
+            return scores, touched
+        
+        rows = np.asarray(self.indices[seeds])
+        valid = rows >= 0
+        if skip is not None:
+            valid &= ~skip[np.maximum(rows, 0)]
+        
+        rank = np.cumsum(valid, axis=1) - 1
+        keep = valid & (rank < depth)
+        
+        if weighting == "reciprocal_rank":
+            weights = 1.0 / (rank[keep] + 1)
+        else:
+            weights = np.asarray(self.scores[seeds], dtype=np.float64)[keep]
+        
+        np.add.at(scores, rows[keep], weights)
+        touched[rows[keep]] = True
+        return scores, touched
+
+
+class UserTopKTable(TopNTable):
+    """
+    Danh sách top-K sản phẩm tính sẵn cho mỗi user từ các factor U, V
+    
+    Dòng thứ i là kết quả của U[i] @ V.T, chỉ số sản phẩm theo product_encoder.
+    """
+    
+    INDICES_FILENAME = "user_topk_indices.npy"
+    SCORES_FILENAME = "user_topk_scores.npy"
+    DESCRIPTION = "user top-K table"
+    
+    @classmethod
+    def from_factors(cls,
+                     U: np.ndarray,
+                     V: np.ndarray,
+                     top_k: int = DEFAULT_USER_TOP_K,
+                     chunk_size: int = 1024) -> "UserTopKTable":
+        """Tính top-K cho mọi user theo từng khối dòng của U"""
+        n_users = U.shape[0]
+        V = np.asarray(V, dtype=np.float64)
+        
+        def blocks():
+            for start in range(0, n_users, chunk_size):
+                yield start, np.asarray(U[start:start + chunk_size], dtype=np.float64) @ V.T, None
+        
+        return cls._from_blocks(n_users, max(0, min(top_k, V.shape[0])), blocks())
@@ -0,0 +1,86 @@
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+Exclusion = Optional[Union[np.ndarray, Iterable[int]]]
+
+
+def _apply_exclusion(scores: np.ndarray, exclude: Exclusion) -> np.ndarray:
+    """Trả về bản sao của scores với các vị trí bị loại trừ gán -inf"""
+    scores = np.array(scores, dtype=np.float64, copy=True)
+    if exclude is None:
+        return scores
+    
+    exclude = np.asarray(exclude)
+    if exclude.dtype == bool:
+        if exclude.shape == scores.shape:
+            scores[exclude] = -np.inf
+        else:
+            scores[..., exclude] = -np.inf
+    elif exclude.size:
+        scores[..., exclude.astype(np.intp)] = -np.inf
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int, exclude: Exclusion = None) -> np.ndarray:
+    """
+    Lấy chỉ số của k điểm cao nhất, sắp xếp giảm dần
+    
+    Dùng argpartition (O(n)) rồi chỉ sort k phần tử được chọn, thay vì argsort
+    toàn bộ vector.
+    
+    Args:
+        scores: Vector điểm 1 chiều
+        k: Số phần tử cần lấy
+        exclude: Mask bool cùng kích thước hoặc danh sách chỉ số cần loại trừ
+                 (ví dụ: sản phẩm gốc, sản phẩm đã có trong giỏ)
+    
+    Returns:
+        Mảng chỉ số (có thể ít hơn k nếu không đủ phần tử hợp lệ)
+    """
+    scores = _apply_exclusion(np.ravel(scores), exclude)
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.intp)
+    
+    k = min(k, n)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order[scores[order] > -np.inf]
+
+
+def top_k_batch(scores: np.ndarray, k: int, exclude: Exclusion = None) -> np.ndarray:
+    """
+    Phiên bản batch của top_k cho nhiều seed cùng lúc
+    
+    Args:
+        scores: Ma trận điểm (n_seeds, n_items)
+        k: Số phần tử cần lấy cho mỗi dòng
+        exclude: Mask bool (n_seeds, n_items) hoặc (n_items,), hoặc danh sách chỉ số
+                 cột bị loại trừ cho mọi dòng
+    
+    Returns:
+        Ma trận chỉ số (n_seeds, k) sắp xếp giảm dần theo điểm; ô không có phần tử
+        hợp lệ (do bị loại trừ) được gán -1
+    """
+    scores = _apply_exclusion(np.atleast_2d(scores), exclude)
+    n_rows, n = scores.shape
+    if k <= 0 or n == 0:
+        return np.zeros((n_rows, 0), dtype=np.intp)
+    
+    k = min(k, n)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), (n_rows, n))
+    
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(candidates, order, axis=1)
+    sorted_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    
+    return np.where(sorted_scores > -np.inf, indices, -1)
@@ -0,0 +1,194 @@
+"""
+Repricing offline cho toàn bộ catalog, không cần Flask server
+
+Đọc CSV theo từng chunk, dự đoán giá bằng ModelsService.predict_prices (cùng
+feature logic với /api/price-prediction) trên một process pool, rồi ghi kết
+quả ra CSV hoặc Parquet.
+
+    python reprice.py
+    python reprice.py --output ../data/processed/predicted_prices.parquet --workers 8
+"""
+import os
+import time
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from data_mapper import ProductDataMapper
+from models_service import ModelsService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+INPUT_COLUMNS = ["product_id", "actual_price", "rating", "rating_count"]
+
+# ModelsService của từng worker process (được tạo trong initializer)
+_worker_service: Optional[ModelsService] = None
+
+
+def _init_worker(price_model_path: str, model_threads: int):
+    """Load price model một lần cho mỗi worker process"""
+    global _worker_service
+    _worker_service = ModelsService(price_model_path, recommendation_model_path=None)
+    
+    # Tránh oversubscription: mỗi process chỉ dùng số thread được chia
+    model = _worker_service.price_model
+    if model is not None and hasattr(model, "set_params"):
+        try:
+            model.set_params(n_jobs=model_threads)
+        except Exception as e:
+            logger.warning(f"Cannot set model threads: {str(e)}")
+
+
+def predict_chunk(chunk: pd.DataFrame, chunk_size: int) -> pd.DataFrame:
+    """
+    Dự đoán giá cho một chunk, input làm sạch bằng ProductDataMapper.price_features
+    
+    Cùng giá trị actual_price / rating / rating_count với catalog, nên kết quả khớp với
+    /api/price-prediction gọi bằng giá trị của sản phẩm trong /api/products.
+    """
+    features = ProductDataMapper.price_features(chunk)
+    actual_price = features["actual_price"].to_numpy(np.float64)
+    rating = features["rating"].to_numpy(np.float64)
+    rating_count = features["rating_count"].to_numpy(np.float64)
+    
+    predictions = _worker_service.predict_prices(
+        actual_price=actual_price,
+        rating=rating,
+        rating_count=rating_count,
+        chunk_size=chunk_size
+    )
+    if predictions is None:
+        raise RuntimeError("Price prediction failed")
+    
+    return pd.DataFrame({
+        "product_id": chunk["product_id"].to_numpy(),
+        "actual_price": actual_price,
+        "rating": rating,
+        "rating_count": rating_count.astype(np.int64),
+        "predicted_price": predictions["predicted_price"],
+    })
+
+
+class _ResultWriter:
+    """Ghi kết quả tăng dần ra CSV hoặc Parquet (theo đuôi file)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.is_parquet = path.endswith(".parquet")
+        self._parquet_writer = None
+        self._first_chunk = True
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    def write(self, frame: pd.DataFrame):
+        if self.is_parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from e
+            
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._first_chunk else "a",
+                         header=self._first_chunk, index=False)
+        self._first_chunk = False
+    
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def run(input_path: str,
+        output_path: str,
+        price_model_path: str,
+        read_chunk_size: int = 50000,
+        predict_chunk_size: int = Config.PRICE_BATCH_CHUNK_SIZE,
+        workers: Optional[int] = None) -> int:
+    """Chạy repricing, trả về tổng số dòng đã xử lý"""
+    workers = workers or os.cpu_count() or 1
+    model_threads = max(1, (os.cpu_count() or 1) // workers)
+    
+    reader = pd.read_csv(input_path, usecols=INPUT_COLUMNS, chunksize=read_chunk_size)
+    writer = _ResultWriter(output_path)
+    
+    started = time.perf_counter()
+    total_rows = 0
+    
+    def _report(frame: pd.DataFrame):
+        nonlocal total_rows
+        writer.write(frame)
+        total_rows += len(frame)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Processed {total_rows} rows ({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    
+    try:
+        if workers == 1:
+            _init_worker(price_model_path, model_threads)
+            for chunk in reader:
+                _report(predict_chunk(chunk, predict_chunk_size))
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(price_model_path, model_threads)) as pool:
+                # Giới hạn số chunk đang xử lý để bộ nhớ không tăng theo kích thước file,
+                # và ghi theo đúng thứ tự input
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(predict_chunk, chunk, predict_chunk_size))
+                    if len(pending) >= workers * 2:
+                        _report(pending.popleft().result())
+                while pending:
+                    _report(pending.popleft().result())
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Done: {total_rows} rows in {elapsed:.2f}s "
+        f"({total_rows / max(elapsed, 1e-9):,.0f} rows/s, {workers} workers) -> {output_path}"
+    )
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline catalog repricing")
+    parser.add_argument("--input", default=Config.DATA_PATH,
+                        help="CSV đầu vào (mặc định: data/processed/amazon.csv)")
+    parser.add_argument("--output",
+                        default=os.path.join(Config.BASE_DIR, "data", "processed", "predicted_prices.csv"),
+                        help="File kết quả (.csv hoặc .parquet)")
+    parser.add_argument("--model-path", default=Config.PRICE_MODEL_PATH,
+                        help="Đường dẫn đến xgboost_model.joblib")
+    parser.add_argument("--chunk-size", type=int, default=50000,
+                        help="Số dòng đọc mỗi chunk")
+    parser.add_argument("--predict-chunk-size", type=int, default=Config.PRICE_BATCH_CHUNK_SIZE,
+                        help="Số dòng mỗi lần gọi model.predict")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Số process (mặc định: số CPU)")
+    args = parser.parse_args()
+    
+    run(
+        input_path=args.input,
+        output_path=args.output,
+        price_model_path=args.model_path,
+        read_chunk_size=args.chunk_size,
+        predict_chunk_size=args.predict_chunk_size,
+        workers=args.workers
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """
+    Một response đã render sẵn (body bytes) cùng ETag và thời điểm hết hạn
+    
+    variants giữ các bản nén của body theo encoding ("gzip", "br"), cùng ETag với body.
+    """
+    body: bytes
+    status: int
+    mimetype: str
+    etag: str
+    expires_at: float
+    variants: Dict[str, bytes] = field(default_factory=dict)
+    
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+
+class ResponseCache:
+    """
+    Cache response có TTL và LRU eviction, thread-safe
+    
+    Giới hạn theo cả số entry và tổng số byte (body + các bản nén), entry ít dùng
+    nhất bị loại trước. Đếm hit/miss/eviction để theo dõi hit rate.
+    """
+    
+    def __init__(self, ttl: float, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.variant_hits = 0
+    
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return hashlib.sha1(body).hexdigest()
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def set(self, key: str, body: bytes, status: int = 200, mimetype: str = "application/json") -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            status=status,
+            mimetype=mimetype,
+            etag=self.make_etag(body),
+            expires_at=time.monotonic() + self.ttl
+        )
+        
+        # Response lớn hơn cả giới hạn bộ nhớ thì không cache
+        if entry.size > self.max_bytes:
+            return entry
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+        
+        return entry
+    
+    def get_variant(self, entry: CachedResponse, encoding: str) -> Optional[bytes]:
+        """Bản nén đã cache của entry, None nếu chưa có"""
+        data = entry.variants.get(encoding)
+        if data is not None:
+            with self._lock:
+                self.variant_hits += 1
+        return data
+    
+    def add_variant(self, key: str, entry: CachedResponse, encoding: str, data: bytes):
+        """Lưu bản nén của entry để các hit sau phục vụ thẳng, không nén lại"""
+        with self._lock:
+            # Entry đã bị thay / loại khỏi cache thì không tính thêm byte cho nó
+            if self._entries.get(key) is not entry or encoding in entry.variants:
+                return
+            entry.variants[encoding] = data
+            self._bytes += len(data)
+            self._evict()
+    
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "variant_hits": self.variant_hits,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl
+            }
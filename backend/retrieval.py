@@ -0,0 +1,470 @@
+"""
+Hybrid retrieval (dense + sparse) cho semantic search, từ hybrid_retrieve trong 05_rag_system.ipynb
+
+Artifact trong models/rag/ (build bởi notebook):
+- product_embeddings.npy: embedding đã chuẩn hóa L2, dòng i = dòng i của amazon.csv
+- faiss_index.bin: IndexFlatIP trên các embedding đó (optional, cần faiss)
+- tfidf_vectorizer.pkl / tfidf_matrix.pkl: TF-IDF (chuẩn hóa L2) của product context
+- metadata.json: embedding_model, embedding_dim, hybrid_alpha
+- index_state.json / tombstones.npy (optional, build_rag_index.py): product_id và
+  content hash của từng dòng, các dòng đã bị xóa/thay thế
+"""
+import os
+import re
+import json
+import zlib
+import pickle
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ranking import top_k as select_top_k
+from sparse_index import TfidfInvertedIndex
+from inference import MicroBatcher
+from lru_cache import LRUCache
+from vector_store import CompressedVectorStore
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILENAME = "metadata.json"
+EMBEDDINGS_FILENAME = "product_embeddings.npy"
+FAISS_FILENAME = "faiss_index.bin"
+TFIDF_VECTORIZER_FILENAME = "tfidf_vectorizer.pkl"
+TFIDF_MATRIX_FILENAME = "tfidf_matrix.pkl"
+INDEX_STATE_FILENAME = "index_state.json"
+TOMBSTONES_FILENAME = "tombstones.npy"
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_query(query: str) -> str:
+    """Key cache của query: viết thường, gộp khoảng trắng"""
+    return " ".join(query.lower().split())
+
+
+def product_context(product: Dict[str, Any]) -> str:
+    """Text mô tả sản phẩm cho reranker (cùng format product_context trong notebook)"""
+    parts = [f"Product: {product.get('product_name', '')}", f"Category: {product.get('category', '')}"]
+    about = product.get("about_product")
+    if about:
+        parts.append(f"Description: {str(about)[:300]}")
+    if product.get("discounted_price") is not None:
+        parts.append(f"Price: {product['discounted_price']}")
+    if product.get("rating") is not None:
+        parts.append(f"Rating: {product['rating']}/5")
+    if product.get("rating_count") is not None:
+        parts.append(f"Reviews: {int(product['rating_count'])}")
+    return " | ".join(parts)
+
+
+class QueryEncoder(ABC):
+    """Encoder cho query: encode(texts) -> ma trận (n, dim) float32 đã chuẩn hóa L2"""
+    
+    dim: int
+    
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embedding của từng text, cùng thứ tự"""
+
+
+class SentenceTransformerEncoder(QueryEncoder):
+    """Encoder dùng sentence-transformers (cùng model đã tạo product_embeddings.npy)"""
+    
+    def __init__(self, model_name: str, dim: Optional[int] = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("sentence-transformers is required (pip install sentence-transformers)") from e
+        
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = dim or self.model.get_sentence_embedding_dimension()
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class HashingEncoder(QueryEncoder):
+    """
+    Encoder offline không cần model: băm token vào `dim` chiều
+    
+    Dùng để chạy/test pipeline khi không có sentence-transformers. Điểm dense
+    khi đó không có ý nghĩa ngữ nghĩa, chỉ phần TF-IDF là đáng tin.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None, dim: int = 384):
+        self.model_name = model_name
+        self.dim = dim
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_PATTERN.findall(text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                embeddings[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+ENCODERS = {
+    "sentence-transformers": SentenceTransformerEncoder,
+    "hashing": HashingEncoder,
+}
+
+
+def create_encoder(name: str, model_name: str, dim: Optional[int] = None) -> QueryEncoder:
+    """Tạo encoder theo tên ("sentence-transformers" | "hashing")"""
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown query encoder: {name} (available: {', '.join(ENCODERS)})")
+    return ENCODERS[name](model_name, dim=dim)
+
+
+class Reranker(ABC):
+    """Reranker: predict([(query, document), ...]) -> điểm liên quan (càng cao càng tốt)"""
+    
+    @abstractmethod
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Điểm của từng cặp (query, document), cùng thứ tự"""
+
+
+class CrossEncoderReranker(Reranker):
+    """Cross-encoder của sentence-transformers (reranker_model trong metadata.json)"""
+    
+    def __init__(self, model_name: str, batch_size: int = 64):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise RuntimeError("sentence-transformers is required (pip install sentence-transformers)") from e
+        
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name)
+    
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float64)
+
+
+class TokenOverlapReranker(Reranker):
+    """Reranker offline không cần model: tỉ lệ token của query xuất hiện trong document"""
+    
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name
+    
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        scores = np.zeros(len(pairs), dtype=np.float64)
+        for i, (query, document) in enumerate(pairs):
+            query_tokens = set(_TOKEN_PATTERN.findall(query.lower()))
+            if query_tokens:
+                document_tokens = set(_TOKEN_PATTERN.findall(document.lower()))
+                scores[i] = len(query_tokens & document_tokens) / len(query_tokens)
+        return scores
+
+
+RERANKERS = {
+    "cross-encoder": CrossEncoderReranker,
+    "token-overlap": TokenOverlapReranker,
+}
+
+
+def create_reranker(name: Optional[str], model_name: str) -> Optional[Reranker]:
+    """Tạo reranker theo tên ("cross-encoder" | "token-overlap"); None/"none" = không rerank"""
+    if not name or name == "none":
+        return None
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker: {name} (available: {', '.join(RERANKERS)})")
+    return RERANKERS[name](model_name)
+
+
+def load_metadata(model_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(model_dir, METADATA_FILENAME)) as f:
+        return json.load(f)
+
+
+def load_index_state(model_dir: str) -> Optional[Dict[str, Any]]:
+    """State của index builder: product_id + content hash theo dòng, None nếu chưa có"""
+    path = os.path.join(model_dir, INDEX_STATE_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _load_faiss_index(path: str):
+    """Load FAISS index nếu có faiss; None thì tìm dense bằng NumPy trên embedding mmap"""
+    if not os.path.exists(path):
+        return None
+    try:
+        import faiss
+    except ImportError:
+        logger.info("faiss not installed, using NumPy inner product for dense retrieval")
+        return None
+    return faiss.read_index(path)
+
+
+def fuse_scores(dense: SearchResult, sparse: SearchResult, alpha: float) -> SearchResult:
+    """
+    Gộp điểm: alpha * dense + (1 - alpha) * sparse trên hợp các ứng viên
+    
+    Ứng viên chỉ có ở một stage nhận 0 cho stage còn lại (như hybrid_retrieve).
+    """
+    ids = np.concatenate([dense[0], sparse[0]]).astype(np.int64)
+    weighted = np.concatenate([alpha * dense[1], (1 - alpha) * sparse[1]]).astype(np.float64)
+    
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=weighted, minlength=len(unique_ids))
+    return unique_ids, scores
+
+
+class SemanticRetriever:
+    """
+    Hybrid retriever: FAISS/NumPy dense + TF-IDF sparse, gộp điểm bằng hybrid_alpha
+    
+    Mỗi dòng của artifact ứng với một product_id: theo index_state.json nếu đã build
+    bằng build_rag_index.py, nếu không thì theo product_ids truyền vào (artifact của
+    notebook có cùng thứ tự với amazon.csv). Dòng bị tombstone không bao giờ được trả về.
+    Encoder/reranker có thể truyền vào trực tiếp (ví dụ HashingEncoder và
+    TokenOverlapReranker khi test offline).
+    
+    - Embedding của query được cache LRU theo query đã chuẩn hóa
+    - Các request đồng thời được gom (micro-batch) thành một lần gọi encoder / reranker
+    - Reranker bị giới hạn bởi rerank_budget_ms, quá hạn thì trả về thứ tự theo điểm hybrid
+    """
+    
+    def __init__(self,
+                 model_dir: str,
+                 encoder: Optional[QueryEncoder] = None,
+                 encoder_name: str = "sentence-transformers",
+                 top_k_dense: int = 20,
+                 top_k_sparse: int = 20,
+                 use_faiss: bool = True,
+                 vector_store_dir: Optional[str] = None,
+                 rescore_factor: Optional[int] = None,
+                 reranker: Optional[Reranker] = None,
+                 reranker_name: Optional[str] = None,
+                 product_ids: Optional[Sequence[str]] = None,
+                 document_text: Optional[Callable[[str], str]] = None,
+                 rerank_candidates: int = 20,
+                 rerank_budget_ms: float = 200.0,
+                 embedding_cache_size: int = 4096,
+                 batch_window_ms: float = 5.0,
+                 max_batch_size: int = 32):
+        self.metadata: Dict = load_metadata(model_dir)
+        
+        self.alpha = float(self.metadata.get("hybrid_alpha", 0.5))
+        self.top_k_dense = top_k_dense
+        self.top_k_sparse = top_k_sparse
+        
+        # Embedding memory-mapped: chỉ các trang được chạm đến mới nằm trong RAM
+        self.embeddings = np.load(os.path.join(model_dir, EMBEDDINGS_FILENAME), mmap_mode="r")
+        self._load_rows(model_dir, product_ids)
+        
+        # Dense: vector store nén (nếu đã build) > FAISS > NumPy trên embedding mmap.
+        # Có vector store thì không load faiss_index.bin (bản sao float32 thứ hai của embedding)
+        self.vector_store = None
+        self.faiss_index = None
+        if vector_store_dir and CompressedVectorStore.exists(vector_store_dir):
+            try:
+                self.vector_store = CompressedVectorStore.load(
+                    vector_store_dir, vectors=self.embeddings, rescore_factor=rescore_factor
+                )
+            except ValueError as e:
+                logger.warning(f"Ignoring stale vector store: {str(e)}")
+        if self.vector_store is None and use_faiss:
+            self.faiss_index = _load_faiss_index(os.path.join(model_dir, FAISS_FILENAME))
+            if self.faiss_index is not None and self.faiss_index.ntotal != len(self):
+                logger.warning(f"Ignoring stale FAISS index: {self.faiss_index.ntotal} vectors, expected {len(self)}")
+                self.faiss_index = None
+        
+        with open(os.path.join(model_dir, TFIDF_VECTORIZER_FILENAME), "rb") as f:
+            self.vectorizer = pickle.load(f)
+        with open(os.path.join(model_dir, TFIDF_MATRIX_FILENAME), "rb") as f:
+            self.tfidf_index = TfidfInvertedIndex.from_matrix(pickle.load(f))
+        
+        if len(self.tfidf_index) != len(self):
+            raise ValueError(
+                f"TF-IDF matrix has {len(self.tfidf_index)} rows, embeddings have {len(self)}"
+            )
+        
+        self.encoder = encoder or create_encoder(
+            encoder_name,
+            self.metadata.get("embedding_model"),
+            dim=self.metadata.get("embedding_dim", self.embeddings.shape[1])
+        )
+        if self.encoder.dim != self.embeddings.shape[1]:
+            raise ValueError(f"Encoder dim {self.encoder.dim} != embedding dim {self.embeddings.shape[1]}")
+        
+        # Reranker là optional: lỗi khi load chỉ tắt bước rerank
+        self.reranker = reranker
+        if self.reranker is None and reranker_name:
+            try:
+                self.reranker = create_reranker(reranker_name, self.metadata.get("reranker_model"))
+            except Exception as e:
+                logger.warning(f"Reranker not available, using hybrid scores only: {str(e)}")
+        self.document_text = document_text
+        self.rerank_candidates = rerank_candidates
+        self.rerank_budget = rerank_budget_ms / 1000
+        self.rerank_timeouts = 0
+        
+        self.embedding_cache = LRUCache(embedding_cache_size)
+        self._encode_batcher = MicroBatcher(
+            self._encode_batch, max_batch_size, batch_window_ms, name="query-encoder"
+        )
+        self._rerank_batcher = MicroBatcher(
+            self._rerank_batch, max_batch_size, batch_window_ms, name="reranker"
+        )
+        
+        logger.info(
+            f"Semantic retriever ready: {len(self) - self.n_tombstones} products, dense={self.dense_backend}, alpha={self.alpha}, "
+            f"reranker={type(self.reranker).__name__ if self.reranker is not None else None}"
+        )
+    
+    def _load_rows(self, model_dir: str, product_ids: Optional[Sequence[str]]):
+        """product_id của từng dòng và mask tombstone"""
+        state = load_index_state(model_dir)
+        if state is not None:
+            self.row_product_ids = np.asarray(state["product_ids"], dtype=object)
+        elif product_ids is not None:
+            self.row_product_ids = np.asarray(list(product_ids), dtype=object)
+        else:
+            self.row_product_ids = None
+        
+        if self.row_product_ids is not None and len(self.row_product_ids) != len(self):
+            raise ValueError(
+                f"Embeddings have {len(self)} rows but {len(self.row_product_ids)} product ids "
+                f"(rebuild with build_rag_index.py)"
+            )
+        
+        tombstones_path = os.path.join(model_dir, TOMBSTONES_FILENAME)
+        self.tombstones = np.load(tombstones_path) if state is not None and os.path.exists(tombstones_path) else None
+        self.n_tombstones = int(self.tombstones.sum()) if self.tombstones is not None else 0
+        if not self.n_tombstones:
+            self.tombstones = None
+    
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+    
+    def product_ids_at(self, rows: np.ndarray) -> list:
+        """product_id của các dòng (hoặc chính vị trí dòng nếu không có mapping)"""
+        if self.row_product_ids is None:
+            return [int(row) for row in rows]
+        return self.row_product_ids[rows].tolist()
+    
+    def _drop_tombstones(self, ids: np.ndarray, scores: np.ndarray, k: int) -> SearchResult:
+        if self.tombstones is not None:
+            live = ~self.tombstones[ids]
+            ids, scores = ids[live], scores[live]
+        return ids[:k], scores[:k]
+    
+    @property
+    def dense_backend(self) -> str:
+        if self.vector_store is not None:
+            return self.vector_store.method
+        return "faiss" if self.faiss_index is not None else "numpy"
+    
+    @property
+    def can_rerank(self) -> bool:
+        return self.reranker is not None and self.document_text is not None
+    
+    def _encode_batch(self, queries: List[str]) -> List[np.ndarray]:
+        return list(np.asarray(self.encoder.encode(queries), dtype=np.float32))
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding của query: lấy từ cache, nếu chưa có thì encode (gom batch với request khác)"""
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self._encode_batcher.submit(key).result()
+            self.embedding_cache.set(key, embedding)
+        return embedding
+    
+    def _rerank_batch(self, requests: List[Tuple[str, List[str]]]) -> List[np.ndarray]:
+        """Một lần gọi reranker cho mọi cặp (query, document) của cả batch, rồi tách lại"""
+        pairs = [(query, document) for query, documents in requests for document in documents]
+        scores = np.asarray(self.reranker.predict(pairs), dtype=np.float64)
+        return np.split(scores, np.cumsum([len(documents) for _, documents in requests])[:-1])
+    
+    def rerank(self, query: str, positions: np.ndarray) -> Optional[np.ndarray]:
+        """Điểm reranker cho các ứng viên, None nếu lỗi hoặc vượt latency budget"""
+        documents = [self.document_text(key) for key in self.product_ids_at(positions)]
+        future = self._rerank_batcher.submit((query, documents))
+        try:
+            return future.result(timeout=self.rerank_budget)
+        except FutureTimeoutError:
+            future.cancel()
+            self.rerank_timeouts += 1
+            logger.warning(f"Reranker exceeded {self.rerank_budget * 1000:.0f} ms budget, using hybrid scores")
+        except Exception as e:
+            logger.error(f"Reranker failed, using hybrid scores: {str(e)}")
+        return None
+    
+    def dense_search(self, query_embedding: np.ndarray, k: int) -> SearchResult:
+        """Top-k theo inner product (cosine, vì embedding đã chuẩn hóa)"""
+        # Index không biết tombstone: lấy dư đúng số dòng đã bị tombstone rồi lọc
+        if self.vector_store is not None:
+            ids, scores = self.vector_store.search(query_embedding, k + self.n_tombstones)
+            return self._drop_tombstones(ids, scores, k)
+        
+        if self.faiss_index is not None:
+            scores, ids = self.faiss_index.search(query_embedding.reshape(1, -1), k + self.n_tombstones)
+            valid = ids[0] >= 0
+            return self._drop_tombstones(ids[0][valid].astype(np.int64), scores[0][valid], k)
+        
+        scores = self.embeddings @ query_embedding
+        top = select_top_k(scores, k, exclude=self.tombstones)
+        return top.astype(np.int64), scores[top]
+    
+    def sparse_search(self, query: str, k: int) -> SearchResult:
+        """
+        Top-k theo cosine TF-IDF (các vector đã chuẩn hóa L2 nên chỉ cần dot product)
+        
+        Chỉ chấm điểm các sản phẩm có chung term với query (qua inverted index).
+        """
+        return self.tfidf_index.search(self.vectorizer.transform([query]), k, exclude=self.tombstones)
+    
+    def search(self, query: str, top_k: int = 10, rerank: bool = True) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """
+        Tìm top_k sản phẩm cho query
+        
+        Returns:
+            (rows, scores, reranked): dòng trong artifact (xem product_ids_at) và điểm
+            giảm dần; reranked = True nếu điểm là của reranker, False nếu là điểm hybrid
+        """
+        rerank = rerank and self.can_rerank
+        depth = max(top_k, self.rerank_candidates) if rerank else top_k
+        
+        dense = self.dense_search(self.embed_query(query), max(self.top_k_dense, depth))
+        sparse = self.sparse_search(query, max(self.top_k_sparse, depth))
+        
+        ids, scores = fuse_scores(dense, sparse, self.alpha)
+        top = select_top_k(scores, depth)
+        ids, scores = ids[top], scores[top]
+        
+        if rerank and len(ids):
+            rerank_scores = self.rerank(query, ids)
+            if rerank_scores is not None:
+                order = select_top_k(rerank_scores, top_k)
+                return ids[order], rerank_scores[order], True
+        
+        return ids[:top_k], scores[:top_k], False
+    
+    def close(self):
+        """Dừng các worker micro-batch (retriever cũ sau hot reload)"""
+        self._encode_batcher.close()
+        self._rerank_batcher.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embedding_cache": self.embedding_cache.stats(),
+            "encoder_batches": self._encode_batcher.stats(),
+            "reranker_batches": self._rerank_batcher.stats(),
+            "rerank_timeouts": self.rerank_timeouts,
+            "reranker": type(self.reranker).__name__ if self.reranker is not None else None,
+            "dense_backend": self.dense_backend
+        }
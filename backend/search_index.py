@@ -0,0 +1,200 @@
+import re
+import math
+import logging
+from collections import defaultdict
+from typing import Dict, List, Iterable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class ProductSearchIndex:
+    """
+    Inverted index + trigram index cho tìm kiếm sản phẩm
+    
+    - Inverted index (token → posting list) để giao các posting list và chấm điểm BM25
+    - N-gram index (ký tự, độ dài 1-3) để giữ ngữ nghĩa substring như bản cũ
+      (`str.contains`) mà không phải lowercase / quét toàn bộ cột mỗi request.
+      Query 1-3 ký tự tra thẳng một posting list; query dài hơn giao các trigram
+    
+    Index được xây một lần khi load catalog; mỗi document là một vị trí dòng.
+    """
+    
+    def __init__(self,
+                 names: Iterable[str],
+                 categories: Iterable[str],
+                 k1: float = 1.2,
+                 b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._texts: List[str] = []
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._grams: Dict[str, np.ndarray] = {}
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._avg_doc_len = 0.0
+        self._build(names, categories)
+    
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Tách text thành các token chữ/số viết thường"""
+        return TOKEN_PATTERN.findall(text.lower())
+    
+    @staticmethod
+    def _ngrams_of(text: str, n: int) -> set:
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+    
+    def _build(self, names: Iterable[str], categories: Iterable[str]):
+        """Xây inverted index và n-gram index từ tên + category"""
+        term_docs: Dict[str, List[int]] = defaultdict(list)
+        term_tfs: Dict[str, List[int]] = defaultdict(list)
+        gram_docs: Dict[str, List[int]] = defaultdict(list)
+        doc_lens = []
+        
+        for doc_id, (name, category) in enumerate(zip(names, categories)):
+            name = name if isinstance(name, str) else ""
+            category = category if isinstance(category, str) else ""
+            
+            # Hai field được tách bằng '\n' để substring không khớp xuyên field
+            text = f"{name.lower()}\n{category.lower()}"
+            self._texts.append(text)
+            
+            tokens = self.tokenize(text)
+            doc_lens.append(len(tokens))
+            
+            counts: Dict[str, int] = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                term_docs[token].append(doc_id)
+                term_tfs[token].append(tf)
+            
+            # Unigram, bigram, trigram dùng chung một dict (độ dài khác nhau nên không trùng key)
+            for n in (1, 2, 3):
+                for gram in self._ngrams_of(text, n):
+                    gram_docs[gram].append(doc_id)
+        
+        self._postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(term_tfs[term], dtype=np.float32))
+            for term, docs in term_docs.items()
+        }
+        self._grams = {
+            gram: np.asarray(docs, dtype=np.int32)
+            for gram, docs in gram_docs.items()
+        }
+        self._doc_len = np.asarray(doc_lens, dtype=np.float32)
+        self._avg_doc_len = float(self._doc_len.mean()) if len(doc_lens) else 0.0
+        
+        logger.info(
+            f"Built search index: {len(self._texts)} docs, "
+            f"{len(self._postings)} terms, {len(self._grams)} n-grams"
+        )
+    
+    def __len__(self) -> int:
+        return len(self._texts)
+    
+    def _intersect(self, postings: List[np.ndarray]) -> np.ndarray:
+        """Giao các posting list, bắt đầu từ list ngắn nhất và dừng sớm khi rỗng"""
+        if not postings:
+            return np.zeros(0, dtype=np.int32)
+        
+        postings = sorted(postings, key=len)
+        result = postings[0]
+        for docs in postings[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, docs, assume_unique=True)
+        return result
+    
+    def _token_candidates(self, tokens: List[str]) -> np.ndarray:
+        """Các document chứa tất cả token của query (AND)"""
+        postings = []
+        for token in set(tokens):
+            entry = self._postings.get(token)
+            if entry is None:
+                return np.zeros(0, dtype=np.int32)
+            postings.append(entry[0])
+        return self._intersect(postings)
+    
+    def _substring_candidates(self, query: str) -> np.ndarray:
+        """Các document chứa query như substring (ngữ nghĩa của `str.contains`)"""
+        if len(query) <= 3:
+            # Query chính là một n-gram: posting list là kết quả chính xác
+            return self._grams.get(query, np.zeros(0, dtype=np.int32))
+        
+        postings = []
+        for gram in self._ngrams_of(query, 3):
+            docs = self._grams.get(gram)
+            if docs is None:
+                return np.zeros(0, dtype=np.int32)
+            postings.append(docs)
+        candidates = self._intersect(postings)
+        
+        # Trigram chỉ là bộ lọc thô, xác nhận lại substring trên tập ứng viên
+        texts = self._texts
+        matched = [doc_id for doc_id in candidates.tolist() if query in texts[doc_id]]
+        return np.asarray(matched, dtype=np.int32)
+    
+    def _bm25(self, tokens: List[str], candidates: np.ndarray) -> np.ndarray:
+        """Tính điểm BM25 của query cho các document ứng viên"""
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        if len(candidates) == 0:
+            return scores
+        
+        n_docs = len(self._texts)
+        doc_len = self._doc_len[candidates]
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / max(self._avg_doc_len, 1e-6))
+        
+        for token in set(tokens):
+            entry = self._postings.get(token)
+            if entry is None:
+                continue
+            docs, tfs = entry
+            idf = math.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            
+            # Lấy tf của token cho từng ứng viên (posting list đã sắp xếp theo doc_id)
+            pos = np.searchsorted(docs, candidates)
+            pos = np.minimum(pos, len(docs) - 1)
+            hit = docs[pos] == candidates
+            tf = np.where(hit, tfs[pos], 0.0)
+            
+            scores += idf * tf * (self.k1 + 1.0) / (tf + norm)
+        
+        return scores
+    
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """
+        Tìm kiếm và trả về tối đa `limit` vị trí dòng, xếp hạng theo BM25
+        
+        Kết quả gồm các document chứa mọi token của query hoặc chứa query
+        như substring. Hòa điểm được phân xử theo thứ tự trong catalog.
+        """
+        query = (query or "").strip().lower()
+        if not query or limit <= 0 or not self._texts:
+            return []
+        
+        tokens = self.tokenize(query)
+        candidates = np.union1d(
+            self._token_candidates(tokens) if tokens else np.zeros(0, dtype=np.int32),
+            self._substring_candidates(query)
+        ).astype(np.int32)
+        
+        if len(candidates) == 0:
+            return []
+        
+        scores = self._bm25(tokens, candidates)
+        
+        if len(candidates) > limit:
+            # Chỉ chọn top `limit` bằng np.partition, không sắp xếp toàn bộ ứng viên
+            kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)[:limit - len(above)]
+            selected = np.concatenate([above, ties])
+        else:
+            selected = np.arange(len(candidates))
+        
+        # candidates đã tăng dần nên sort ổn định giữ thứ tự catalog khi hòa điểm
+        order = selected[np.argsort(-scores[selected], kind="stable")]
+        return candidates[order].tolist()
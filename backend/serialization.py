@@ -0,0 +1,145 @@
+import gzip
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode JSON compact ra bytes, dùng orjson nếu có"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_payloads(records: Iterable[Dict[str, Any]]) -> Dict[int, Tuple[Dict[str, Any], bytes]]:
+    """
+    Encode sẵn JSON bytes cho từng record (product), key là id() của record
+    
+    Record được giữ lại cùng với bytes để id() không bị tái sử dụng.
+    """
+    return {id(record): (record, dumps(record)) for record in records}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider cho Flask: ghép response từ JSON bytes đã encode sẵn
+    
+    Các product dict đã đăng ký (register_payloads) được chèn nguyên bytes vào
+    response thay vì encode lại mỗi request; phần còn lại được encode bằng orjson
+    (nếu có). Khi bật pretty-print (debug/JSONIFY_PRETTYPRINT_REGULAR) thì quay
+    về encoder mặc định của Flask.
+    """
+    
+    sort_keys = False
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self._payloads: Dict[int, Tuple[Dict[str, Any], bytes]] = {}
+    
+    def register_payloads(self, payloads: Dict[int, Tuple[Dict[str, Any], bytes]]):
+        """Thay toàn bộ bảng payload (gọi lại khi catalog được load lại)"""
+        self._payloads = payloads
+    
+    def _pretty(self) -> bool:
+        if self.compact is not None:
+            return not self.compact
+        return self._app.debug or self._app.config.get("JSONIFY_PRETTYPRINT_REGULAR", False)
+    
+    def _encode(self, obj: Any, payloads: Dict[int, Tuple[Dict[str, Any], bytes]], out: List[bytes]):
+        entry = payloads.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            out.append(entry[1])
+        elif isinstance(obj, dict):
+            out.append(b"{")
+            for i, (key, value) in enumerate(obj.items()):
+                if i:
+                    out.append(b",")
+                out.append(dumps(str(key)))
+                out.append(b":")
+                self._encode(value, payloads, out)
+            out.append(b"}")
+        elif isinstance(obj, (list, tuple)):
+            out.append(b"[")
+            for i, value in enumerate(obj):
+                if i:
+                    out.append(b",")
+                self._encode(value, payloads, out)
+            out.append(b"]")
+        elif orjson is not None:
+            out.append(orjson.dumps(obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            out.append(json.dumps(obj, default=self.default, ensure_ascii=False).encode("utf-8"))
+    
+    def dumps_bytes(self, obj: Any) -> bytes:
+        out: List[bytes] = []
+        self._encode(obj, self._payloads, out)
+        return b"".join(out)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+    
+    def response(self, *args: Any, **kwargs: Any):
+        if self._pretty():
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding thành {coding: q}; q không hợp lệ coi như 0 (không nhận)"""
+    codings: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q if 0.0 <= q <= 1.0 else 0.0
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Chọn encoding nén theo Accept-Encoding: q cao nhất, hòa thì ưu tiên br (nếu có thư viện brotli)
+    
+    q=0 (kể cả "0.0", "0.00") nghĩa là client không nhận coding đó; "*" áp dụng cho
+    coding không được liệt kê.
+    """
+    codings = _accepted_codings(accept_encoding)
+    default_q = codings.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        q = codings.get(coding, default_q)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level)
@@ -0,0 +1,67 @@
+"""
+Dấu nguồn (source stamp) cho các artifact dẫn xuất
+
+Artifact dẫn xuất (arrays/*.npy từ hybrid_model.joblib, amazon.feather từ amazon.csv)
+được ghi kèm một file JSON chứa schema version và size/mtime/hash của file nguồn
+lúc build. Khi load, artifact chỉ được dùng nếu dấu còn khớp với file nguồn hiện tại;
+nếu không, caller đọc thẳng file nguồn.
+"""
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_stamp(source_path: str, schema_version: int) -> Dict[str, Any]:
+    stat = os.stat(source_path)
+    return {
+        "schema_version": schema_version,
+        "source": os.path.basename(source_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": file_hash(source_path)
+    }
+
+
+def write_stamp(stamp_path: str, source_path: str, schema_version: int):
+    """Ghi dấu nguồn; gọi sau cùng, khi mọi file dẫn xuất đã được ghi xong"""
+    tmp_path = f"{stamp_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(make_stamp(source_path, schema_version), f, indent=2)
+    os.replace(tmp_path, stamp_path)
+
+
+def stale_reason(stamp_path: str, source_path: str, schema_version: int) -> Optional[str]:
+    """
+    None nếu artifact dẫn xuất còn khớp với file nguồn, nếu không thì trả về lý do
+    
+    Size + mtime khớp thì coi như không đổi; mtime khác (git checkout, copy) thì so hash
+    nội dung. Không có file nguồn thì artifact dẫn xuất là bản duy nhất và được dùng.
+    """
+    if not os.path.exists(source_path):
+        return None
+    if not os.path.exists(stamp_path):
+        return f"no source stamp {os.path.basename(stamp_path)}"
+    
+    with open(stamp_path) as f:
+        stamp = json.load(f)
+    if stamp.get("schema_version") != schema_version:
+        return f"schema version {stamp.get('schema_version')} != {schema_version}"
+    
+    stat = os.stat(source_path)
+    if stat.st_size != stamp.get("size"):
+        return f"{os.path.basename(source_path)} changed since build"
+    if stat.st_mtime_ns != stamp.get("mtime_ns") and file_hash(source_path) != stamp.get("hash"):
+        return f"{os.path.basename(source_path)} changed since build"
+    return None
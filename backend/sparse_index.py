@@ -0,0 +1,84 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ranking import top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+
+class TfidfInvertedIndex:
+    """
+    Inverted index (term → posting list) dựng từ ma trận TF-IDF document x term
+    
+    Lưu dạng CSC: postings của term t là doc_ids[indptr[t]:indptr[t + 1]] với
+    trọng số weights tương ứng. Chấm điểm một query chỉ duyệt posting list của
+    các term có trong query, nên chi phí tỉ lệ với tổng độ dài các posting list
+    đó thay vì số sản phẩm, và không tạo vector điểm dense trên toàn catalog.
+    """
+    
+    def __init__(self, indptr: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray, n_docs: int):
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+    
+    @classmethod
+    def from_matrix(cls, matrix) -> "TfidfInvertedIndex":
+        """Dựng từ scipy sparse matrix (n_docs, n_terms), ví dụ tfidf_matrix.pkl"""
+        csc = matrix.tocsc()
+        csc.sort_indices()
+        index = cls(
+            csc.indptr.astype(np.int64),
+            csc.indices.astype(np.int32),
+            csc.data.astype(np.float32),
+            csc.shape[0]
+        )
+        logger.info(f"Built TF-IDF inverted index: {csc.shape[1]} terms, {csc.nnz} postings")
+        return index
+    
+    def __len__(self) -> int:
+        return self.n_docs
+    
+    @property
+    def n_terms(self) -> int:
+        return len(self.indptr) - 1
+    
+    def score(self, term_ids: np.ndarray, term_weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Điểm dot product của query với các document có chung ít nhất một term
+        
+        Returns:
+            (doc_ids, scores): doc_ids tăng dần, chỉ gồm document có điểm > 0
+        """
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float64)
+        
+        # Vị trí của mọi posting cần đọc, gom thành một lần gather
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        docs = self.doc_ids[offsets]
+        contributions = self.weights[offsets] * np.repeat(term_weights, lengths)
+        
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions, minlength=len(candidates))
+        keep = scores > 0
+        return candidates[keep], scores[keep]
+    
+    def search(self, query_vector, k: int, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k document cho một query vector (scipy sparse 1 x n_terms)
+        
+        Args:
+            exclude: Mask bool theo document (ví dụ các dòng đã bị tombstone)
+        
+        Returns:
+            (doc_ids, scores) giảm dần theo điểm
+        """
+        query_vector = query_vector.tocsr()
+        candidates, scores = self.score(query_vector.indices.astype(np.int64), query_vector.data)
+        top = select_top_k(scores, k, exclude=exclude[candidates] if exclude is not None else None)
+        return candidates[top].astype(np.int64), scores[top]
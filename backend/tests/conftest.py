@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Các module backend import phẳng (from ranking import ...), như khi chạy app.py trong backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["usb", "cable", "charger", "fast", "wireless", "mouse", "keyboard", "hdmi", "smart", "watch"]
+CATEGORIES = ["Electronics|Cables|USBCables", "Electronics|Chargers", "Computers|Mice", "Computers|Keyboards|Wireless", None]
+
+
+def make_catalog(n):
+    return pd.DataFrame([
+        {
+            "product_id": f"P{i:03d}",
+            "product_name": f"{WORDS[i % 10]} {WORDS[(i * 3) % 10]} model {i}",
+            "category": CATEGORIES[i % 5],
+            "discounted_price": float(100 + (i * 37) % 400),
+            "actual_price": float(600 + i),
+            "discount_percentage": round((i % 7) / 10, 1),
+            "rating": round(3 + (i % 5) * 0.4, 1),
+            "rating_count": 10 * (i % 13)
+        }
+        for i in range(n)
+    ])
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "amazon.csv"
+    make_catalog(60).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def client(tmp_path, catalog_path, monkeypatch):
+    """Test client với services lazy trỏ vào catalog tạm (model nằm trong tmp_path, chưa có), response cache bật"""
+    import app as app_module
+    for name in ("data_mapper", "artifacts", "models_service", "semantic_retriever", "loaded_version"):
+        monkeypatch.setattr(app_module, name, None)
+    monkeypatch.setattr(app_module, "_service_errors", {})
+    monkeypatch.setattr(app_module, "_service_retry_at", {})
+    config = app_module.app.config
+    monkeypatch.setitem(config, "DATA_PATH", catalog_path)
+    monkeypatch.setitem(config, "CATALOG_PATH", str(tmp_path / "amazon.feather"))
+    monkeypatch.setitem(config, "PRICE_MODEL_PATH", str(tmp_path / "xgboost_model.joblib"))
+    monkeypatch.setitem(config, "RECOMMENDATION_MODEL_PATH", str(tmp_path / "hybrid_model.joblib"))
+    monkeypatch.setitem(config, "RECOMMENDATION_ARRAYS_DIR", str(tmp_path / "arrays"))
+    monkeypatch.setitem(config, "RAG_MODEL_DIR", str(tmp_path / "rag"))
+    monkeypatch.setitem(config, "RAG_VECTOR_STORE_DIR", str(tmp_path / "rag" / "compressed"))
+    monkeypatch.setitem(config, "CACHE_ENABLED", True)
+    app_module.response_cache.clear()
+    yield app_module.app.test_client()
+    app_module.response_cache.clear()
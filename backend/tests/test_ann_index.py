@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ann_index import ExactIndex, IVFIndex, build_index, save_index, load_index, index_exists
+
+
+@pytest.fixture(scope="module")
+def data():
+    # Vector theo cụm, giống item factors hơn là nhiễu đều
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((40, 16)) * 3
+    vectors = centers[rng.integers(0, 40, 3000)] + rng.standard_normal((3000, 16))
+    queries = centers[rng.integers(0, 40, 200)] + rng.standard_normal((200, 16))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def recall_at_k(index, exact, queries, k, nprobe):
+    hits = 0
+    for query in queries:
+        truth, _ = exact.search(query, k)
+        found, _ = index.search(query, k, nprobe=nprobe)
+        hits += len(np.intersect1d(truth, found))
+    return hits / (k * len(queries))
+
+
+def test_ivf_recall_against_exact(data):
+    vectors, queries = data
+    exact = ExactIndex.build(vectors)
+    index = IVFIndex.build(vectors, nlist=50)
+    
+    recalls = [recall_at_k(index, exact, queries, 10, nprobe) for nprobe in (1, 2, 4, 8, 50)]
+    assert recalls == sorted(recalls)
+    assert recalls[0] > 0.8
+    assert recalls[3] >= 0.99
+    assert recalls[-1] == 1.0
+
+
+def test_ivf_all_lists_equals_exact(data):
+    vectors, queries = data
+    exact = ExactIndex.build(vectors)
+    index = IVFIndex.build(vectors, nlist=30)
+    for query in queries[:50]:
+        exclude = [int(i) for i in exact.search(query, 3)[0]]
+        for skip in (None, exclude):
+            expected_ids, expected_scores = exact.search(query, 20, exclude=skip)
+            ids, scores = index.search(query, 20, nprobe=index.nlist, exclude=skip)
+            np.testing.assert_array_equal(ids, expected_ids)
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+            if skip is not None:
+                assert not set(ids.tolist()) & set(skip)
+
+
+@pytest.mark.parametrize("backend", ["exact", "ivf"])
+def test_save_load_roundtrip(data, tmp_path, backend):
+    vectors, queries = data
+    index = build_index(vectors, backend=backend, nlist=20, nprobe=4)
+    save_index(index, str(tmp_path))
+    assert index_exists(str(tmp_path))
+    
+    loaded = load_index(str(tmp_path))
+    assert (loaded.backend, len(loaded), loaded.dim) == (backend, 3000, 16)
+    assert isinstance(loaded.vectors, np.memmap)
+    for query in queries[:20]:
+        np.testing.assert_array_equal(loaded.search(query, 10)[0], index.search(query, 10)[0])
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+from build_rag_index import update_index
+from data_mapper import SORT_FIELDS
+from retrieval import SemanticRetriever, Reranker, product_context, METADATA_FILENAME
+
+
+class SlowReranker(Reranker):
+    def __init__(self, delay):
+        self.delay = delay
+    
+    def predict(self, pairs):
+        time.sleep(self.delay)
+        return np.arange(len(pairs), dtype=np.float64)
+
+
+@pytest.fixture
+def retriever(tmp_path, client):
+    mapper = app_module.get_data_mapper()
+    model_dir = tmp_path / "rag"
+    model_dir.mkdir()
+    with open(model_dir / METADATA_FILENAME, "w") as f:
+        json.dump({"embedding_dim": 32, "embedding_model": "hashing"}, f)
+    update_index(str(model_dir), mapper.df.to_dict("records"), encoder_name="hashing")
+    
+    retriever = SemanticRetriever(
+        str(model_dir),
+        encoder_name="hashing",
+        use_faiss=False,
+        reranker=SlowReranker(delay=0.3),
+        document_text=lambda pid: product_context(mapper.get_product_by_id(pid) or {}),
+        rerank_budget_ms=20,
+        batch_window_ms=0
+    )
+    app_module.semantic_retriever = retriever
+    yield retriever
+    retriever.close()
+
+
+def test_semantic_search_not_cached_when_rerank_times_out(client, retriever):
+    for _ in range(2):
+        response = client.get("/api/semantic-search?q=usb cable&limit=5")
+        assert response.status_code == 200
+        assert response.get_json()["reranked"] is False
+        assert response.cache_control.no_store and "X-Cache" not in response.headers
+    assert retriever.rerank_timeouts == 2
+    assert app_module.response_cache.stats()["entries"] == 0
+    
+    # Reranker kịp trong budget → kết quả được cache như bình thường
+    retriever.rerank_budget = 5.0
+    first = client.get("/api/semantic-search?q=usb cable&limit=5")
+    assert first.get_json()["reranked"] is True
+    second = client.get("/api/semantic-search?q=usb cable&limit=5")
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert second.get_json() == first.get_json()
+
+
+def test_semantic_search_without_rerank_is_cached(client, retriever):
+    first = client.get("/api/semantic-search?q=wireless mouse&rerank=false")
+    second = client.get("/api/semantic-search?q=wireless mouse&rerank=false")
+    assert first.get_json()["reranked"] is False
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+
+
+def baseline_products(df, category=None, min_price=None, max_price=None, min_rating=None, sort=None, order="desc"):
+    """Bản cũ: lọc và sort_values bằng pandas trên DataFrame đã chuẩn hóa"""
+    mask = pd.Series(True, index=df.index)
+    if category:
+        query = category.lower()
+        if "|" in query:
+            paths = df["category_path"].map(lambda path: "|".join(path).lower())
+            mask &= (paths == query) | paths.str.startswith(query + "|")
+        else:
+            mask &= df["category"].str.lower().str.contains(query, regex=False)
+    if min_price is not None:
+        mask &= df["discounted_price"] >= min_price
+    if max_price is not None:
+        mask &= df["discounted_price"] <= max_price
+    if min_rating is not None:
+        mask &= df["rating"] >= min_rating
+    result = df[mask]
+    if sort:
+        result = result.sort_values(SORT_FIELDS[sort], ascending=order == "asc", kind="stable")
+    return result
+
+
+def fetch_all_pages(client, params):
+    """Đi hết các trang theo next_cursor, trả về product_id và response trang đầu"""
+    ids, first, url = [], None, f"/api/products?{params}"
+    while True:
+        body = client.get(url).get_json()
+        first = first or body
+        ids += [product["product_id"] for product in body["data"]]
+        cursor = body["pagination"]["next_cursor"]
+        if cursor is None:
+            return ids, first
+        url = f"/api/products?{params}&cursor={cursor}"
+
+
+@pytest.mark.parametrize("params, filters", [
+    ("limit=7", {}),
+    ("limit=9&sort=price&order=asc", {"sort": "price", "order": "asc"}),
+    ("limit=5&sort=rating", {"sort": "rating"}),
+    ("limit=8&sort=rating_count&order=desc&min_price=150&max_price=400",
+     {"sort": "rating_count", "min_price": 150, "max_price": 400}),
+    ("limit=4&category=cables&sort=discount_percentage", {"category": "cables", "sort": "discount_percentage"}),
+    ("limit=6&category=Computers|Keyboards&min_rating=3.5", {"category": "Computers|Keyboards", "min_rating": 3.5}),
+    ("limit=10&category=nothing-here", {"category": "nothing-here"}),
+])
+def test_products_pages_match_pandas(client, params, filters):
+    expected = baseline_products(app_module.get_data_mapper().df, **filters)
+    for _ in range(2):  # lần hai đi qua response cache
+        ids, first = fetch_all_pages(client, params)
+        assert ids == expected["product_id"].tolist()
+        assert first["pagination"]["total"] == len(expected)
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_products_facets_match_pandas(client, depth):
+    df = app_module.get_data_mapper().df
+    expected = baseline_products(df, min_price=120, min_rating=3.4)
+    body = client.get(f"/api/products?min_price=120&min_rating=3.4&facets=true&facet_depth={depth}&bins=5&limit=3").get_json()
+    
+    counts = expected["category_path"].map(lambda path: "|".join(path[:depth]) if len(path) >= depth else None)
+    assert body["facets"]["category"] == counts.dropna().value_counts().to_dict()
+    
+    hist, edges = np.histogram(expected["discounted_price"], bins=5)
+    assert body["facets"]["price_histogram"] == {
+        "counts": hist.tolist(), "edges": [round(float(edge), 2) for edge in edges]
+    }
+    assert "facets" not in client.get("/api/products?min_price=120&limit=3").get_json()
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm90LWFuLW9mZnNldA", app_module._encode_cursor(0)[:-2] + "xx", "eDo1", "bzotMQ"])
+def test_products_invalid_cursor(client, cursor):
+    response = client.get(f"/api/products?cursor={cursor}")
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.get_json()["error"]
+
+
+def test_products_out_of_range_pagination(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "MAX_PAGE_SIZE", 25)
+    total = len(app_module.get_data_mapper().df)
+    
+    # limit được kẹp vào [1, MAX_PAGE_SIZE]
+    for limit, expected in (("0", 1), ("-3", 1), ("1000", 25)):
+        body = client.get(f"/api/products?limit={limit}").get_json()
+        assert body["count"] == body["pagination"]["limit"] == expected
+    
+    # offset quá cuối: trang rỗng, không có trang sau
+    for offset in (total, total + 100):
+        body = client.get(f"/api/products?offset={offset}&limit=10").get_json()
+        assert body["data"] == [] and body["pagination"]["next_cursor"] is None
+        assert body["pagination"]["total"] == total
+    body = client.get(f"/api/products?cursor={app_module._encode_cursor(total - 3)}&limit=10").get_json()
+    assert body["count"] == 3 and body["pagination"]["next_cursor"] is None
+    
+    for params in ("offset=-1", "sort=name", "order=up", "min_rating=6", "min_price=-1", "bins=0", "facet_depth=0"):
+        assert client.get(f"/api/products?{params}").status_code == 400
+
+
+def test_products_search_pages_follow_ranking(client):
+    ranked = [product["product_id"] for product in app_module.get_data_mapper().search_products("usb", limit=1000)]
+    ids, first = fetch_all_pages(client, "search=usb&limit=4")
+    assert ids == ranked and len(ranked) > 4
+    assert first["pagination"]["total"] is None
+
+
+def test_failed_component_is_retried_after_interval(client, catalog_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "SERVICE_RETRY_INTERVAL", 1)
+    os.rename(catalog_path, catalog_path + ".missing")
+    assert client.get("/api/products").status_code == 503
+    ready = client.get("/api/health/ready").get_json()
+    assert "data_mapper" in ready["errors"]
+    assert 0 < ready["retry_in"]["data_mapper"] <= 1
+    
+    # Trong thời gian chờ: trả 503 ngay, không đọc lại file dù đã có
+    os.rename(catalog_path + ".missing", catalog_path)
+    assert client.get("/api/products").status_code == 503
+    
+    time.sleep(1.05)
+    assert client.get("/api/products").status_code == 200
+    ready = client.get("/api/health/ready").get_json()
+    assert ready["components"]["data_mapper"]
+    assert "data_mapper" not in ready["errors"] and ready["retry_in"] == {}
+
+
+def test_failed_component_without_retry_waits_for_reload(client, catalog_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "SERVICE_RETRY_INTERVAL", 0)
+    os.rename(catalog_path, catalog_path + ".missing")
+    assert client.get("/api/products").status_code == 503
+    os.rename(catalog_path + ".missing", catalog_path)
+    assert client.get("/api/products").status_code == 503
+    assert client.get("/api/health/ready").get_json()["retry_in"] == {"data_mapper": None}
@@ -0,0 +1,96 @@
+import os
+import json
+import logging
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from artifacts import (
+    load_recommendation_artifacts, arrays_stale_reason, export_arrays,
+    ARRAYS_STAMP_FILENAME, ARRAYS_SCHEMA_VERSION
+)
+from neighbors import ContentNeighborTable, UserTopKTable
+from source_stamp import write_stamp, make_stamp
+
+
+def make_model(seed):
+    rng = np.random.default_rng(seed)
+    users, products = [f"U{i}" for i in range(12)], [f"P{i}" for i in range(9)]
+    similarity = rng.random((9, 9))
+    return {
+        "user_encoder": LabelEncoder().fit(users),
+        "product_encoder": LabelEncoder().fit(products),
+        "U": rng.standard_normal((12, 4)),
+        "V": rng.standard_normal((9, 4)),
+        "content_pid2idx": {pid: idx for idx, pid in enumerate(products)},
+        "content_idx2pid": dict(enumerate(products)),
+        "content_similarity": (similarity + similarity.T) / 2,
+        "pop_rank": list(reversed(products)) if seed else products,
+    }
+
+
+def build_arrays(model_path, arrays_dir):
+    """Các bước của build_artifacts.py"""
+    artifacts = joblib.load(model_path)
+    export_arrays(artifacts, arrays_dir)
+    ContentNeighborTable.from_dense(artifacts["content_similarity"], top_n=5).save(arrays_dir)
+    UserTopKTable.from_factors(artifacts["U"], artifacts["V"], top_k=5).save(arrays_dir)
+    write_stamp(os.path.join(arrays_dir, ARRAYS_STAMP_FILENAME), model_path, ARRAYS_SCHEMA_VERSION)
+
+
+@pytest.fixture
+def model(tmp_path):
+    model_path = str(tmp_path / "hybrid_model.joblib")
+    joblib.dump(make_model(0), model_path)
+    arrays_dir = str(tmp_path / "arrays")
+    build_arrays(model_path, arrays_dir)
+    return model_path, arrays_dir
+
+
+def test_fresh_arrays_are_memory_mapped(model):
+    model_path, arrays_dir = model
+    assert arrays_stale_reason(model_path, arrays_dir) is None
+    artifacts = load_recommendation_artifacts(model_path, arrays_dir)
+    # Bảng user top-K chỉ có khi load từ arrays/
+    assert artifacts["user_topk"] is not None
+    assert isinstance(artifacts["U"], np.memmap)
+    np.testing.assert_allclose(artifacts["U"], make_model(0)["U"])
+
+
+def test_retrained_model_falls_back_to_joblib(model, caplog):
+    model_path, arrays_dir = model
+    joblib.dump(make_model(1), model_path)
+    
+    assert arrays_stale_reason(model_path, arrays_dir) is not None
+    with caplog.at_level(logging.WARNING, logger="artifacts"):
+        artifacts = load_recommendation_artifacts(model_path, arrays_dir)
+    assert "not usable" in caplog.text
+    np.testing.assert_allclose(artifacts["U"], make_model(1)["U"])
+    assert artifacts["pop_rank"] == make_model(1)["pop_rank"]
+    assert artifacts["user_topk"] is None
+    
+    # Build lại arrays thì dùng arrays/ trở lại
+    build_arrays(model_path, arrays_dir)
+    assert load_recommendation_artifacts(model_path, arrays_dir)["user_topk"] is not None
+
+
+def test_touched_model_with_same_content_is_fresh(model):
+    model_path, arrays_dir = model
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert arrays_stale_reason(model_path, arrays_dir) is None
+
+
+def test_missing_stamp_or_schema_change_is_stale(model):
+    model_path, arrays_dir = model
+    stamp_path = os.path.join(arrays_dir, ARRAYS_STAMP_FILENAME)
+    
+    with open(stamp_path, "w") as f:
+        json.dump(make_stamp(model_path, ARRAYS_SCHEMA_VERSION + 1), f)
+    assert "schema version" in arrays_stale_reason(model_path, arrays_dir)
+    
+    os.remove(stamp_path)
+    assert "no source stamp" in arrays_stale_reason(model_path, arrays_dir)
+    assert load_recommendation_artifacts(model_path, arrays_dir)["user_topk"] is None
@@ -0,0 +1,175 @@
+import os
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from build_rag_index import update_index, _append_npy
+from retrieval import (
+    HashingEncoder, load_index_state, product_context,
+    METADATA_FILENAME, EMBEDDINGS_FILENAME, TOMBSTONES_FILENAME, TFIDF_VECTORIZER_FILENAME
+)
+from vector_store import CompressedVectorStore
+
+DIM = 32
+WORDS = ["usb", "cable", "charger", "fast", "wireless", "mouse", "keyboard", "hdmi", "smart", "watch"]
+
+
+def make_products(n):
+    return [
+        {
+            "product_id": f"P{i:03d}",
+            "product_name": f"{WORDS[i % 10]} {WORDS[(i * 3) % 10]} model {i}",
+            "category": "Electronics|Accessories" if i % 2 else "Computers|Cables",
+            "discounted_price": float(100 + i)
+        }
+        for i in range(n)
+    ]
+
+
+def make_model_dir(path):
+    with open(path / METADATA_FILENAME, "w") as f:
+        json.dump({"embedding_dim": DIM, "embedding_model": "hashing"}, f)
+    return str(path)
+
+
+def build(model_dir, products, **options):
+    return update_index(model_dir, products, encoder_name="hashing", **options)
+
+
+def live_embeddings(model_dir):
+    """product_id → embedding của các dòng chưa bị tombstone"""
+    state = load_index_state(model_dir)
+    embeddings = np.load(f"{model_dir}/{EMBEDDINGS_FILENAME}")
+    tombstones = np.load(f"{model_dir}/{TOMBSTONES_FILENAME}")
+    assert len(embeddings) == len(state["product_ids"]) == len(tombstones)
+    return {
+        product_id: embeddings[row]
+        for row, product_id in enumerate(state["product_ids"])
+        if not tombstones[row]
+    }
+
+
+def expected_embeddings(products):
+    encoder = HashingEncoder(dim=DIM)
+    vectors = encoder.encode([product_context(product) for product in products])
+    return {product["product_id"]: vector for product, vector in zip(products, vectors)}
+
+
+def assert_matches_full_rebuild(model_dir, products):
+    live = live_embeddings(model_dir)
+    expected = expected_embeddings(products)
+    assert set(live) == set(expected)
+    for product_id, vector in expected.items():
+        np.testing.assert_allclose(live[product_id], vector, atol=1e-6)
+
+
+def test_unchanged_catalog_encodes_nothing(tmp_path):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(20)
+    assert build(model_dir, products, full=True)["added"] == 20
+    
+    stats = build(model_dir, products)
+    assert (stats["added"], stats["changed"], stats["removed"]) == (0, 0, 0)
+    assert_matches_full_rebuild(model_dir, products)
+
+
+def test_first_build_without_full_creates_artifacts(tmp_path):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(20)
+    stats = build(model_dir, products)
+    assert (stats["added"], stats["embeddings"]) == (20, "rewritten")
+    assert os.path.exists(os.path.join(model_dir, TFIDF_VECTORIZER_FILENAME))
+    assert_matches_full_rebuild(model_dir, products)
+
+
+def test_incremental_appends_only_changed_rows(tmp_path):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(20)
+    build(model_dir, products, full=True)
+    path = f"{model_dir}/{EMBEDDINGS_FILENAME}"
+    before = np.load(path)
+    
+    updated = [dict(product) for product in products[1:]]  # P000 bị xóa
+    updated[0]["product_name"] = "wireless charger renamed"  # P001 thay đổi
+    updated.append({**products[5], "product_id": "NEW1"})  # sản phẩm mới
+    
+    stats = build(model_dir, updated)
+    assert (stats["added"], stats["changed"], stats["removed"]) == (1, 1, 1)
+    assert stats["embeddings"] == "appended"
+    
+    after = np.load(path)
+    assert len(after) == len(before) + 2
+    np.testing.assert_array_equal(after[:len(before)], before)
+    assert_matches_full_rebuild(model_dir, updated)
+
+
+def test_compact_drops_tombstones(tmp_path):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(20)
+    build(model_dir, products, full=True)
+    updated = products[3:]
+    build(model_dir, updated)
+    
+    stats = build(model_dir, updated, compact=True)
+    assert stats["embeddings"] == "rewritten"
+    assert stats["rows"] == 17 and stats["tombstones"] == 0
+    assert_matches_full_rebuild(model_dir, updated)
+
+
+def test_rows_from_interrupted_append_are_discarded(tmp_path):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(10)
+    build(model_dir, products, full=True)
+    
+    # Header đã được sửa nhưng index_state.json chưa được ghi
+    assert _append_npy(f"{model_dir}/{EMBEDDINGS_FILENAME}", np.ones((3, DIM), dtype=np.float32))
+    
+    updated = products + make_products(12)[10:]
+    stats = build(model_dir, updated)
+    assert stats["added"] == 2 and stats["rows"] == 12
+    assert_matches_full_rebuild(model_dir, updated)
+
+
+def test_append_npy_rejects_mismatched_rows(tmp_path):
+    path = str(tmp_path / "x.npy")
+    np.save(path, np.zeros((2, 4), dtype=np.float32))
+    assert not _append_npy(path, np.zeros((1, 3), dtype=np.float32))
+    assert not _append_npy(path, np.zeros((1, 4), dtype=np.float64))
+    assert _append_npy(path, np.ones((2, 4), dtype=np.float32))
+    np.testing.assert_array_equal(np.load(path), np.vstack([np.zeros((2, 4)), np.ones((2, 4))]))
+
+
+def test_duplicate_product_ids_are_logged(tmp_path, caplog):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(10)
+    duplicated = products + [{**products[2], "product_name": "usb cable last copy"}]
+    
+    with caplog.at_level(logging.WARNING, logger="build_rag_index"):
+        stats = build(model_dir, duplicated, full=True)
+    assert "duplicate product_id" in caplog.text and "P002" in caplog.text
+    assert stats["rows"] == 10
+    # Giữ lần xuất hiện cuối
+    assert_matches_full_rebuild(model_dir, products[:2] + products[3:] + duplicated[-1:])
+
+
+@pytest.mark.parametrize("max_drift, action", [(1e9, "appended"), (0.0, "retrained")])
+def test_vector_store_retrained_only_on_drift(tmp_path, max_drift, action):
+    model_dir = make_model_dir(tmp_path)
+    products = make_products(40)
+    build(model_dir, products[:30], full=True)
+    store_dir = str(tmp_path / "compressed")
+    store = CompressedVectorStore.build(np.load(f"{model_dir}/{EMBEDDINGS_FILENAME}"), method="int8")
+    store.save(store_dir)
+    
+    stats = build(model_dir, products, vector_store_dir=store_dir, max_drift=max_drift)
+    assert stats["vector_store"] == action
+    
+    updated = CompressedVectorStore.load(store_dir)
+    embeddings = np.load(f"{model_dir}/{EMBEDDINGS_FILENAME}")
+    assert len(updated) == len(embeddings) == 40
+    if action == "appended":
+        np.testing.assert_array_equal(updated.codes.params, store.codes.params)
+        np.testing.assert_array_equal(updated.codes.codes[:30], store.codes.codes)
+        np.testing.assert_array_equal(updated.codes.codes[30:], store.codes.encode(embeddings[30:]))
@@ -0,0 +1,28 @@
+import pytest
+
+from catalog_store import write_catalog, catalog_stale_reason
+from data_mapper import ProductDataMapper
+
+
+CSV_COLUMNS = "product_id,product_name,category,discounted_price,actual_price,discount_percentage,rating,rating_count\n"
+
+
+def write_csv(path, names):
+    with open(path, "w") as f:
+        f.write(CSV_COLUMNS)
+        for i, name in enumerate(names):
+            f.write(f"P{i},{name},Electronics|Cables,{100 + i},{200 + i},0.5,4.1,{10 * i}\n")
+
+
+def test_catalog_ignored_after_csv_changes(tmp_path):
+    pytest.importorskip("pyarrow")
+    csv_path, catalog_path = str(tmp_path / "amazon.csv"), str(tmp_path / "amazon.feather")
+    write_csv(csv_path, ["usb cable", "hdmi cable"])
+    mapper = ProductDataMapper(csv_path)
+    write_catalog(mapper.df, catalog_path, source_path=csv_path)
+    assert catalog_stale_reason(catalog_path, csv_path) is None
+    
+    write_csv(csv_path, ["usb cable", "hdmi cable", "new charger"])
+    assert catalog_stale_reason(catalog_path, csv_path) is not None
+    reloaded = ProductDataMapper(csv_path, catalog_path=catalog_path)
+    assert reloaded.df["product_name"].tolist() == ["usb cable", "hdmi cable", "new charger"]
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+import pytest
+
+from category_index import CategoryIndex
+
+PATHS = [
+    ["Electronics", "Headphones,Earbuds&Accessories", "Headphones", "In-Ear"],
+    ["Electronics", "Headphones,Earbuds&Accessories", "Earpads"],
+    ["Electronics", "HomeTheater,TV&Video", "Televisions"],
+    ["Computers&Accessories", "Accessories&Peripherals", "Cables&Accessories", "Cables"],
+    ["Computers&Accessories", "Accessories&Peripherals", "Keyboards"],
+    ["Home&Kitchen", "Kitchen&HomeAppliances", "Coffee"],
+    ["Electronics"],
+    [],
+]
+
+
+def brute_force(paths, query):
+    """Quét từng sản phẩm: query dạng đường dẫn khớp tiền tố, còn lại khớp substring của tên node"""
+    query = query.strip().lower()
+    if not query:
+        return np.arange(len(paths))
+    for separator in (">", "|"):
+        if separator in query:
+            target = [part.strip() for part in query.split(separator) if part.strip()]
+            return np.asarray([
+                pos for pos, path in enumerate(paths)
+                if [part.lower() for part in path[:len(target)]] == target
+            ], dtype=np.int64)
+    return np.asarray([
+        pos for pos, path in enumerate(paths)
+        if any(query in part.lower() for part in path)
+    ], dtype=np.int64)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CategoryIndex(PATHS)
+
+
+@pytest.mark.parametrize("query", [
+    "electronics", "HEADPHONES", "phones", "accessories", "&", "s", "e",
+    "cables", "zzz", "", "   ", "Electronics|Headphones,Earbuds&Accessories",
+    "electronics > hometheater,tv&video > televisions", "Electronics|Missing", "Cables|Headphones",
+])
+def test_lookup_matches_brute_force(index, query):
+    np.testing.assert_array_equal(index.lookup(query), brute_force(PATHS, query))
+
+
+def test_lookup_random_substrings_match_brute_force():
+    rng = np.random.default_rng(0)
+    index = CategoryIndex(PATHS, lookup_cache_size=4)
+    names = sorted({part for path in PATHS for part in path})
+    for _ in range(300):
+        name = names[rng.integers(len(names))]
+        start = int(rng.integers(len(name)))
+        query = name[start:start + int(rng.integers(1, 8))]
+        np.testing.assert_array_equal(index.lookup(query), brute_force(PATHS, query))
+
+
+def test_lookup_is_cached(index):
+    first = index.lookup("Headphones")
+    assert index.lookup(" headphones ") is first
+
+
+def test_lookup_cache_is_thread_safe():
+    index = CategoryIndex(PATHS, lookup_cache_size=2)
+    queries = ["a", "e", "c", "phones", "kitchen", "cables", "x"] * 50
+    errors = []
+    
+    def worker():
+        try:
+            for query in queries:
+                np.testing.assert_array_equal(index.lookup(query), brute_force(PATHS, query))
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert index._lookup_cache.stats()["entries"] <= 2
+
+
+def test_counts_and_facets(index):
+    assert index.count("electronics") == 4
+    assert index.counts(1) == {"Computers&Accessories": 2, "Electronics": 4, "Home&Kitchen": 1}
+    facets = index.facet_counts(np.array([0, 1, 3, 7]), depth=2)
+    assert facets == {"Computers&Accessories|Accessories&Peripherals": 1, "Electronics|Headphones,Earbuds&Accessories": 2}
+
+
+def test_empty_catalog():
+    index = CategoryIndex([])
+    assert len(index.lookup("anything")) == 0
+    assert index.top_categories == []
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from column_index import SortedColumnIndex
+
+
+@pytest.fixture(scope="module")
+def values():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, size=300).astype(float)
+    values[rng.choice(300, size=25, replace=False)] = np.nan
+    return values
+
+
+@pytest.mark.parametrize("low, high", [
+    (None, None), (5, None), (None, 5), (3, 12), (12, 3), (-10, -1), (19, 19), (0.5, 0.7), (5, 5)
+])
+def test_range_matches_mask(values, low, high):
+    index = SortedColumnIndex(values)
+    expected = ~np.isnan(values)
+    if low is not None:
+        expected &= values >= low
+    if high is not None:
+        expected &= values <= high
+    
+    np.testing.assert_array_equal(index.range_mask(low, high), expected)
+    positions = index.range_positions(low, high)
+    np.testing.assert_array_equal(np.sort(positions), np.flatnonzero(expected))
+    # Theo thứ tự giá trị tăng dần
+    assert np.all(np.diff(values[positions]) >= 0)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_permutation_matches_stable_sort(values, descending):
+    index = SortedColumnIndex(values)
+    frame_order = np.argsort(-values if descending else values, kind="stable")
+    np.testing.assert_array_equal(index.permutation(descending), frame_order)
+    # NaN nằm cuối ở cả hai chiều
+    assert np.isnan(values[index.permutation(descending)][-25:]).all()
+
+
+def test_histogram_skips_nan(values):
+    index = SortedColumnIndex(values)
+    counts, edges = index.histogram(bins=5)
+    expected_counts, expected_edges = np.histogram(values[~np.isnan(values)], bins=5)
+    np.testing.assert_array_equal(counts, expected_counts)
+    np.testing.assert_array_equal(edges, expected_edges)
+    
+    counts, edges = index.histogram(np.flatnonzero(np.isnan(values)))
+    assert len(counts) == 0 and len(edges) == 0
+
+
+def test_empty_column():
+    index = SortedColumnIndex([])
+    assert len(index.range_positions(0, 10)) == 0
+    assert len(index.range_mask()) == 0
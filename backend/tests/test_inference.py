@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from inference import MicroBatcher
+
+
+def square_all(items):
+    return [item * item for item in items]
+
+
+def test_results_match_unbatched_calls():
+    batcher = MicroBatcher(square_all, max_batch_size=8, max_wait_ms=5)
+    futures = [batcher.submit(i) for i in range(50)]
+    assert [future.result(timeout=5) for future in futures] == [square_all([i])[0] for i in range(50)]
+    batcher.close()
+
+
+def test_concurrent_submits_are_batched_and_capped():
+    sizes = []
+    
+    def record(items):
+        sizes.append(len(items))
+        return square_all(items)
+    
+    batcher = MicroBatcher(record, max_batch_size=4, max_wait_ms=50)
+    results = {}
+    barrier = threading.Barrier(16)
+    
+    def client(i):
+        barrier.wait()
+        results[i] = batcher.submit(i).result(timeout=5)
+    
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == {i: i * i for i in range(16)}
+    assert max(sizes) <= 4
+    assert len(sizes) < 16
+    assert batcher.stats()["items"] == 16
+    batcher.close()
+
+
+def test_batch_error_is_set_on_every_future():
+    def fail(items):
+        raise RuntimeError("model down")
+    
+    batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model down"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_cancelled_future_is_skipped():
+    seen = []
+    started = threading.Event()
+    release = threading.Event()
+    
+    def slow(items):
+        seen.extend(items)
+        started.set()
+        release.wait(5)
+        return items
+    
+    batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0)
+    first = batcher.submit("first")
+    started.wait(5)
+    cancelled = batcher.submit("cancelled")
+    assert cancelled.cancel()
+    last = batcher.submit("last")
+    release.set()
+    
+    assert first.result(timeout=5) == "first"
+    assert last.result(timeout=5) == "last"
+    assert seen == ["first", "last"]
+    batcher.close()
+
+
+def test_submit_after_close_restarts_worker():
+    batcher = MicroBatcher(square_all, max_wait_ms=0)
+    assert batcher.submit(3).result(timeout=5) == 9
+    batcher.close()
+    deadline = time.monotonic() + 5
+    while batcher._thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batcher._thread is None
+    assert batcher.submit(4).result(timeout=5) == 16
+    batcher.close()
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from neighbors import ContentNeighborTable, UserTopKTable
+
+
+@pytest.fixture(scope="module")
+def similarity():
+    rng = np.random.default_rng(0)
+    # Điểm làm tròn để có nhiều giá trị hòa
+    similarity = np.round(rng.random((40, 40)), 1)
+    return (similarity + similarity.T) / 2
+
+
+def brute_force_neighbors(similarity, idx, k):
+    order = [j for j in np.argsort(-similarity[idx], kind="stable") if j != idx]
+    return order[:k]
+
+
+def brute_force_aggregate(table, seeds, depth, weighting, skip=None):
+    """Vòng lặp dict theo từng seed như bản cũ"""
+    scores = {}
+    for seed in seeds:
+        rank = 0
+        for neighbor, similarity in zip(table.indices[seed], table.scores[seed]):
+            if neighbor < 0 or (skip is not None and skip[neighbor]):
+                continue
+            if rank >= depth:
+                break
+            weight = 1.0 / (rank + 1) if weighting == "reciprocal_rank" else float(similarity)
+            scores[int(neighbor)] = scores.get(int(neighbor), 0.0) + weight
+            rank += 1
+    return scores
+
+
+def test_from_dense_matches_sorted_similarity(similarity):
+    table = ContentNeighborTable.from_dense(similarity, top_n=10, chunk_size=7)
+    assert table.indices.shape == (40, 10)
+    for idx in range(40):
+        neighbors, scores = table.row(idx, 10)
+        assert idx not in neighbors.tolist()
+        expected = brute_force_neighbors(similarity, idx, 10)
+        np.testing.assert_allclose(scores, similarity[idx, expected], rtol=1e-6)
+        np.testing.assert_allclose(scores, similarity[idx, neighbors], rtol=1e-6)
+
+
+def test_top_n_capped_at_n_minus_one(similarity):
+    table = ContentNeighborTable.from_dense(similarity, top_n=500)
+    assert table.top_n == 39
+    assert not table.covers(0, 40)
+    assert table.covers(0, 39)
+
+
+def test_save_load_roundtrip(similarity, tmp_path):
+    table = ContentNeighborTable.from_dense(similarity, top_n=5)
+    assert not ContentNeighborTable.exists(tmp_path)
+    table.save(tmp_path)
+    loaded = ContentNeighborTable.load(tmp_path)
+    np.testing.assert_array_equal(loaded.indices, table.indices)
+    np.testing.assert_array_equal(loaded.scores, table.scores)
+    # Hai loại bảng dùng file riêng trong cùng thư mục arrays/
+    assert not UserTopKTable.exists(tmp_path)
+
+
+@pytest.mark.parametrize("weighting", ["reciprocal_rank", "similarity"])
+@pytest.mark.parametrize("depth", [1, 3, 10, 50])
+def test_aggregate_matches_loop(similarity, weighting, depth):
+    table = ContentNeighborTable.from_dense(similarity, top_n=15)
+    rng = np.random.default_rng(depth)
+    seeds = rng.integers(0, 40, size=6)
+    seeds[1] = seeds[0]  # seed trùng được cộng thêm một lượt
+    skip = np.zeros(40, dtype=bool)
+    skip[seeds] = True
+    skip[rng.choice(40, size=5, replace=False)] = True
+    
+    for mask in (None, skip):
+        scores, touched = table.aggregate(seeds, depth, weighting=weighting, skip=mask)
+        expected = brute_force_aggregate(table, seeds, depth, weighting, mask)
+        assert set(np.flatnonzero(touched).tolist()) == set(expected)
+        for idx, value in expected.items():
+            assert scores[idx] == pytest.approx(value)
+        assert np.all(scores[~touched] == 0)
+
+
+def test_aggregate_empty_seeds_and_zero_depth(similarity):
+    table = ContentNeighborTable.from_dense(similarity, top_n=5)
+    for seeds, depth in (([], 5), ([1, 2], 0)):
+        scores, touched = table.aggregate(np.asarray(seeds), depth)
+        assert not touched.any() and not scores.any()
+    with pytest.raises(ValueError):
+        table.aggregate(np.array([0]), 3, weighting="unknown")
+
+
+def test_user_topk_matches_matrix_product():
+    rng = np.random.default_rng(1)
+    U, V = rng.standard_normal((30, 8)), rng.standard_normal((25, 8))
+    table = UserTopKTable.from_factors(U, V, top_k=10, chunk_size=4)
+    predicted = U @ V.T
+    for user in range(30):
+        indices, scores = table.row(user, 10)
+        expected = np.argsort(-predicted[user], kind="stable")[:10]
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_allclose(scores, predicted[user, expected], rtol=1e-5)
+    
+    assert table.covers(29, 10)
+    assert not table.covers(30, 10)
+    assert not table.covers(0, 11)
+    assert UserTopKTable.from_factors(U, V, top_k=100).top_n == 25
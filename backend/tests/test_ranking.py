@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from ranking import top_k, top_k_batch
+
+
+def brute_force(scores, k, exclude=None):
+    """Cách cũ: argsort toàn bộ, bỏ các vị trí bị loại trừ"""
+    scores = np.asarray(scores, dtype=np.float64)
+    excluded = np.zeros(len(scores), dtype=bool)
+    if exclude is not None:
+        exclude = np.asarray(exclude)
+        if exclude.dtype == bool:
+            excluded |= exclude
+        else:
+            excluded[exclude.astype(np.intp)] = True
+    order = [i for i in np.argsort(-scores, kind="stable") if not excluded[i]]
+    return np.asarray(order[:max(k, 0)], dtype=np.intp)
+
+
+def assert_same_ranking(result, expected, scores):
+    # Hòa điểm ở biên có thể chọn phần tử khác nhau: so dãy điểm và tập chỉ số không hòa
+    scores = np.asarray(scores, dtype=np.float64)
+    assert len(result) == len(expected)
+    assert len(set(result.tolist())) == len(result)
+    np.testing.assert_array_equal(scores[result], scores[expected])
+    if len(expected):
+        boundary = scores[expected[-1]]
+        assert set(result[scores[result] > boundary].tolist()) == set(expected[scores[expected] > boundary].tolist())
+
+
+@pytest.mark.parametrize("k", [0, 1, 5, 20, 50, 100])
+def test_top_k_matches_argsort(k):
+    scores = np.random.default_rng(k).standard_normal(50)
+    assert_same_ranking(top_k(scores, k), brute_force(scores, k), scores)
+
+
+def test_top_k_with_ties():
+    scores = np.random.default_rng(1).integers(0, 4, size=200).astype(float)
+    for k in (1, 7, 50, 199, 200, 300):
+        assert_same_ranking(top_k(scores, k), brute_force(scores, k), scores)
+
+
+def test_top_k_k_larger_than_n_returns_all_sorted():
+    scores = np.array([0.1, 0.9, 0.5])
+    np.testing.assert_array_equal(top_k(scores, 10), [1, 2, 0])
+
+
+def test_top_k_empty_input():
+    assert len(top_k(np.zeros(0), 5)) == 0
+    assert len(top_k(np.array([1.0, 2.0]), 0)) == 0
+    assert len(top_k(np.array([1.0, 2.0]), -3)) == 0
+
+
+@pytest.mark.parametrize("as_mask", [False, True])
+def test_top_k_exclude(as_mask):
+    rng = np.random.default_rng(7)
+    scores = rng.standard_normal(100)
+    excluded = rng.choice(100, size=30, replace=False)
+    exclude = excluded
+    if as_mask:
+        exclude = np.zeros(100, dtype=bool)
+        exclude[excluded] = True
+    
+    for k in (5, 70, 100):
+        result = top_k(scores, k, exclude=exclude)
+        assert not set(result.tolist()) & set(excluded.tolist())
+        assert_same_ranking(result, brute_force(scores, k, exclude), scores)
+
+
+def test_top_k_everything_excluded():
+    assert len(top_k(np.ones(5), 3, exclude=np.ones(5, dtype=bool))) == 0
+
+
+def test_top_k_batch_matches_rows():
+    rng = np.random.default_rng(3)
+    scores = rng.integers(0, 5, size=(12, 40)).astype(float)
+    mask = rng.random((12, 40)) < 0.3
+    
+    for k in (1, 10, 40, 60):
+        batch = top_k_batch(scores, k, exclude=mask)
+        assert batch.shape == (12, min(k, 40))
+        for row in range(12):
+            valid = batch[row][batch[row] >= 0]
+            assert_same_ranking(valid, brute_force(scores[row], k, mask[row]), scores[row])
+
+
+def test_top_k_batch_pads_with_minus_one():
+    scores = np.array([[3.0, 2.0, 1.0]])
+    exclude = np.array([[False, True, True]])
+    np.testing.assert_array_equal(top_k_batch(scores, 3, exclude=exclude), [[0, -1, -1]])
+
+
+def test_top_k_batch_empty():
+    assert top_k_batch(np.zeros((4, 0)), 3).shape == (4, 0)
+    assert top_k_batch(np.ones((2, 5)), 0).shape == (2, 0)
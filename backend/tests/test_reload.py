@@ -0,0 +1,129 @@
+import time
+import threading
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import app as app_module
+from conftest import make_catalog
+from test_artifacts import make_model
+
+
+@pytest.fixture
+def served(client, catalog_path, monkeypatch):
+    """Client với đủ artifact để reload (price model + hybrid model), catalog đã được load"""
+    config = app_module.app.config
+    features = np.random.default_rng(0).random((50, 4))
+    joblib.dump({"model": LinearRegression().fit(features, features @ [900, 10, 1, 5])}, config["PRICE_MODEL_PATH"])
+    joblib.dump(make_model(0), config["RECOMMENDATION_MODEL_PATH"])
+    monkeypatch.setattr(app_module, "_reload_status", dict(app_module._reload_status, reloads=0))
+    monkeypatch.setitem(config, "ADMIN_TOKEN", "secret")
+    
+    assert client.get("/api/products").status_code == 200
+    assert app_module.get_artifacts() is not None and app_module.get_models_service() is not None
+    return client
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def reload(client, **body):
+    return client.post("/api/admin/reload", json=body, headers={"X-Admin-Token": "secret"})
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": ""}])
+def test_admin_endpoints_require_token(served, headers):
+    assert served.post("/api/admin/reload", json={"wait": True}, headers=headers).status_code == 401
+    assert served.get("/api/admin/version", headers=headers).status_code == 401
+    assert app_module._reload_status["reloads"] == 0
+    assert served.get("/api/admin/version", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_without_token_only_localhost_is_allowed(served, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "ADMIN_TOKEN", None)
+    assert served.get("/api/admin/version").status_code == 200
+    remote = served.get("/api/admin/version", environ_base={"REMOTE_ADDR": "10.1.2.3"})
+    assert remote.status_code == 403
+
+
+def test_reload_is_noop_when_fingerprint_unchanged(served):
+    mapper, version = app_module.data_mapper, app_module.loaded_version
+    response = reload(served, wait=True)
+    assert response.status_code == 200
+    assert response.get_json()["data"] == {"reloaded": False, "version": version["version"]}
+    assert app_module.data_mapper is mapper and app_module.loaded_version is version
+    assert app_module._reload_status["reloads"] == 0
+    
+    info = served.get("/api/admin/version", headers={"X-Admin-Token": "secret"}).get_json()["data"]
+    assert info["up_to_date"] and info["version"] == version["version"]
+
+
+def test_forced_reload_swaps_services_while_serving(served, catalog_path):
+    old = (app_module.data_mapper, app_module.artifacts, app_module.models_service)
+    cached = served.get("/api/products?limit=5")
+    assert served.get("/api/products?limit=5").headers["X-Cache"] == "HIT"
+    
+    # Catalog mới có thêm sản phẩm; fingerprint đổi nhưng reload vẫn được ép (force)
+    make_catalog(70).to_csv(catalog_path, index=False)
+    
+    statuses, stop = [], threading.Event()
+    
+    def serve():
+        client = app_module.app.test_client()
+        while not stop.is_set():
+            for url in ("/api/products?limit=20&sort=price", "/api/products/P001", "/api/categories"):
+                statuses.append(client.get(url).status_code)
+    
+    workers = [threading.Thread(target=serve) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    try:
+        # Reload bắt đầu khi các worker đang phục vụ, và chúng tiếp tục phục vụ sau khi swap
+        wait_until(lambda: len(statuses) >= 20)
+        response = reload(served, force=True, wait=True)
+        served_before = len(statuses)
+        wait_until(lambda: len(statuses) >= served_before + 20)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    
+    assert response.status_code == 200 and response.get_json()["data"]["reloaded"]
+    assert statuses and set(statuses) == {200}
+    new = (app_module.data_mapper, app_module.artifacts, app_module.models_service)
+    assert all(after is not before for before, after in zip(old, new))
+    assert app_module._reload_status["reloads"] == 1
+    
+    # Response cache của version trước đã bị xóa
+    after = served.get("/api/products?limit=5")
+    assert after.headers["X-Cache"] == "MISS"
+    assert after.get_json()["pagination"]["total"] == 70 != cached.get_json()["pagination"]["total"]
+    assert served.get("/api/products/P065").status_code == 200
+    
+    # Reload lần nữa không ép: fingerprint đã khớp nên không làm gì
+    assert reload(served, wait=True).get_json()["data"]["reloaded"] is False
+
+
+def test_failed_reload_keeps_serving_current_version(served, monkeypatch):
+    mapper = app_module.data_mapper
+    monkeypatch.setitem(app_module.app.config, "PRICE_MODEL_PATH", "/nonexistent/xgboost_model.joblib")
+    response = reload(served, force=True, wait=True)
+    assert response.status_code == 500
+    assert app_module.data_mapper is mapper
+    assert app_module._reload_status["last_error"]
+    assert served.get("/api/products").status_code == 200
+
+
+def test_background_reload(served):
+    mapper = app_module.data_mapper
+    response = reload(served, force=True)
+    assert response.status_code == 202 and response.get_json()["status"] == "reloading"
+    wait_until(lambda: app_module._reload_status["reloads"] == 1 and app_module._reload_status["state"] == "idle")
+    assert app_module.data_mapper is not mapper
+    assert served.get("/api/products/P001").status_code == 200
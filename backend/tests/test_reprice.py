@@ -0,0 +1,57 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import app as app_module
+import reprice
+from data_mapper import ProductDataMapper
+
+
+@pytest.fixture
+def price_model_path(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    actual = rng.uniform(100, 5000, 300)
+    rating = rng.uniform(0, 5, 300)
+    rating_count = rng.integers(0, 5000, 300)
+    features = np.column_stack([actual, rating, rating_count, rating_count > 1000])
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(features, actual * (0.4 + rating / 10))
+    
+    path = str(tmp_path / "xgboost_model.joblib")
+    joblib.dump({"model": model}, path)
+    monkeypatch.setitem(app_module.app.config, "PRICE_MODEL_PATH", path)
+    monkeypatch.setattr(reprice, "_worker_service", None)
+    reprice._init_worker(path, model_threads=1)
+    return path
+
+
+def make_chunk():
+    # Dòng bẩn: NaN, chuỗi lỗi, rating ngoài 0..5, rating_count âm hoặc lẻ
+    return pd.DataFrame({
+        "product_id": [f"P{i}" for i in range(8)],
+        "actual_price": [1099.0, 349.0, None, "abc", -50.0, 2500.0, 799.0, 1500.0],
+        "rating": [4.2, 4.0, 3.9, 4.5, 7.0, -1.0, None, 4.1],
+        "rating_count": [24269, 43994, 120, None, -3, 1500.7, 80, "12,000"],
+    })
+
+
+def test_predict_chunk_cleans_like_catalog(price_model_path, tmp_path):
+    chunk = make_chunk()
+    result = reprice.predict_chunk(chunk, chunk_size=3)
+    
+    chunk.to_csv(tmp_path / "catalog.csv", index=False)
+    catalog = ProductDataMapper(str(tmp_path / "catalog.csv")).df
+    for column in ("actual_price", "rating", "rating_count"):
+        np.testing.assert_array_equal(result[column].to_numpy(), catalog[column].to_numpy())
+    assert result["rating"].between(0, 5).all() and (result["rating_count"] >= 0).all()
+
+
+def test_predict_chunk_matches_price_endpoint(client, price_model_path):
+    result = reprice.predict_chunk(make_chunk(), chunk_size=3)
+    for row in result.itertuples():
+        response = client.post("/api/price-prediction", json={
+            "actual_price": row.actual_price, "rating": row.rating, "rating_count": row.rating_count
+        })
+        assert response.status_code == 200
+        assert response.get_json()["data"]["predicted_price"] == pytest.approx(row.predicted_price)
@@ -0,0 +1,80 @@
+import time
+
+from response_cache import ResponseCache
+
+
+def test_hit_miss_and_etag():
+    cache = ResponseCache(ttl=60)
+    assert cache.get("a") is None
+    entry = cache.set("a", b'{"x": 1}')
+    assert cache.get("a") is entry
+    assert entry.etag == ResponseCache.make_etag(b'{"x": 1}')
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.01)
+    cache.set("a", b"body")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_lru_eviction_by_entries():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes_and_oversized_body():
+    cache = ResponseCache(ttl=60, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"123456")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+    
+    entry = cache.set("big", b"x" * 11)
+    assert entry.body == b"x" * 11
+    assert cache.get("big") is None
+
+
+def test_replacing_key_keeps_byte_count():
+    cache = ResponseCache(ttl=60)
+    cache.set("a", b"12345")
+    cache.set("a", b"12")
+    assert cache.stats()["bytes"] == 2 and cache.stats()["entries"] == 1
+
+
+def test_compressed_variants_are_counted_and_served():
+    cache = ResponseCache(ttl=60, max_bytes=100)
+    entry = cache.set("a", b"x" * 40)
+    assert cache.get_variant(entry, "gzip") is None
+    
+    cache.add_variant("a", entry, "gzip", b"g" * 10)
+    assert cache.get_variant(entry, "gzip") == b"g" * 10
+    assert cache.stats()["bytes"] == 50
+    assert cache.stats()["variant_hits"] == 1
+    
+    # Thêm lại cùng encoding không tính byte hai lần
+    cache.add_variant("a", entry, "gzip", b"h" * 10)
+    assert cache.stats()["bytes"] == 50
+    
+    # Xóa entry trừ cả byte của bản nén
+    cache.set("b", b"y" * 60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 60
+
+
+def test_variant_of_replaced_entry_is_ignored():
+    cache = ResponseCache(ttl=60)
+    old = cache.set("a", b"old body")
+    cache.set("a", b"new body")
+    cache.add_variant("a", old, "gzip", b"zz")
+    assert cache.stats()["bytes"] == len(b"new body")
+    assert cache.get("a").variants == {}
@@ -0,0 +1,139 @@
+import json
+import time
+import pickle
+
+import numpy as np
+import pytest
+
+from build_rag_index import update_index
+from retrieval import (
+    SemanticRetriever, QueryEncoder, Reranker, HashingEncoder, fuse_scores,
+    load_metadata, product_context, METADATA_FILENAME, TFIDF_MATRIX_FILENAME
+)
+
+WORDS = ["usb", "cable", "charger", "fast", "wireless", "mouse", "keyboard", "hdmi", "smart", "watch"]
+
+
+def make_products(n):
+    return [
+        {
+            "product_id": f"P{i:03d}",
+            "product_name": f"{WORDS[i % 10]} {WORDS[(i * 7) % 10]} {WORDS[(i * 3) % 10]} {i}",
+            "category": "Electronics|Accessories" if i % 2 else "Computers|Cables"
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("rag")
+    with open(path / METADATA_FILENAME, "w") as f:
+        json.dump({"embedding_dim": 32, "embedding_model": "hashing"}, f)
+    update_index(str(path), make_products(80), encoder_name="hashing")
+    return str(path)
+
+
+def set_alpha(model_dir, alpha):
+    metadata = load_metadata(model_dir)
+    metadata["hybrid_alpha"] = alpha
+    with open(f"{model_dir}/{METADATA_FILENAME}", "w") as f:
+        json.dump(metadata, f)
+
+
+def make_retriever(model_dir, **options):
+    products = {product["product_id"]: product for product in make_products(80)}
+    options.setdefault("top_k_dense", 80)
+    options.setdefault("top_k_sparse", 80)
+    return SemanticRetriever(
+        model_dir,
+        encoder_name="hashing",
+        use_faiss=False,
+        document_text=lambda pid: product_context(products[pid]),
+        batch_window_ms=0,
+        **options
+    )
+
+
+class SlowReranker(Reranker):
+    def __init__(self, delay):
+        self.delay = delay
+    
+    def predict(self, pairs):
+        time.sleep(self.delay)
+        return np.arange(len(pairs), dtype=np.float64)
+
+
+class FailingReranker(Reranker):
+    def predict(self, pairs):
+        raise RuntimeError("model crashed")
+
+
+def test_base_classes_are_abstract():
+    with pytest.raises(TypeError):
+        QueryEncoder()
+    with pytest.raises(TypeError):
+        Reranker()
+    
+    class Incomplete(Reranker):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_fuse_scores_fills_missing_stage_with_zero():
+    dense = (np.array([3, 1]), np.array([0.8, 0.4]))
+    sparse = (np.array([1, 7]), np.array([0.5, 0.9]))
+    ids, scores = fuse_scores(dense, sparse, 0.25)
+    assert ids.tolist() == [1, 3, 7]
+    np.testing.assert_allclose(scores, [0.25 * 0.4 + 0.75 * 0.5, 0.25 * 0.8, 0.75 * 0.9])
+
+
+@pytest.mark.parametrize("alpha", [0.0, 0.3, 0.5, 1.0])
+@pytest.mark.parametrize("query", ["usb cable", "wireless mouse 12", "smart watch charger"])
+def test_search_matches_weighted_sum(model_dir, alpha, query):
+    set_alpha(model_dir, alpha)
+    retriever = make_retriever(model_dir)
+    try:
+        ids, scores, reranked = retriever.search(query, top_k=10)
+        assert not reranked and retriever.alpha == alpha
+        
+        # Mọi dòng đều là ứng viên dense: điểm hybrid = alpha * cosine + (1 - alpha) * TF-IDF
+        dense = np.asarray(retriever.embeddings) @ HashingEncoder(dim=32).encode([query])[0]
+        with open(f"{model_dir}/{TFIDF_MATRIX_FILENAME}", "rb") as f:
+            sparse = (pickle.load(f) @ retriever.vectorizer.transform([query]).T).toarray().ravel()
+        expected = alpha * dense + (1 - alpha) * sparse
+        
+        np.testing.assert_allclose(scores, np.sort(expected)[::-1][:10], rtol=1e-5, atol=1e-7)
+        np.testing.assert_allclose(expected[ids], scores, rtol=1e-5, atol=1e-7)
+    finally:
+        retriever.close()
+
+
+def test_rerank_reorders_candidates(model_dir):
+    set_alpha(model_dir, 0.5)
+    retriever = make_retriever(model_dir, reranker=SlowReranker(delay=0), rerank_candidates=15)
+    try:
+        hybrid, _, _ = retriever.search("usb cable", top_k=15, rerank=False)
+        ids, scores, reranked = retriever.search("usb cable", top_k=5)
+        # Reranker cho điểm tăng dần theo vị trí ứng viên: thứ tự hybrid bị đảo ngược
+        assert reranked
+        assert ids.tolist() == hybrid[::-1][:5].tolist()
+        assert scores.tolist() == [14.0, 13.0, 12.0, 11.0, 10.0]
+    finally:
+        retriever.close()
+
+
+@pytest.mark.parametrize("reranker", [SlowReranker(delay=0.3), FailingReranker()])
+def test_rerank_timeout_or_error_falls_back_to_hybrid(model_dir, reranker):
+    set_alpha(model_dir, 0.5)
+    retriever = make_retriever(model_dir, reranker=reranker, rerank_budget_ms=20)
+    try:
+        expected_ids, expected_scores, _ = retriever.search("fast charger", top_k=8, rerank=False)
+        ids, scores, reranked = retriever.search("fast charger", top_k=8)
+        assert not reranked
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(scores, expected_scores)
+        assert retriever.rerank_timeouts == (1 if isinstance(reranker, SlowReranker) else 0)
+    finally:
+        retriever.close()
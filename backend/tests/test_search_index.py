@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+from search_index import ProductSearchIndex
+
+WORDS = ["usb", "cable", "type-c", "charger", "fast", "wireless", "mouse", "hdmi", "smart", "watch", "a", "x2"]
+CATEGORIES = ["Computers&Accessories|Cables", "Electronics|Chargers", "Electronics|WearableTechnology", None]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(3)
+    names = []
+    for i in range(300):
+        # Nhiều tên trùng nhau để có điểm BM25 hòa
+        words = rng.choice(WORDS, size=rng.integers(1, 5)) if i % 5 else WORDS[:2]
+        names.append(" ".join(words).title() if i % 7 else float("nan"))
+    categories = [CATEGORIES[i % len(CATEGORIES)] for i in range(300)]
+    return names, categories
+
+
+def brute_force(names, categories, query, limit, k1=1.2, b=0.75):
+    """Bản cũ: str.contains hoặc đủ mọi token, chấm BM25, hòa điểm theo thứ tự catalog"""
+    query = query.strip().lower()
+    if not query:
+        return []
+    texts = [
+        f"{name.lower() if isinstance(name, str) else ''}\n{category.lower() if isinstance(category, str) else ''}"
+        for name, category in zip(names, categories)
+    ]
+    doc_tokens = [ProductSearchIndex.tokenize(text) for text in texts]
+    tokens = ProductSearchIndex.tokenize(query)
+    
+    matched = [
+        doc_id for doc_id, text in enumerate(texts)
+        if query in text or (tokens and set(tokens) <= set(doc_tokens[doc_id]))
+    ]
+    avg_len = sum(map(len, doc_tokens)) / len(doc_tokens)
+    
+    def score(doc_id):
+        total = 0.0
+        for token in set(tokens):
+            df = sum(token in doc for doc in doc_tokens)
+            if not df:
+                continue
+            tf = doc_tokens[doc_id].count(token)
+            idf = math.log(1.0 + (len(texts) - df + 0.5) / (df + 0.5))
+            total += idf * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * len(doc_tokens[doc_id]) / avg_len))
+        return round(total, 4)
+    
+    return sorted(matched, key=lambda doc_id: (-score(doc_id), doc_id))[:limit]
+
+
+QUERIES = [
+    # 1-3 ký tự: tra thẳng posting list n-gram
+    "a", "x", "2", "-", "|", "us", "b ", "x2", "usb", "c|c", "ble",
+    # Dài hơn: giao trigram rồi xác nhận substring, hoặc khớp đủ token
+    "cable", "usb cable", "cable usb", "b cab", "type-c", "fast charger", "wearable",
+    "SMART Watch", "  hdmi  ", "electronics|chargers",
+    # Không khớp
+    "zz", "qqq", "usb zebra", "xyzzy", "",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("limit", [1, 3, 20, 1000])
+def test_search_matches_brute_force(catalog, query, limit):
+    names, categories = catalog
+    index = ProductSearchIndex(names, categories)
+    assert index.search(query, limit=limit) == brute_force(names, categories, query, limit)
+
+
+def test_limit_keeps_catalog_order_among_ties():
+    # Dòng 5 điểm cao nhất; năm dòng giống hệt nhau hòa điểm, lấy theo thứ tự catalog
+    names = ["usb cable"] * 5 + ["usb cable usb cable long", "hdmi"]
+    index = ProductSearchIndex(names, ["Cables"] * 7)
+    assert index.search("usb", limit=3) == [5, 0, 1]
+    assert index.search("usb", limit=10) == [5, 0, 1, 2, 3, 4]
+
+
+def test_empty_index_and_non_positive_limit():
+    assert ProductSearchIndex([], []).search("usb") == []
+    index = ProductSearchIndex(["usb cable"], ["Cables"])
+    assert index.search("usb", limit=0) == []
+    assert index.search(None) == []
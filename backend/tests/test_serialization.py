@@ -0,0 +1,68 @@
+import gzip
+import json
+
+import numpy as np
+import pytest
+from flask import Flask
+
+import serialization
+from serialization import FastJSONProvider, choose_encoding, compress, encode_payloads
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("deflate, identity", None),
+    ("gzip;q=0", None),
+    ("gzip;q=0.0", None),
+    ("gzip; q=0.00, identity", None),
+    ("gzip;q=0.001", "gzip"),
+    ("gzip; q=0.5", "gzip"),
+    ("gzip;Q=1.0", "gzip"),
+    ("gzip;q=abc", None),
+    ("gzip;q=2", None),
+    ("*", "gzip"),
+    ("*;q=0", None),
+    ("gzip;q=0, *", None),
+    ("identity, *;q=0.1", "gzip"),
+])
+def test_choose_encoding(header, expected, monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_prefers_higher_q_then_br():
+    pytest.importorskip("brotli")
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip;q=1, br;q=0.5") == "gzip"
+    assert choose_encoding("gzip, br;q=0.0") == "gzip"
+
+
+def test_compress_gzip_roundtrip():
+    body = json.dumps({"data": list(range(500))}).encode()
+    assert gzip.decompress(compress(body, "gzip", level=1)) == body
+
+
+@pytest.fixture
+def provider():
+    app = Flask(__name__)
+    app.config["JSONIFY_PRETTYPRINT_REGULAR"] = False
+    provider = FastJSONProvider(app)
+    provider.compact = True
+    return provider
+
+
+def test_registered_payloads_match_plain_json(provider):
+    products = [{"product_id": f"P{i}", "name": "cáp usb", "price": 1.5 * i, "tags": ["a", None]} for i in range(5)]
+    provider.register_payloads(encode_payloads(products))
+    body = {"data": products, "count": 5, "nested": {"first": products[0]}, "ids": (1, 2)}
+    assert json.loads(provider.dumps_bytes(body)) == json.loads(json.dumps(body))
+    
+    # Dict không phải object đã đăng ký được encode bình thường, không lấy bytes dựng sẵn
+    copy = dict(products[0], price=-1)
+    assert json.loads(provider.dumps(copy)) == copy
+
+
+def test_numpy_values_are_encoded(provider):
+    assert json.loads(provider.dumps_bytes({"score": np.float32(0.5), "n": 3})) == {"score": 0.5, "n": 3}
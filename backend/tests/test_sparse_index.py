@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from sparse_index import TfidfInvertedIndex
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return sp.random(200, 60, density=0.05, format="csr", random_state=0, dtype=np.float64)
+
+
+def brute_force(matrix, query, k, exclude=None):
+    """Nhân dense với toàn bộ ma trận như bản cũ"""
+    scores = np.asarray(matrix @ query.T.toarray()).ravel()
+    valid = scores > 0
+    if exclude is not None:
+        valid &= ~exclude
+    order = [i for i in np.argsort(-scores, kind="stable") if valid[i]]
+    return np.asarray(order[:k]), scores
+
+
+def test_score_matches_dense_product(matrix):
+    index = TfidfInvertedIndex.from_matrix(matrix)
+    assert len(index) == 200 and index.n_terms == 60
+    query = sp.random(1, 60, density=0.2, format="csr", random_state=1)
+    docs, scores = index.score(query.indices.astype(np.int64), query.data)
+    dense = np.asarray(matrix @ query.T.toarray()).ravel()
+    np.testing.assert_array_equal(docs, np.flatnonzero(dense > 0))
+    np.testing.assert_allclose(scores, dense[docs], rtol=1e-5)
+
+
+@pytest.mark.parametrize("k", [1, 5, 50, 500])
+def test_search_matches_brute_force(matrix, k):
+    index = TfidfInvertedIndex.from_matrix(matrix)
+    rng = np.random.default_rng(k)
+    exclude = rng.random(200) < 0.2
+    for seed in range(10):
+        query = sp.random(1, 60, density=0.1, format="csr", random_state=seed)
+        for mask in (None, exclude):
+            docs, scores = index.search(query, k, exclude=mask)
+            expected, dense = brute_force(matrix, query, k, mask)
+            assert len(docs) == len(expected)
+            np.testing.assert_allclose(scores, dense[expected], rtol=1e-5)
+            np.testing.assert_allclose(dense[docs], scores, rtol=1e-5)
+            if mask is not None:
+                assert not mask[docs].any()
+
+
+def test_search_without_matching_terms():
+    # Term cuối không có trong document nào
+    matrix = sp.csr_matrix(np.array([[0.5, 0.0, 0.0], [0.0, 0.2, 0.0]]))
+    index = TfidfInvertedIndex.from_matrix(matrix)
+    for query in (sp.csr_matrix((1, 3)), sp.csr_matrix(np.array([[0.0, 0.0, 1.0]]))):
+        docs, scores = index.search(query, 5)
+        assert len(docs) == 0 and len(scores) == 0
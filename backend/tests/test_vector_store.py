@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from vector_store import CompressedVectorStore, METHODS
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1200, 32)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, query, k):
+    scores = vectors @ query
+    order = np.argsort(-scores, kind="stable")[:k]
+    return order, scores[order]
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_full_rescoring_equals_exact_search(vectors, method):
+    store = CompressedVectorStore.build(vectors, method=method, m=8)
+    # rescore_factor * k >= N: mọi vector đều được tính lại chính xác
+    store.rescore_factor = len(vectors)
+    for query in vectors[:20]:
+        found, scores = store.search(query, 10)
+        expected, expected_scores = exact_top_k(vectors, query, 10)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+        np.testing.assert_allclose(vectors[found] @ query, scores, rtol=1e-5)
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_rescored_scores_are_exact(vectors, method):
+    store = CompressedVectorStore.build(vectors, method=method, m=8)
+    store.rescore_factor = 4
+    recall = 0
+    for query in vectors[:50]:
+        found, scores = store.search(query, 10)
+        np.testing.assert_allclose(vectors[found] @ query, scores, rtol=1e-5)
+        assert np.all(np.diff(scores) <= 1e-6)
+        recall += len(np.intersect1d(found, exact_top_k(vectors, query, 10)[0]))
+    assert recall / 500 > 0.6
+
+
+def test_search_without_rescoring_uses_codes(vectors):
+    store = CompressedVectorStore.build(vectors, method="int8")
+    found, scores = store.search(vectors[0], 5, rescore=False)
+    np.testing.assert_allclose(scores, store.codes.scores(vectors[0])[found])
+
+
+def test_k_larger_than_store(vectors):
+    store = CompressedVectorStore.build(vectors[:7], method="float16")
+    found, _ = store.search(vectors[0], 20)
+    assert sorted(found.tolist()) == list(range(7))
+
+
+@pytest.mark.parametrize("method", sorted(METHODS))
+def test_save_load_roundtrip(vectors, method, tmp_path):
+    store = CompressedVectorStore.build(vectors, method=method, m=8)
+    store.save(tmp_path)
+    loaded = CompressedVectorStore.load(tmp_path, vectors=vectors)
+    np.testing.assert_array_equal(loaded.codes.codes, store.codes.codes)
+    assert loaded.train_error == pytest.approx(store.train_error)
+    for query in vectors[:5]:
+        np.testing.assert_array_equal(loaded.search(query, 5)[0], store.search(query, 5)[0])
+    
+    with pytest.raises(ValueError):
+        CompressedVectorStore.load(tmp_path, vectors=vectors[:10])
+
+
+@pytest.mark.parametrize("method", ["int8", "pq"])
+def test_append_encodes_with_existing_params(vectors, method):
+    store = CompressedVectorStore.build(vectors[:1000], method=method, m=8)
+    params = np.array(store.codes.params, copy=True)
+    store.append(vectors[1000:])
+    
+    assert len(store) == len(vectors)
+    np.testing.assert_array_equal(store.codes.params, params)
+    np.testing.assert_array_equal(store.codes.codes[1000:], store.codes.encode(vectors[1000:]))
+
+
+def test_drift_grows_with_distribution_shift(vectors):
+    store = CompressedVectorStore.build(vectors, method="int8")
+    assert store.drift(vectors[:100]) == pytest.approx(1.0, rel=0.5)
+    assert store.drift(vectors[:100] * 5) > 10
+    assert store.drift(vectors[:0]) == 1.0
+    assert CompressedVectorStore.build(vectors, method="float16").drift(vectors * 5) == 1.0
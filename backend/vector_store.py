@@ -0,0 +1,305 @@
+"""
+Vector store nén cho embedding sản phẩm (inner product), kèm bước rescoring chính xác
+
+Các kiểu nén (so với float32):
+- float16: 2x nhỏ hơn
+- int8: scalar quantization đối xứng theo từng chiều, 4x nhỏ hơn
+- pq: product quantization, m sub-vector x 256 centroid (1 byte/sub-vector),
+  ví dụ 384 chiều với m=48 là 32x nhỏ hơn
+
+Bước quét dùng code đã nén để chọn ứng viên, sau đó điểm của các ứng viên được
+tính lại chính xác trên file float32 memory-mapped (chỉ đọc các dòng cần thiết).
+
+Build tăng dần (build_rag_index.py) encode vector mới bằng codebook / scale đã train
+và chỉ train lại khi sai số nén của vector mới vượt quá sai số lúc train (drift).
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ranking import top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+META_FILENAME = "meta.json"
+CODES_FILENAME = "codes.npy"
+PARAMS_FILENAME = "params.npy"
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+# Số vector tối đa dùng để đo sai số nén lúc train
+ERROR_SAMPLE_SIZE = 10000
+
+
+class Float16Codes:
+    """Lưu vector dạng float16"""
+    
+    method = "float16"
+    trainable = False
+    
+    def __init__(self, codes: np.ndarray, params: Optional[np.ndarray] = None):
+        self.codes = codes
+        self.params = params
+    
+    @classmethod
+    def train(cls, vectors: np.ndarray, **options) -> "Float16Codes":
+        return cls(np.asarray(vectors, dtype=np.float16))
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Code của vector mới theo params hiện có (không train lại)"""
+        return np.asarray(vectors, dtype=np.float16)
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+    
+    def relative_error(self, vectors: np.ndarray) -> float:
+        """Sai số nén tương đối ||x - decode(encode(x))||² / ||x||² trên các vector cho trước"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        residual = vectors - self.decode(self.encode(vectors))
+        return float(np.einsum("ij,ij->", residual, residual) / max(np.einsum("ij,ij->", vectors, vectors), 1e-12))
+    
+    def scores(self, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Inner product xấp xỉ với mọi vector, giải nén theo từng khối"""
+        query = np.asarray(query, dtype=np.float32)
+        out = np.empty(self.codes.shape[0], dtype=np.float32)
+        for start in range(0, len(out), chunk_size):
+            out[start:start + chunk_size] = self.codes[start:start + chunk_size].astype(np.float32) @ query
+        return out
+    
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.params.nbytes if self.params is not None else 0)
+
+
+class Int8Codes(Float16Codes):
+    """Scalar quantization đối xứng: x ≈ codes * scale, scale theo từng chiều (params)"""
+    
+    method = "int8"
+    trainable = True
+    
+    @classmethod
+    def train(cls, vectors: np.ndarray, **options) -> "Int8Codes":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scale = np.abs(vectors).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        quantizer = cls(np.zeros((0, vectors.shape[1]), dtype=np.int8), scale.astype(np.float32))
+        quantizer.codes = quantizer.encode(vectors)
+        return quantizer
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        # Giá trị vượt scale lúc train bị cắt: relative_error tăng lên là dấu hiệu drift
+        return np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.params), -127, 127).astype(np.int8)
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32) * self.params
+    
+    def scores(self, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        # (codes * scale) @ q = codes @ (scale * q): không cần giải nén vector
+        return super().scores(np.asarray(query, dtype=np.float32) * self.params, chunk_size)
+
+
+def _kmeans_l2(vectors: np.ndarray, k: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    """K-means (Lloyd, khoảng cách L2) cho codebook PQ"""
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=len(vectors) < k)].copy()
+    for _ in range(n_iter):
+        # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+        assign = np.argmax(vectors @ centroids.T - 0.5 * np.einsum("ij,ij->i", centroids, centroids), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class PQCodes(Float16Codes):
+    """
+    Product quantization: chia vector thành m sub-vector, mỗi sub-vector thay bằng
+    chỉ số (uint8) của centroid gần nhất trong codebook riêng (params: m x 256 x d/m)
+    
+    Điểm query được tính bằng bảng tra (asymmetric distance): với mỗi sub-vector,
+    inner product của query với 256 centroid được tính một lần rồi cộng theo code.
+    """
+    
+    method = "pq"
+    trainable = True
+    
+    @classmethod
+    def train(cls,
+              vectors: np.ndarray,
+              m: int = 48,
+              n_centroids: int = 256,
+              n_iter: int = 20,
+              sample_size: int = 100000,
+              seed: int = 42,
+              **options) -> "PQCodes":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        if dim % m:
+            raise ValueError(f"Embedding dim {dim} is not divisible by m={m}")
+        sub_dim = dim // m
+        n_centroids = min(n_centroids, 256, n)
+        
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+        
+        codebooks = np.empty((m, n_centroids, sub_dim), dtype=np.float32)
+        for j in range(m):
+            part = slice(j * sub_dim, (j + 1) * sub_dim)
+            codebooks[j] = _kmeans_l2(sample[:, part], n_centroids, n_iter, rng)
+        
+        quantizer = cls(np.zeros((0, m), dtype=np.uint8), codebooks)
+        quantizer.codes = quantizer.encode(vectors)
+        return quantizer
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Centroid gần nhất (L2) của từng sub-vector"""
+        m, _, sub_dim = self.params.shape
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        for j in range(m):
+            centroids = self.params[j]
+            codes[:, j] = np.argmax(
+                vectors[:, j * sub_dim:(j + 1) * sub_dim] @ centroids.T
+                - 0.5 * np.einsum("ij,ij->i", centroids, centroids),
+                axis=1
+            )
+        return codes
+    
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        m = self.params.shape[0]
+        codes = np.asarray(codes, dtype=np.intp)
+        return np.concatenate([self.params[j][codes[:, j]] for j in range(m)], axis=1)
+    
+    def scores(self, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        m, n_centroids, sub_dim = self.params.shape
+        query = np.asarray(query, dtype=np.float32).reshape(m, sub_dim)
+        table = np.einsum("jcd,jd->jc", self.params, query)
+        # Bảng phẳng (m * n_centroids): code của sub-vector j nằm ở j * n_centroids + code
+        flat = table.ravel()
+        offsets = (np.arange(m) * n_centroids)[None, :]
+        
+        out = np.empty(self.codes.shape[0], dtype=np.float32)
+        for start in range(0, len(out), chunk_size):
+            block = self.codes[start:start + chunk_size].astype(np.intp) + offsets
+            out[start:start + len(block)] = flat[block].sum(axis=1)
+        return out
+
+
+METHODS = {cls.method: cls for cls in (Float16Codes, Int8Codes, PQCodes)}
+
+
+class CompressedVectorStore:
+    """
+    Tìm kiếm inner product trên code nén + rescoring chính xác
+    
+    search() chọn rescore_factor * k ứng viên theo điểm xấp xỉ, rồi tính lại điểm
+    chính xác của chúng từ vectors float32 (thường là np.load(..., mmap_mode="r"))
+    """
+    
+    def __init__(self,
+                 codes: Float16Codes,
+                 vectors: Optional[np.ndarray] = None,
+                 rescore_factor: int = 4,
+                 train_error: Optional[float] = None):
+        self.codes = codes
+        self.vectors = vectors
+        self.rescore_factor = rescore_factor
+        self.train_error = train_error
+    
+    @property
+    def method(self) -> str:
+        return self.codes.method
+    
+    def __len__(self) -> int:
+        return self.codes.codes.shape[0]
+    
+    @classmethod
+    def build(cls, vectors: np.ndarray, method: str = "int8", **options) -> "CompressedVectorStore":
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method: {method} (available: {', '.join(METHODS)})")
+        codes = METHODS[method].train(vectors, **options)
+        logger.info(
+            f"Built {method} vector store: {len(vectors)} vectors, "
+            f"{codes.nbytes / 1024:.1f} KB ({np.asarray(vectors).nbytes / max(1, codes.nbytes):.1f}x smaller)"
+        )
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(len(vectors), size=min(len(vectors), ERROR_SAMPLE_SIZE), replace=False))
+        return cls(codes, vectors, train_error=codes.relative_error(np.asarray(vectors)[sample]))
+    
+    def drift(self, vectors: np.ndarray) -> float:
+        """
+        Tỉ lệ sai số nén của các vector mới so với lúc train (1.0 = như lúc train)
+        
+        Kiểu nén không cần train (float16) hoặc store cũ chưa ghi train_error trả về 1.0.
+        """
+        if not self.codes.trainable or not self.train_error or len(vectors) == 0:
+            return 1.0
+        return self.codes.relative_error(vectors) / self.train_error
+    
+    def append(self, vectors: np.ndarray):
+        """Encode các vector mới bằng codebook / scale hiện có và thêm vào cuối, không train lại"""
+        self.codes.codes = np.concatenate([np.asarray(self.codes.codes), self.codes.encode(vectors)])
+    
+    def search(self, query: np.ndarray, k: int, rescore: bool = True) -> SearchResult:
+        approx = self.codes.scores(query)
+        if not rescore or self.vectors is None:
+            top = select_top_k(approx, k)
+            return top.astype(np.int64), approx[top]
+        
+        candidates = select_top_k(approx, max(k, k * self.rescore_factor))
+        # Đọc các dòng theo thứ tự tăng dần để truy cập file mmap tuần tự hơn
+        candidates = np.sort(candidates)
+        exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+        top = select_top_k(exact, k)
+        return candidates[top].astype(np.int64), exact[top]
+    
+    def save(self, store_dir: str):
+        # Ghi file tạm rồi os.replace: process đang mmap codes.npy cũ vẫn đọc được bản cũ
+        os.makedirs(store_dir, exist_ok=True)
+        arrays = {CODES_FILENAME: self.codes.codes, PARAMS_FILENAME: self.codes.params}
+        for filename, array in arrays.items():
+            if array is not None:
+                path = os.path.join(store_dir, filename)
+                np.save(f"{path}.tmp.npy", array)
+                os.replace(f"{path}.tmp.npy", path)
+        meta = {
+            "method": self.method,
+            "size": len(self),
+            "code_bytes": int(self.codes.nbytes),
+            "rescore_factor": self.rescore_factor,
+            "train_error": self.train_error
+        }
+        meta_path = os.path.join(store_dir, META_FILENAME)
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        logger.info(f"Saved {self.method} vector store to {store_dir}")
+    
+    @staticmethod
+    def exists(store_dir: str) -> bool:
+        return os.path.exists(os.path.join(store_dir, META_FILENAME))
+    
+    @classmethod
+    def load(cls,
+             store_dir: str,
+             vectors: Optional[np.ndarray] = None,
+             rescore_factor: Optional[int] = None,
+             mmap_mode: Optional[str] = "r") -> "CompressedVectorStore":
+        with open(os.path.join(store_dir, META_FILENAME)) as f:
+            meta: Dict[str, Any] = json.load(f)
+        method = meta.get("method")
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method in {store_dir}: {method}")
+        
+        params_path = os.path.join(store_dir, PARAMS_FILENAME)
+        codes = METHODS[method](
+            np.load(os.path.join(store_dir, CODES_FILENAME), mmap_mode=mmap_mode),
+            np.load(params_path) if os.path.exists(params_path) else None
+        )
+        if vectors is not None and len(vectors) != codes.codes.shape[0]:
+            raise ValueError(f"Vector store has {codes.codes.shape[0]} codes, embeddings have {len(vectors)}")
+        return cls(codes, vectors, rescore_factor or meta.get("rescore_factor", 4), meta.get("train_error"))